@@ -0,0 +1,173 @@
+import asyncio
+import itertools
+import re
+import time
+import logging, os
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Optional
+from dotenv import load_dotenv
+from fastapi.responses import JSONResponse
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+# Uploads de CSV processados ao mesmo tempo e orçamento de memória para eles
+INGESTAO_MAX_CONCORRENTES = int(os.getenv('INGESTAO_MAX_CONCORRENTES', '2'))
+INGESTAO_MEMORIA_MB = float(os.getenv('INGESTAO_MEMORIA_MB', '512'))
+# Memória estimada por byte de CSV (DataFrame, objetos Python e tuplas do INSERT)
+INGESTAO_FATOR_MEMORIA = float(os.getenv('INGESTAO_FATOR_MEMORIA', '10'))
+# Tamanho presumido quando a requisição não informa Content-Length
+INGESTAO_TAMANHO_PADRAO_MB = float(os.getenv('INGESTAO_TAMANHO_PADRAO_MB', '10'))
+# Fila de espera: tamanho máximo e tempo máximo de espera antes do 503
+INGESTAO_FILA_MAX = int(os.getenv('INGESTAO_FILA_MAX', '16'))
+INGESTAO_ESPERA_MAX_S = float(os.getenv('INGESTAO_ESPERA_MAX_S', '30'))
+INGESTAO_RETRY_AFTER_S = int(os.getenv('INGESTAO_RETRY_AFTER_S', '5'))
+
+# Rotas de ingestão de CSV controladas pelo middleware
+ROTAS_INGESTAO = re.compile(r"^/experimentos/(novo|\d+/dados)/?$")
+
+
+class IngestaoRecusada(Exception):
+    """Upload não admitido: status HTTP (503 ou 413) e motivo."""
+
+    def __init__(self, status: int, motivo: str):
+        super().__init__(motivo)
+        self.status = status
+        self.motivo = motivo
+
+
+class ControleAdmissao:
+    """
+    Controle de admissão dos uploads: no máximo max_concorrentes em processamento,
+    soma das memórias estimadas dentro do orçamento e fila FIFO limitada, com
+    tempo máximo de espera. Mantém as métricas de fila e de espera.
+    """
+
+    def __init__(self, max_concorrentes: int = INGESTAO_MAX_CONCORRENTES,
+                 memoria_mb: float = INGESTAO_MEMORIA_MB, fila_max: int = INGESTAO_FILA_MAX,
+                 espera_max_s: float = INGESTAO_ESPERA_MAX_S):
+        self.max_concorrentes = max_concorrentes
+        self.orcamento_bytes = int(memoria_mb * 1024 * 1024)
+        self.fila_max = fila_max
+        self.espera_max_s = espera_max_s
+
+        self.em_execucao = 0
+        self.memoria_reservada = 0
+        self._esperando: deque = deque()
+        self._senhas = itertools.count()
+        self._condicao = asyncio.Condition()
+
+        self.admitidas = 0
+        self.recusadas_fila_cheia = 0
+        self.recusadas_tempo_esgotado = 0
+        self.recusadas_tamanho = 0
+        self.espera_total_s = 0.0
+        self.espera_max_observada_s = 0.0
+
+    @staticmethod
+    def estimar_memoria(tamanho_bytes: Optional[int]) -> int:
+        if tamanho_bytes is None:
+            tamanho_bytes = int(INGESTAO_TAMANHO_PADRAO_MB * 1024 * 1024)
+
+        return int(tamanho_bytes * INGESTAO_FATOR_MEMORIA)
+
+    def _cabe(self, estimativa: int) -> bool:
+        return self.em_execucao < self.max_concorrentes and self.memoria_reservada + estimativa <= self.orcamento_bytes
+
+    @asynccontextmanager
+    async def admitir(self, tamanho_bytes: Optional[int]):
+        """Aguarda a vez do upload (ou levanta IngestaoRecusada) e libera os recursos ao final."""
+        estimativa = self.estimar_memoria(tamanho_bytes)
+        if estimativa > self.orcamento_bytes:
+            self.recusadas_tamanho += 1
+            raise IngestaoRecusada(413, "Arquivo maior que o orçamento de memória da ingestão.")
+
+        if len(self._esperando) >= self.fila_max:
+            self.recusadas_fila_cheia += 1
+            raise IngestaoRecusada(503, "Fila de ingestão cheia. Tente novamente mais tarde.")
+
+        senha = next(self._senhas)
+        self._esperando.append(senha)
+        inicio = time.monotonic()
+        try:
+            async with self._condicao:
+                # FIFO: só o primeiro da fila entra, e apenas se couber
+                await asyncio.wait_for(
+                    self._condicao.wait_for(lambda: self._esperando[0] == senha and self._cabe(estimativa)),
+                    timeout=self.espera_max_s
+                )
+                self._esperando.popleft()
+                self.em_execucao += 1
+                self.memoria_reservada += estimativa
+                self._condicao.notify_all()
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            # Tempo esgotado ou cliente desconectado: sai da fila e acorda o próximo
+            if senha in self._esperando:
+                self._esperando.remove(senha)
+            async with self._condicao:
+                self._condicao.notify_all()
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            self.recusadas_tempo_esgotado += 1
+            raise IngestaoRecusada(503, "Tempo de espera da fila de ingestão esgotado. Tente novamente mais tarde.")
+
+        espera = time.monotonic() - inicio
+        self.admitidas += 1
+        self.espera_total_s += espera
+        self.espera_max_observada_s = max(self.espera_max_observada_s, espera)
+
+        try:
+            yield
+        finally:
+            async with self._condicao:
+                self.em_execucao -= 1
+                self.memoria_reservada -= estimativa
+                self._condicao.notify_all()
+
+    def metricas(self) -> dict:
+        return {
+            "em_execucao": self.em_execucao,
+            "max_concorrentes": self.max_concorrentes,
+            "fila": len(self._esperando),
+            "fila_max": self.fila_max,
+            "memoria_reservada_mb": round(self.memoria_reservada / 1024 / 1024, 2),
+            "orcamento_memoria_mb": round(self.orcamento_bytes / 1024 / 1024, 2),
+            "admitidas": self.admitidas,
+            "recusadas_fila_cheia": self.recusadas_fila_cheia,
+            "recusadas_tempo_esgotado": self.recusadas_tempo_esgotado,
+            "recusadas_tamanho": self.recusadas_tamanho,
+            "espera_media_ms": round(self.espera_total_s / self.admitidas * 1000, 1) if self.admitidas else 0.0,
+            "espera_max_ms": round(self.espera_max_observada_s * 1000, 1),
+        }
+
+
+controle_admissao = ControleAdmissao()
+
+
+class AdmissaoIngestaoMiddleware:
+    """
+    Middleware ASGI que submete os uploads de CSV ao controle de admissão antes
+    de o corpo ser lido: uploads em excesso esperam na fila ou recebem 503 com
+    Retry-After, sem ocupar threads nem memória. As demais rotas não passam pelo controle.
+    """
+
+    def __init__(self, app, controle: ControleAdmissao = controle_admissao):
+        self.app = app
+        self.controle = controle
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope.get("method") != "POST" or not ROTAS_INGESTAO.match(scope.get("path", "")):
+            await self.app(scope, receive, send)
+            return
+
+        tamanho = dict(scope.get("headers") or []).get(b"content-length")
+        tamanho = int(tamanho) if tamanho and tamanho.isdigit() else None
+
+        try:
+            async with self.controle.admitir(tamanho):
+                await self.app(scope, receive, send)
+        except IngestaoRecusada as e:
+            logger.warning(f"Upload recusado em {scope.get('path')}: {e.motivo}")
+            headers = {"Retry-After": str(INGESTAO_RETRY_AFTER_S)} if e.status == 503 else None
+            await JSONResponse({"detail": e.motivo}, status_code=e.status, headers=headers)(scope, receive, send)
@@ -0,0 +1,129 @@
+import re
+import sqlite3
+import threading
+import time
+import logging, os
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+# Diretório dos backups do banco
+BACKUP_DIRETORIO = os.getenv('BACKUP_DIRETORIO', 'db/backups')
+# Páginas copiadas por passo da API de backup e pausa entre os passos (libera o lock para os escritores)
+BACKUP_PAGINAS_POR_PASSO = int(os.getenv('BACKUP_PAGINAS_POR_PASSO', '256'))
+BACKUP_PAUSA_MS = float(os.getenv('BACKUP_PAUSA_MS', '5'))
+# Reinícios tolerados (cada escrita de outra conexão recomeça a cópia em passos) antes de copiar num único passo
+BACKUP_MAX_REINICIOS = int(os.getenv('BACKUP_MAX_REINICIOS', '20'))
+
+# Nomes aceitos ao baixar um backup (evita acesso a outros arquivos)
+NOME_BACKUP = re.compile(r"^experimentos_\d{8}_\d{6}(_\d+)?\.db$")
+
+
+class BackupEmAndamento(Exception):
+    """Já existe um backup sendo feito neste processo."""
+
+
+class _BackupReiniciado(Exception):
+    """A cópia em passos recomeçou mais de BACKUP_MAX_REINICIOS vezes."""
+
+
+_lock_backup = threading.Lock()
+
+
+def _copiar(db: sqlite3.Connection, temporario: str, paginas: int, progresso=None) -> str:
+    """Copia o banco para temporario e devolve o resultado de PRAGMA quick_check da cópia."""
+    destino = sqlite3.connect(temporario)
+    try:
+        db.backup(destino, pages=paginas, progress=progresso)
+        return destino.execute("PRAGMA quick_check").fetchone()[0]
+    finally:
+        destino.close()
+
+def criar_backup(db: sqlite3.Connection, diretorio: str = BACKUP_DIRETORIO,
+                 paginas_por_passo: int = BACKUP_PAGINAS_POR_PASSO, pausa_ms: float = BACKUP_PAUSA_MS,
+                 max_reinicios: int = BACKUP_MAX_REINICIOS) -> Dict[str, Any]:
+    """
+    Copia o banco com a API de backup online do SQLite, em passos de
+    paginas_por_passo páginas com uma pausa entre eles, sem interromper as
+    requisições. Cada escrita de outra conexão recomeça a cópia; após
+    max_reinicios reinícios ela é refeita num único passo, que sob WAL só
+    mantém um snapshot de leitura. A cópia é gravada num arquivo temporário e
+    renomeada ao final. Levanta BackupEmAndamento se outro backup estiver rodando.
+    """
+    if not _lock_backup.acquire(blocking=False):
+        raise BackupEmAndamento("Já existe um backup em andamento.")
+
+    try:
+        os.makedirs(diretorio, exist_ok=True)
+        nome = f"experimentos_{datetime.now().strftime('%Y%m%d_%H%M%S')}.db"
+        if os.path.exists(os.path.join(diretorio, nome)):
+            nome = nome.replace(".db", f"_{time.monotonic_ns()}.db")
+        arquivo = os.path.join(diretorio, nome)
+        temporario = f"{arquivo}.tmp"
+
+        passos, reinicios, restantes_anterior = 0, 0, None
+        def progresso(status, restantes, total):
+            nonlocal passos, reinicios, restantes_anterior
+            passos += 1
+            # Sem avanço desde o passo anterior: a cópia recomeçou por causa de uma escrita
+            if restantes_anterior is not None and restantes >= restantes_anterior:
+                reinicios += 1
+                if reinicios > max_reinicios:
+                    raise _BackupReiniciado()
+            restantes_anterior = restantes
+            # Entre os passos o lock de leitura é liberado e os escritores podem seguir
+            if restantes and pausa_ms > 0:
+                time.sleep(pausa_ms / 1000)
+
+        inicio = time.perf_counter()
+        try:
+            integridade = _copiar(db, temporario, paginas_por_passo, progresso)
+        except _BackupReiniciado:
+            logger.warning(f"Backup recomeçou {reinicios} vezes por escritas concorrentes; copiando num único passo.")
+            os.remove(temporario)
+            passos += 1
+            integridade = _copiar(db, temporario, -1)
+
+        if integridade != "ok":
+            os.remove(temporario)
+            logger.error(f"Backup inválido ({integridade}); arquivo descartado.")
+            raise sqlite3.DatabaseError(f"Verificação do backup falhou: {integridade}")
+
+        os.replace(temporario, arquivo)
+        duracao_ms = round((time.perf_counter() - inicio) * 1000, 1)
+        logger.info(f"Backup do banco gravado em {arquivo} ({passos} passos, {reinicios} reinícios, {duracao_ms} ms).")
+
+        return {
+            "arquivo": nome,
+            "tamanho_bytes": os.path.getsize(arquivo),
+            "passos": passos,
+            "reinicios": reinicios,
+            "duracao_ms": duracao_ms,
+        }
+    finally:
+        _lock_backup.release()
+
+def listar_backups(diretorio: str = BACKUP_DIRETORIO) -> List[Dict[str, Any]]:
+    """Backups disponíveis, do mais recente para o mais antigo."""
+    if not os.path.isdir(diretorio):
+        return []
+
+    backups = []
+    for nome in os.listdir(diretorio):
+        if NOME_BACKUP.match(nome):
+            info = os.stat(os.path.join(diretorio, nome))
+            backups.append({"arquivo": nome, "tamanho_bytes": info.st_size, "criado_em_ms": int(info.st_mtime * 1000)})
+
+    return sorted(backups, key=lambda backup: backup["criado_em_ms"], reverse=True)
+
+def caminho_backup(nome: str, diretorio: str = BACKUP_DIRETORIO) -> Optional[str]:
+    """Caminho do backup com o nome informado, ou None se o nome for inválido ou não existir."""
+    if not NOME_BACKUP.match(nome):
+        return None
+
+    arquivo = os.path.join(diretorio, nome)
+
+    return arquivo if os.path.isfile(arquivo) else None
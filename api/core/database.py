@@ -1,17 +1,31 @@
 import sqlite3
 import logging, os
+from typing import Any, Callable
 from dotenv import load_dotenv
+from api.utils.formatacao import AcumuladorVoo
+from api.utils.espacial import reindexar_experimento
+from api.utils.sparkline import gravar_sparkline
+from api.utils.modelo import recalcular_estatisticas
 
 load_dotenv()
 logger = logging.getLogger(__name__)
 
 DATABASE_URL = os.getenv('DATABASE_SQLITE')
 
+# Com vários workers: journal WAL (leitores não bloqueiam o escritor) e espera
+# pelo lock de escrita de outro processo antes de falhar com "database is locked"
+SQLITE_WAL = os.getenv('SQLITE_WAL', '1') == '1'
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000'))
+
 def get_db_connection():
     """Cria e retorna uma conexão com o banco de dados."""
     if DATABASE_URL:
         logger.info(f"Conectando ao banco de dados: {DATABASE_URL}")
-        conn = sqlite3.connect(DATABASE_URL) 
+        # BEGIN IMMEDIATE: a transação de escrita pega o lock no início (respeitando
+        # o busy timeout) em vez de falhar ao promover uma leitura para escrita
+        conn = sqlite3.connect(DATABASE_URL, timeout=SQLITE_BUSY_TIMEOUT_MS / 1000, isolation_level="IMMEDIATE")
+        if SQLITE_WAL:
+            conn.execute("PRAGMA synchronous = NORMAL")
 
     else:
         logger.error("A variável de ambiente DATABASE_SQLITE não foi definida.")
@@ -22,11 +36,29 @@ def get_db_connection():
     conn.row_factory = sqlite3.Row  # Permite acessar colunas por nome
     return conn
 
+def com_conexao(funcao: Callable[..., Any], *args) -> Any:
+    """
+    Executa funcao(db, *args) com uma conexão própria, fechada ao final (para
+    trabalho fora do ciclo de vida de uma requisição).
+    """
+    db = get_db_connection()
+    try:
+        return funcao(db, *args)
+    finally:
+        db.close()
+
 def create_tables():
     """Cria as tabelas no banco de dados se não existirem."""
     conn = get_db_connection()
     cursor = conn.cursor()
     try:
+        # Só tem efeito em bancos novos (antes da primeira tabela); os existentes são convertidos pela migração 8
+        cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+
+        if SQLITE_WAL:
+            modo = cursor.execute("PRAGMA journal_mode = WAL").fetchone()[0]
+            logger.info(f"Journal do SQLite: {modo}.")
+
         # Tabela EXPERIMENTO
         cursor.execute("""
         CREATE TABLE IF NOT EXISTS EXPERIMENTO (
@@ -36,7 +68,8 @@ def create_tables():
             data DATE NOT NULL,
             pressao_psi FLOAT NOT NULL,
             volume_agua FLOAT NOT NULL,
-            massa_total_foguete FLOAT NOT NULL
+            massa_total_foguete FLOAT NOT NULL,
+            hash_conteudo CHAR(64) -- SHA-256 do CSV normalizado que originou o experimento
         )
         """)
         logger.info("Tabela EXPERIMENTO verificada/criada.")
@@ -45,7 +78,7 @@ def create_tables():
         cursor.execute("""
         CREATE TABLE IF NOT EXISTS DADOS_EXPERIMENTO (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
-            timestamp DATETIME,
+            timestamp INTEGER, -- epoch em milissegundos (UTC)
             accel_x REAL,
             accel_y REAL,
             accel_z REAL,
@@ -54,13 +87,281 @@ def create_tables():
             latitude REAL,
             altura REAL,
             fk_exp INTEGER NOT NULL,
+            bloco_espacial INTEGER, -- id do bloco da amostra em DADOS_EXPERIMENTO_RTREE
             FOREIGN KEY (fk_exp) REFERENCES EXPERIMENTO(id) ON DELETE CASCADE
         )
         """)
         logger.info("Tabela DADOS_EXPERIMENTO verificada/criada.")
+
+        # Tabela RESUMO_EXPERIMENTO (valores derivados, mantidos incrementalmente)
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS RESUMO_EXPERIMENTO (
+            fk_exp INTEGER PRIMARY KEY,
+            total_amostras INTEGER NOT NULL DEFAULT 0,
+            timestamp_inicial INTEGER,
+            timestamp_final INTEGER,
+            altura_inicial REAL,
+            altura_maxima REAL,
+            velocidade_maxima REAL,
+            distancia_total REAL NOT NULL DEFAULT 0,
+            ultima_latitude REAL,
+            ultima_longitude REAL,
+            versao INTEGER NOT NULL DEFAULT 0, -- incrementada a cada alteração dos dados do experimento
+            FOREIGN KEY (fk_exp) REFERENCES EXPERIMENTO(id) ON DELETE CASCADE
+        )
+        """)
+        logger.info("Tabela RESUMO_EXPERIMENTO verificada/criada.")
+
+        # Índice espacial (R*Tree): retângulos de blocos de amostras consecutivas
+        cursor.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS DADOS_EXPERIMENTO_RTREE USING rtree(
+            id,
+            min_lat, max_lat,
+            min_lon, max_lon,
+            +fk_exp INTEGER,
+            +inicio_ms INTEGER,
+            +fim_ms INTEGER,
+            +amostras INTEGER
+        )
+        """)
+        logger.info("Tabela DADOS_EXPERIMENTO_RTREE verificada/criada.")
+
+        # Tabela INGESTAO_AO_VIVO (concessão: um único processo grava a ingestão ao vivo de cada experimento)
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS INGESTAO_AO_VIVO (
+            fk_exp INTEGER PRIMARY KEY,
+            processo TEXT NOT NULL,
+            expira_ms INTEGER NOT NULL
+        )
+        """)
+        logger.info("Tabela INGESTAO_AO_VIVO verificada/criada.")
+
+        # Tabela SPARKLINE_EXPERIMENTO (miniaturas das séries para a listagem, calculadas na ingestão)
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS SPARKLINE_EXPERIMENTO (
+            fk_exp INTEGER PRIMARY KEY,
+            altura_lancamento TEXT NOT NULL, -- lista JSON
+            distancia TEXT NOT NULL -- lista JSON
+        )
+        """)
+        logger.info("Tabela SPARKLINE_EXPERIMENTO verificada/criada.")
+
+        # Tabelas do modelo de lançamento: observação de cada experimento e estatísticas suficientes do ajuste
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS MODELO_OBSERVACAO (
+            fk_exp INTEGER PRIMARY KEY,
+            pressao_psi FLOAT NOT NULL,
+            volume_agua FLOAT NOT NULL,
+            massa_total_foguete FLOAT NOT NULL,
+            alcance REAL,
+            apogeu REAL
+        )
+        """)
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS MODELO_ESTATISTICAS (
+            resposta TEXT PRIMARY KEY,
+            matriz TEXT NOT NULL, -- matriz Z'Z em JSON
+            versao INTEGER NOT NULL DEFAULT 0 -- incrementada a cada alteração da matriz
+        )
+        """)
+        logger.info("Tabelas MODELO_OBSERVACAO e MODELO_ESTATISTICAS verificadas/criadas.")
         conn.commit()
+
+        aplicar_migracoes(conn)
     except sqlite3.Error as e:
         logger.error(f"Erro ao criar tabelas: {e}")
         conn.rollback()
     finally:
         conn.close()
+
+
+def migra_timestamps_epoch_ms(cursor: sqlite3.Cursor):
+    """Converte timestamps em texto ('%Y-%m-%d %H:%M:%S[.fff]') para epoch em milissegundos."""
+    cursor.execute("""
+        UPDATE DADOS_EXPERIMENTO
+        SET timestamp = CAST(strftime('%s', timestamp) AS INTEGER) * 1000
+                      + CAST(ROUND(strftime('%f', timestamp) * 1000) AS INTEGER) % 1000
+        WHERE typeof(timestamp) = 'text'
+    """)
+    logger.info(f"{cursor.rowcount} timestamps convertidos para epoch em milissegundos.")
+
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_dados_experimento_fk_timestamp
+        ON DADOS_EXPERIMENTO (fk_exp, timestamp)
+    """)
+
+def migra_latitude_longitude_invertidas(cursor: sqlite3.Cursor):
+    """Corrige as amostras gravadas com latitude e longitude trocadas pela ingestão do CSV."""
+    cursor.execute("""
+        UPDATE DADOS_EXPERIMENTO
+        SET latitude = longitude, longitude = latitude
+    """)
+    logger.info(f"{cursor.rowcount} amostras com latitude/longitude corrigidas.")
+
+def migra_resumo_experimento(cursor: sqlite3.Cursor):
+    """Calcula o resumo dos experimentos que já possuem dados gravados."""
+    campos = AcumuladorVoo.CAMPOS_RESUMO
+    sql_resumo = f"""
+        INSERT OR REPLACE INTO RESUMO_EXPERIMENTO (fk_exp, {", ".join(campos)})
+        VALUES (?, {", ".join("?" for _ in campos)})
+    """
+
+    ids_experimentos = [linha[0] for linha in cursor.execute("SELECT DISTINCT fk_exp FROM DADOS_EXPERIMENTO").fetchall()]
+    for id_experimento in ids_experimentos:
+        cursor.execute("""
+            SELECT timestamp, speed_kmph, latitude, longitude, altura FROM DADOS_EXPERIMENTO
+            WHERE fk_exp = ?
+            ORDER BY timestamp ASC
+        """, (id_experimento,))
+
+        acumulador = AcumuladorVoo()
+        for timestamp, speed_kmph, latitude, longitude, altura in cursor.fetchall():
+            acumulador.adicionar({
+                'timestamp': timestamp, 'speed_kmph': speed_kmph,
+                'latitude': latitude, 'longitude': longitude, 'altura': altura,
+            })
+
+        resumo = acumulador.para_resumo()
+        cursor.execute(sql_resumo, (id_experimento, *(resumo[campo] for campo in campos)))
+
+    logger.info(f"Resumo calculado para {len(ids_experimentos)} experimentos.")
+
+def _adiciona_coluna(cursor: sqlite3.Cursor, tabela: str, coluna: str, definicao: str):
+    """Adiciona a coluna à tabela caso ainda não exista (tabelas novas já são criadas com ela)."""
+    colunas = [linha[1] for linha in cursor.execute(f"PRAGMA table_info({tabela})").fetchall()]
+    if coluna not in colunas:
+        cursor.execute(f"ALTER TABLE {tabela} ADD COLUMN {coluna} {definicao}")
+
+def migra_versao_dados(cursor: sqlite3.Cursor):
+    """Adiciona a versão dos dados do experimento, usada como chave dos caches."""
+    _adiciona_coluna(cursor, "RESUMO_EXPERIMENTO", "versao", "INTEGER NOT NULL DEFAULT 0")
+
+def _adiciona_bloco_espacial(cursor: sqlite3.Cursor):
+    _adiciona_coluna(cursor, "DADOS_EXPERIMENTO", "bloco_espacial", "INTEGER")
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_dados_experimento_bloco_espacial
+        ON DADOS_EXPERIMENTO (bloco_espacial)
+    """)
+
+def migra_indice_espacial(cursor: sqlite3.Cursor):
+    """Preenche o índice espacial com os dados já gravados."""
+    _adiciona_bloco_espacial(cursor)
+    ids_experimentos = [linha[0] for linha in cursor.execute("SELECT DISTINCT fk_exp FROM DADOS_EXPERIMENTO").fetchall()]
+    for id_experimento in ids_experimentos:
+        reindexar_experimento(cursor, id_experimento)
+
+    logger.info(f"Índice espacial preenchido para {len(ids_experimentos)} experimentos.")
+
+def migra_gatilhos_versao(cursor: sqlite3.Cursor):
+    """
+    Gatilhos que incrementam a versão dos dados quando o experimento é editado ou
+    removido, invalidando os caches de todos os processos (as chaves incluem a versão).
+    """
+    for evento in ("UPDATE", "DELETE"):
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_experimento_{evento.lower()}_versao
+            AFTER {evento} ON EXPERIMENTO
+            BEGIN
+                UPDATE RESUMO_EXPERIMENTO SET versao = versao + 1 WHERE fk_exp = old.id;
+            END
+        """)
+
+def migra_hash_conteudo(cursor: sqlite3.Cursor):
+    """Adiciona o hash do CSV de origem, usado para reconhecer uploads repetidos."""
+    _adiciona_coluna(cursor, "EXPERIMENTO", "hash_conteudo", "CHAR(64)")
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_experimento_hash_conteudo
+        ON EXPERIMENTO (hash_conteudo)
+    """)
+
+def migra_auto_vacuum_incremental(cursor: sqlite3.Cursor):
+    """
+    Ativa o auto_vacuum incremental, que permite devolver ao sistema de arquivos
+    as páginas liberadas pela manutenção (api.core.manutencao). Em bancos já
+    existentes exige um VACUUM, que reescreve o arquivo e roda fora de transação.
+    """
+    if cursor.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+        return
+
+    cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    cursor.execute("VACUUM")
+    logger.info("Banco convertido para auto_vacuum incremental.")
+
+def migra_sparklines(cursor: sqlite3.Cursor):
+    """Calcula as miniaturas dos experimentos que já possuem dados gravados."""
+    ids_experimentos = [linha[0] for linha in cursor.execute("SELECT DISTINCT fk_exp FROM DADOS_EXPERIMENTO").fetchall()]
+    for id_experimento in ids_experimentos:
+        gravar_sparkline(cursor, id_experimento)
+
+    logger.info(f"Miniaturas calculadas para {len(ids_experimentos)} experimentos.")
+
+def migra_modelo_lancamento(cursor: sqlite3.Cursor):
+    """Calcula as estatísticas do modelo de lançamento a partir dos experimentos existentes."""
+    observacoes = recalcular_estatisticas(cursor)
+    logger.info(f"Modelo de lançamento calculado com {observacoes} experimentos.")
+
+def migra_bloco_espacial(cursor: sqlite3.Cursor):
+    """
+    Liga cada amostra ao seu bloco do índice espacial (coluna bloco_espacial),
+    usada pela busca espacial no lugar do intervalo de tempo do bloco.
+    """
+    _adiciona_bloco_espacial(cursor)
+
+    ids_experimentos = [linha[0] for linha in cursor.execute("SELECT DISTINCT fk_exp FROM DADOS_EXPERIMENTO").fetchall()]
+    for id_experimento in ids_experimentos:
+        reindexar_experimento(cursor, id_experimento)
+
+    logger.info(f"Blocos espaciais associados às amostras de {len(ids_experimentos)} experimentos.")
+
+# Migrações aplicadas em ordem; a versão do esquema fica em PRAGMA user_version
+MIGRACOES = [
+    (1, migra_timestamps_epoch_ms),
+    (2, migra_latitude_longitude_invertidas),
+    (3, migra_resumo_experimento),
+    (4, migra_versao_dados),
+    (5, migra_indice_espacial),
+    (6, migra_gatilhos_versao),
+    (7, migra_hash_conteudo),
+    (8, migra_auto_vacuum_incremental),
+    (9, migra_sparklines),
+    (10, migra_modelo_lancamento),
+    (11, migra_bloco_espacial),
+]
+
+# Migrações que não podem rodar dentro de uma transação (VACUUM); devem ser idempotentes
+MIGRACOES_SEM_TRANSACAO = {migra_auto_vacuum_incremental}
+
+def aplicar_migracoes(conn: sqlite3.Connection):
+    """
+    Aplica as migrações pendentes, cada uma em sua própria transação. Com vários
+    workers iniciando juntos, a versão do esquema é relida depois de obtido o
+    lock de escrita (BEGIN IMMEDIATE), então cada migração roda uma única vez.
+    """
+    versao_atual = conn.execute("PRAGMA user_version").fetchone()[0]
+
+    for versao, migracao in MIGRACOES:
+        if versao <= versao_atual:
+            continue
+
+        cursor = conn.cursor()
+        try:
+            if migracao in MIGRACOES_SEM_TRANSACAO:
+                migracao(cursor)
+
+            cursor.execute("BEGIN IMMEDIATE")
+            versao_atual = cursor.execute("PRAGMA user_version").fetchone()[0]
+            if versao <= versao_atual:
+                conn.rollback()
+                logger.info(f"Migração {versao} ({migracao.__name__}) já aplicada por outro processo.")
+                continue
+
+            if migracao not in MIGRACOES_SEM_TRANSACAO:
+                migracao(cursor)
+            cursor.execute(f"PRAGMA user_version = {versao}")
+            conn.commit()
+            versao_atual = versao
+            logger.info(f"Migração {versao} ({migracao.__name__}) aplicada.")
+        except sqlite3.Error as e:
+            conn.rollback()
+            logger.error(f"Erro ao aplicar a migração {versao} ({migracao.__name__}): {e}")
+            raise e
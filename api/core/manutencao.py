@@ -0,0 +1,185 @@
+import asyncio
+import sqlite3
+import time
+import logging, os
+from typing import Any, Dict, List, Optional
+from dotenv import load_dotenv
+from api.core.database import com_conexao
+from api.core.profiling import run_in_threadpool # Roda código síncrono em thread separada
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+# Intervalo entre as rodadas de manutenção em segundo plano (0 desativa)
+MANUTENCAO_INTERVALO_S = float(os.getenv('MANUTENCAO_INTERVALO_S', '300'))
+# Linhas removidas por transação (transações curtas não seguram o lock de escrita)
+MANUTENCAO_LOTE = int(os.getenv('MANUTENCAO_LOTE', '5000'))
+# Páginas livres devolvidas ao sistema de arquivos por rodada (PRAGMA incremental_vacuum)
+MANUTENCAO_PAGINAS_VACUUM = int(os.getenv('MANUTENCAO_PAGINAS_VACUUM', '2000'))
+
+MODOS_AUTO_VACUUM = {0: "none", 1: "full", 2: "incremental"}
+
+# Tabelas com linhas por experimento removidas em lotes (a chave é o id da linha)
+TABELAS_EM_LOTES = ("DADOS_EXPERIMENTO", "DADOS_EXPERIMENTO_RTREE")
+# Tabelas com uma linha por experimento, removidas numa única instrução
+TABELAS_POR_EXPERIMENTO = ("RESUMO_EXPERIMENTO", "INGESTAO_AO_VIVO", "SPARKLINE_EXPERIMENTO")
+
+
+def experimentos_orfaos(db: sqlite3.Connection, tabela: str) -> List[int]:
+    """Ids de experimentos removidos que ainda têm linhas na tabela."""
+    cursor = db.cursor()
+    cursor.execute(f"""
+        SELECT DISTINCT fk_exp FROM {tabela}
+        WHERE fk_exp NOT IN (SELECT id FROM EXPERIMENTO)
+    """)
+
+    return [linha[0] for linha in cursor.fetchall()]
+
+def remover_em_lotes(db: sqlite3.Connection, tabela: str, id_experimento: int, lote: int) -> int:
+    """Remove as linhas do experimento na tabela, uma transação curta por lote."""
+    removidas = 0
+    cursor = db.cursor()
+    while True:
+        try:
+            cursor.execute(f"""
+                DELETE FROM {tabela} WHERE id IN (
+                    SELECT id FROM {tabela} WHERE fk_exp = ? LIMIT ?
+                )
+            """, (id_experimento, lote))
+            db.commit()
+        except sqlite3.Error as e:
+            db.rollback()
+            logger.error(f"Erro ao remover linhas órfãs do experimento {id_experimento} em {tabela}: {e}")
+            raise e
+
+        removidas += cursor.rowcount
+        if cursor.rowcount < lote:
+            return removidas
+
+def recuperar_paginas(db: sqlite3.Connection, paginas: int) -> int:
+    """Devolve até `paginas` páginas livres ao sistema de arquivos (requer auto_vacuum incremental)."""
+    if db.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+        return 0
+
+    livres_antes = db.execute("PRAGMA freelist_count").fetchone()[0]
+    # Via execute, o módulo sqlite3 avança o PRAGMA um único passo (uma página); executescript roda até o fim
+    db.executescript(f"PRAGMA incremental_vacuum({int(paginas)});")
+
+    return livres_antes - db.execute("PRAGMA freelist_count").fetchone()[0]
+
+
+class ManutencaoArmazenamento:
+    """
+    Coleta de lixo das linhas de experimentos removidos (amostras, índice espacial,
+    resumo, concessões de ingestão e miniaturas) e recuperação incremental do espaço liberado.
+
+    A remoção de um experimento apaga apenas a linha em EXPERIMENTO, em uma
+    transação curta; as linhas dependentes são removidas depois, aqui, em lotes.
+    """
+
+    def __init__(self, lote: int = MANUTENCAO_LOTE, paginas_vacuum: int = MANUTENCAO_PAGINAS_VACUUM):
+        self.lote = lote
+        self.paginas_vacuum = paginas_vacuum
+
+        self.execucoes = 0
+        self.removidas: Dict[str, int] = {tabela: 0 for tabela in TABELAS_EM_LOTES + TABELAS_POR_EXPERIMENTO}
+        self.paginas_recuperadas = 0
+        self.ultima_execucao_ms: Optional[int] = None
+        self.ultima_duracao_ms: Optional[float] = None
+
+    def coletar_orfaos(self, db: sqlite3.Connection) -> Dict[str, int]:
+        """Remove as linhas de experimentos que não existem mais e retorna a contagem por tabela."""
+        removidas = {}
+        for tabela in TABELAS_EM_LOTES:
+            removidas[tabela] = sum(
+                remover_em_lotes(db, tabela, id_experimento, self.lote)
+                for id_experimento in experimentos_orfaos(db, tabela)
+            )
+
+        cursor = db.cursor()
+        try:
+            for tabela in TABELAS_POR_EXPERIMENTO:
+                cursor.execute(f"DELETE FROM {tabela} WHERE fk_exp NOT IN (SELECT id FROM EXPERIMENTO)")
+                removidas[tabela] = cursor.rowcount
+            db.commit()
+        except sqlite3.Error as e:
+            db.rollback()
+            logger.error(f"Erro ao remover resumos, concessões e miniaturas órfãos: {e}")
+            raise e
+
+        return removidas
+
+    def executar(self, db: sqlite3.Connection) -> Dict[str, Any]:
+        """Uma rodada completa: coleta dos órfãos seguida do vacuum incremental."""
+        inicio = time.perf_counter()
+        removidas = self.coletar_orfaos(db)
+        paginas = recuperar_paginas(db, self.paginas_vacuum)
+
+        self.execucoes += 1
+        for tabela, quantidade in removidas.items():
+            self.removidas[tabela] += quantidade
+        self.paginas_recuperadas += paginas
+        self.ultima_execucao_ms = int(time.time() * 1000)
+        self.ultima_duracao_ms = round((time.perf_counter() - inicio) * 1000, 1)
+
+        if any(removidas.values()) or paginas:
+            logger.info(f"Manutenção do armazenamento: {removidas}, {paginas} páginas recuperadas em {self.ultima_duracao_ms} ms.")
+
+        return {"removidas": removidas, "paginas_recuperadas": paginas, "duracao_ms": self.ultima_duracao_ms}
+
+    def metricas(self) -> Dict[str, Any]:
+        return {
+            "execucoes": self.execucoes,
+            "removidas": dict(self.removidas),
+            "paginas_recuperadas": self.paginas_recuperadas,
+            "ultima_execucao_ms": self.ultima_execucao_ms,
+            "ultima_duracao_ms": self.ultima_duracao_ms,
+            "intervalo_s": MANUTENCAO_INTERVALO_S,
+        }
+
+    def estatisticas(self, db: sqlite3.Connection) -> Dict[str, Any]:
+        """Uso do arquivo do banco (total, livre e por tabela) e as métricas da manutenção."""
+        tamanho_pagina = db.execute("PRAGMA page_size").fetchone()[0]
+        paginas = db.execute("PRAGMA page_count").fetchone()[0]
+        livres = db.execute("PRAGMA freelist_count").fetchone()[0]
+
+        try:
+            # Tabela virtual dbstat: percorre todas as páginas, mas só é usada aqui
+            tabelas = {
+                nome: round(tamanho / 1024 / 1024, 3)
+                for nome, tamanho in db.execute("SELECT name, SUM(pgsize) FROM dbstat GROUP BY name ORDER BY 2 DESC")
+            }
+        except sqlite3.OperationalError:
+            tabelas = None # SQLite compilado sem SQLITE_ENABLE_DBSTAT_VTAB
+
+        return {
+            "tamanho_mb": round(paginas * tamanho_pagina / 1024 / 1024, 3),
+            "livre_mb": round(livres * tamanho_pagina / 1024 / 1024, 3),
+            "tamanho_pagina": tamanho_pagina,
+            "paginas": paginas,
+            "paginas_livres": livres,
+            "auto_vacuum": MODOS_AUTO_VACUUM.get(db.execute("PRAGMA auto_vacuum").fetchone()[0]),
+            "journal_mode": db.execute("PRAGMA journal_mode").fetchone()[0],
+            "tabelas_mb": tabelas,
+            "manutencao": self.metricas(),
+        }
+
+    async def executar_periodicamente(self, intervalo_s: float = MANUTENCAO_INTERVALO_S):
+        """Laço em segundo plano: uma rodada a cada intervalo_s, em thread separada."""
+        while True:
+            await asyncio.sleep(intervalo_s)
+            try:
+                await run_in_threadpool(com_conexao, self.executar)
+            except sqlite3.Error as e:
+                logger.error(f"Erro na manutenção do armazenamento: {e}")
+
+
+manutencao_armazenamento = ManutencaoArmazenamento()
+
+
+def iniciar_manutencao_periodica() -> Optional[asyncio.Task]:
+    """Agenda a manutenção em segundo plano (cancelar a tarefa no desligamento)."""
+    if MANUTENCAO_INTERVALO_S <= 0:
+        return None
+
+    return asyncio.create_task(manutencao_armazenamento.executar_periodicamente())
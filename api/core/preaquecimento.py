@@ -0,0 +1,45 @@
+import importlib
+import threading
+import time
+import logging, os
+from typing import Optional, Sequence
+from dotenv import load_dotenv
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+# Carrega os módulos pesados em segundo plano após a inicialização (0 desativa)
+PREAQUECER_MODULOS = os.getenv('PREAQUECER_MODULOS', '1') == '1'
+
+# Módulos importados sob demanda pelas rotas (leitura de CSV e gráficos)
+MODULOS_PESADOS = (
+    "pandas",
+    "matplotlib.figure",
+    "matplotlib.backends.backend_agg",
+    "matplotlib.dates",
+)
+
+
+def importar_modulos(modulos: Optional[Sequence[str]] = None):
+    """Importa os módulos informados (padrão: MODULOS_PESADOS), registrando o tempo de cada um."""
+    for modulo in modulos if modulos is not None else MODULOS_PESADOS:
+        inicio = time.perf_counter()
+        try:
+            importlib.import_module(modulo)
+        except ImportError as e:
+            logger.warning(f"Não foi possível pré-carregar o módulo {modulo}: {e}")
+            continue
+        logger.info(f"Módulo {modulo} pré-carregado em {(time.perf_counter() - inicio) * 1000:.0f} ms.")
+
+def preaquecer_em_segundo_plano() -> Optional[threading.Thread]:
+    """
+    Dispara a importação dos módulos pesados numa thread daemon, para que a
+    aplicação já atenda requisições enquanto eles carregam.
+    """
+    if not PREAQUECER_MODULOS:
+        return None
+
+    thread = threading.Thread(target=importar_modulos, name="preaquecimento", daemon=True)
+    thread.start()
+
+    return thread
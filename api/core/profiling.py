@@ -0,0 +1,249 @@
+import cProfile
+import pstats
+import marshal
+import itertools
+import threading
+import sys, os, time, uuid
+import logging
+from collections import Counter, OrderedDict
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional
+from urllib.parse import parse_qs
+from dotenv import load_dotenv
+from fastapi.concurrency import run_in_threadpool as _run_in_threadpool
+from api.core.seguranca import token_admin_valido
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+# Perfilamento sob demanda: "X-Profile: <ADMIN_TOKEN>" ou "?profile=<ADMIN_TOKEN>"
+HEADER_PROFILE = b"x-profile"
+QUERY_PROFILE = "profile"
+
+# 1 a cada N requisições é perfilada em segundo plano (0 desabilita)
+PROFILING_AMOSTRAGEM = int(os.getenv('PROFILING_AMOSTRAGEM', '0'))
+PROFILING_MAX_PERFIS = int(os.getenv('PROFILING_MAX_PERFIS', '50'))
+PROFILING_INTERVALO_MS = float(os.getenv('PROFILING_INTERVALO_MS', '5'))
+
+_sessao_atual: ContextVar[Optional["SessaoPerfil"]] = ContextVar("sessao_perfil", default=None)
+
+
+class SessaoPerfil:
+    """
+    Perfil de uma única requisição: um amostrador de pilhas da thread do event
+    loop e das threads do threadpool usadas pela requisição (formato "collapsed"
+    usado por flame graphs), mais um cProfile em cada chamada no threadpool.
+
+    A thread do event loop não recebe cProfile: ele atravessaria os awaits e
+    mediria corrotinas de outras requisições, e no Python 3.12+ só um cProfile
+    pode estar ativo por vez no interpretador.
+    """
+
+    def __init__(self, metodo: str, caminho: str, modo: str):
+        self.id = uuid.uuid4().hex
+        self.metodo = metodo
+        self.caminho = caminho
+        self.modo = modo
+        self.criado_em = time.time()
+        self.duracao_ms = 0.0
+        self.status = None
+        self.perfis: List[cProfile.Profile] = []
+        self.pilhas: Counter = Counter()
+        self.pstats_bytes = b""
+        self._threads = {threading.get_ident()}
+        self._lock = threading.Lock()
+        self._parar = threading.Event()
+        self._amostrador = threading.Thread(target=self._amostrar, name=f"perfil-{self.id[:8]}", daemon=True)
+
+    def iniciar(self):
+        self._inicio = time.perf_counter()
+        self._amostrador.start()
+
+    def finalizar(self):
+        self._parar.set()
+        self._amostrador.join()
+        self.duracao_ms = round((time.perf_counter() - self._inicio) * 1000, 3)
+
+        stats = None
+        for perfil in self.perfis:
+            if stats is None:
+                stats = pstats.Stats(perfil)
+            else:
+                stats.add(perfil)
+
+        self.pstats_bytes = marshal.dumps(stats.stats) if stats else b""
+
+    def executar_perfilado(self, func: Callable, *args, **kwargs):
+        """
+        Executa func na thread atual, visível ao amostrador, com um cProfile
+        próprio se nenhum outro estiver ativo. O perfilamento nunca faz a
+        requisição falhar: sem cProfile, resta apenas o amostrador.
+        """
+        tid = threading.get_ident()
+        perfil = cProfile.Profile()
+
+        try:
+            perfil.enable()
+        except ValueError as e:
+            logger.warning(f"cProfile indisponível na requisição {self.id}: {e}")
+            perfil = None
+
+        with self._lock:
+            self._threads.add(tid)
+            if perfil is not None:
+                self.perfis.append(perfil)
+
+        try:
+            return func(*args, **kwargs)
+        finally:
+            if perfil is not None:
+                perfil.disable()
+            with self._lock:
+                self._threads.discard(tid)
+
+    def _amostrar(self):
+        intervalo = PROFILING_INTERVALO_MS / 1000
+        while not self._parar.wait(intervalo):
+            with self._lock:
+                threads = tuple(self._threads)
+
+            frames = sys._current_frames()
+            for tid in threads:
+                frame = frames.get(tid)
+                if frame is not None:
+                    self.pilhas[_pilha_collapsed(frame)] += 1
+
+    def collapsed(self) -> str:
+        """Pilhas amostradas no formato "f1;f2;f3 contagem" (flamegraph.pl / speedscope)."""
+        return "".join(f"{pilha} {contagem}\n" for pilha, contagem in self.pilhas.most_common())
+
+    def resumo(self) -> Dict:
+        return {
+            "id": self.id,
+            "metodo": self.metodo,
+            "caminho": self.caminho,
+            "modo": self.modo,
+            "status": self.status,
+            "duracao_ms": self.duracao_ms,
+            "criado_em": self.criado_em,
+            "amostras": sum(self.pilhas.values()),
+        }
+
+
+def _pilha_collapsed(frame) -> str:
+    nomes = []
+    while frame is not None:
+        codigo = frame.f_code
+        nomes.append(f"{os.path.basename(codigo.co_filename)}:{codigo.co_name}:{codigo.co_firstlineno}")
+        frame = frame.f_back
+
+    return ";".join(reversed(nomes))
+
+
+class ArmazemPerfis:
+    """Guarda os últimos perfis em memória, indexados pelo id da requisição."""
+
+    def __init__(self, maximo: int = PROFILING_MAX_PERFIS):
+        self.maximo = maximo
+        self._perfis: "OrderedDict[str, SessaoPerfil]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def adicionar(self, sessao: SessaoPerfil):
+        with self._lock:
+            self._perfis[sessao.id] = sessao
+            while len(self._perfis) > self.maximo:
+                self._perfis.popitem(last=False)
+
+    def obter(self, id_perfil: str) -> Optional[SessaoPerfil]:
+        with self._lock:
+            return self._perfis.get(id_perfil)
+
+    def listar(self) -> List[Dict]:
+        with self._lock:
+            return [sessao.resumo() for sessao in reversed(self._perfis.values())]
+
+    def limpar(self):
+        with self._lock:
+            self._perfis.clear()
+
+
+armazem_perfis = ArmazemPerfis()
+
+
+async def run_in_threadpool(func: Callable, *args, **kwargs):
+    """
+    Substituto de fastapi.concurrency.run_in_threadpool que estende o perfil
+    da requisição atual (se houver) à thread do pool que executa func.
+    """
+    sessao = _sessao_atual.get()
+    if sessao is None:
+        return await _run_in_threadpool(func, *args, **kwargs)
+
+    return await _run_in_threadpool(sessao.executar_perfilado, func, *args, **kwargs)
+
+
+class PerfilamentoMiddleware:
+    """
+    Middleware ASGI que perfila a requisição quando o token de administrador é
+    enviado em X-Profile (ou ?profile=) e, se PROFILING_AMOSTRAGEM > 0, uma a
+    cada N requisições. O id do perfil é devolvido no header X-Profile-Id.
+
+    Apenas uma requisição é perfilada por vez; pedidos concorrentes seguem sem
+    perfil.
+    """
+
+    def __init__(self, app, amostragem: int = PROFILING_AMOSTRAGEM, armazem: ArmazemPerfis = armazem_perfis):
+        self.app = app
+        self.amostragem = amostragem
+        self.armazem = armazem
+        self._contador = itertools.count(1)
+        self._ocupado = threading.Lock()
+
+    def _modo(self, scope) -> Optional[str]:
+        token = dict(scope.get("headers") or []).get(HEADER_PROFILE)
+        if token is not None:
+            token = token.decode("latin-1")
+        else:
+            query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+            token = query.get(QUERY_PROFILE, [None])[0]
+
+        if token is not None:
+            if token_admin_valido(token):
+                return "explicito"
+            logger.warning(f"Pedido de perfilamento com token inválido em {scope.get('path')}.")
+
+        if self.amostragem > 0 and next(self._contador) % self.amostragem == 0:
+            return "amostragem"
+
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        modo = self._modo(scope)
+        if modo is None or not self._ocupado.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        sessao = SessaoPerfil(scope.get("method", ""), scope.get("path", ""), modo)
+        token_ctx = _sessao_atual.set(sessao)
+
+        async def send_com_id(mensagem):
+            if mensagem["type"] == "http.response.start":
+                sessao.status = mensagem["status"]
+                headers = list(mensagem.get("headers", []))
+                headers.append((b"x-profile-id", sessao.id.encode()))
+                mensagem = {**mensagem, "headers": headers}
+            await send(mensagem)
+
+        sessao.iniciar()
+        try:
+            await self.app(scope, receive, send_com_id)
+        finally:
+            _sessao_atual.reset(token_ctx)
+            sessao.finalizar()
+            self._ocupado.release()
+            self.armazem.adicionar(sessao)
+            logger.info(f"Perfil {sessao.id} ({modo}) salvo: {sessao.metodo} {sessao.caminho} em {sessao.duracao_ms} ms.")
@@ -0,0 +1,211 @@
+import sqlite3
+import glob
+import logging, os
+import numpy as np
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Sequence
+from dotenv import load_dotenv
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+# Motor das consultas analíticas: "sqlite" (padrão) ou "duckdb" (Parquet; requer o pacote duckdb)
+ARMAZENAMENTO_ANALITICO = os.getenv('ARMAZENAMENTO_ANALITICO', 'sqlite')
+# Diretório dos arquivos Parquet exportados (um por experimento e versão dos dados)
+ANALITICO_DIRETORIO = os.getenv('ANALITICO_DIRETORIO', 'db/analitico')
+
+COLUNAS_AMOSTRA = ("timestamp", "accel_x", "accel_y", "accel_z", "speed_kmph", "longitude", "latitude", "altura")
+
+# Agregados por experimento; {tabela} é DADOS_EXPERIMENTO (SQLite) ou os Parquet (DuckDB)
+SQL_ESTATISTICAS = """
+    SELECT fk_exp, COUNT(*) AS amostras,
+        MIN(timestamp) AS timestamp_inicial, MAX(timestamp) AS timestamp_final,
+        MIN(altura) AS altura_minima, MAX(altura) AS altura_maxima,
+        MAX(speed_kmph) AS velocidade_maxima,
+        MAX(accel_x * accel_x + accel_y * accel_y + accel_z * accel_z) AS aceleracao_maxima_quadrada
+    FROM {tabela}
+    {filtro}
+    GROUP BY fk_exp
+    ORDER BY fk_exp
+"""
+
+
+class RepositorioAmostras(ABC):
+    """
+    Leitura das amostras para consultas analíticas (gráficos, comparações e
+    agregados entre experimentos). A escrita e as consultas pontuais continuam
+    em api.utils.crud, sobre o SQLite, que é a fonte da verdade.
+    """
+
+    def __init__(self, db: sqlite3.Connection):
+        self.db = db
+
+    @abstractmethod
+    def colunas_experimentos(self, ids_experimentos: Sequence[int],
+                             colunas: Sequence[str] = COLUNAS_AMOSTRA) -> Dict[int, Dict[str, np.ndarray]]:
+        """
+        Vetores NumPy (float, NaN para ausentes) das colunas pedidas, por experimento,
+        ordenados por timestamp. Experimentos sem amostras não aparecem no resultado.
+        """
+
+    @abstractmethod
+    def estatisticas_experimentos(self, ids_experimentos: Optional[Sequence[int]] = None) -> List[Dict[str, Any]]:
+        """Agregados por experimento (todos, se ids_experimentos for None)."""
+
+    @staticmethod
+    def _separa_por_experimento(fk_exp: np.ndarray, valores: Dict[str, np.ndarray]) -> Dict[int, Dict[str, np.ndarray]]:
+        """Divide colunas já ordenadas por (fk_exp, timestamp) em fatias por experimento."""
+        ids, inicios = np.unique(fk_exp, return_index=True)
+        fins = np.r_[inicios[1:], len(fk_exp)]
+
+        return {
+            int(id_experimento): {nome: coluna[inicio:fim] for nome, coluna in valores.items()}
+            for id_experimento, inicio, fim in zip(ids, inicios, fins)
+        }
+
+    @staticmethod
+    def _formata_estatistica(linha: Dict[str, Any]) -> Dict[str, Any]:
+        aceleracao = linha.pop("aceleracao_maxima_quadrada")
+        linha["aceleracao_maxima_imu"] = None if aceleracao is None else float(np.sqrt(aceleracao))
+        return linha
+
+
+class RepositorioSQLite(RepositorioAmostras):
+    """Implementação sobre o próprio SQLite (armazenamento por linhas)."""
+
+    def colunas_experimentos(self, ids_experimentos, colunas=COLUNAS_AMOSTRA):
+        if not ids_experimentos:
+            return {}
+
+        marcadores = ", ".join("?" for _ in ids_experimentos)
+        cursor = self.db.cursor()
+        cursor.execute(f"""
+            SELECT fk_exp, {", ".join(colunas)} FROM DADOS_EXPERIMENTO
+            WHERE fk_exp IN ({marcadores})
+            ORDER BY fk_exp, timestamp ASC
+        """, tuple(ids_experimentos))
+
+        matriz = np.array(cursor.fetchall(), dtype=float).reshape(-1, len(colunas) + 1)
+
+        return self._separa_por_experimento(
+            matriz[:, 0].astype(np.int64), {nome: matriz[:, i + 1] for i, nome in enumerate(colunas)}
+        )
+
+    def estatisticas_experimentos(self, ids_experimentos=None):
+        filtro, parametros = "", ()
+        if ids_experimentos is not None:
+            filtro = f"WHERE fk_exp IN ({', '.join('?' for _ in ids_experimentos)})"
+            parametros = tuple(ids_experimentos)
+
+        cursor = self.db.cursor()
+        cursor.execute(SQL_ESTATISTICAS.format(tabela="DADOS_EXPERIMENTO", filtro=filtro), parametros)
+
+        return [self._formata_estatistica(dict(linha)) for linha in cursor.fetchall()]
+
+
+class RepositorioDuckDB(RepositorioAmostras):
+    """
+    Motor colunar: as amostras de cada experimento são exportadas do SQLite para
+    Parquet (um arquivo por versão dos dados, gerado sob demanda) e consultadas
+    com DuckDB. Requer o pacote opcional duckdb.
+    """
+
+    def __init__(self, db: sqlite3.Connection, diretorio: str = ANALITICO_DIRETORIO):
+        super().__init__(db)
+        import duckdb  # Dependência opcional (requirements-analitico.txt)
+
+        self._duckdb = duckdb
+        self.diretorio = diretorio
+        os.makedirs(diretorio, exist_ok=True)
+
+    def _arquivo_parquet(self, id_experimento: int) -> Optional[str]:
+        """Caminho do Parquet da versão atual dos dados, exportando-o se necessário."""
+        linha = self.db.execute("SELECT versao FROM RESUMO_EXPERIMENTO WHERE fk_exp = ?", (id_experimento,)).fetchone()
+        versao = linha[0] if linha else 0
+        arquivo = os.path.join(self.diretorio, f"experimento_{id_experimento}_v{versao}.parquet")
+        if os.path.exists(arquivo):
+            return arquivo
+
+        colunas = RepositorioSQLite(self.db).colunas_experimentos([id_experimento]).get(id_experimento)
+        if colunas is None:
+            return None
+
+        import pandas as pd
+
+        amostras = pd.DataFrame({"fk_exp": np.full(len(colunas["timestamp"]), id_experimento, dtype=np.int64), **colunas})
+        # Inteiro anulável: amostras sem timestamp ficam NULL no Parquet, como no SQLite
+        amostras["timestamp"] = amostras["timestamp"].astype("Int64")
+
+        # Escreve num arquivo temporário e renomeia: atômico entre processos
+        temporario = f"{arquivo}.{os.getpid()}.tmp"
+        conexao = self._duckdb.connect()
+        try:
+            conexao.register("amostras", amostras)
+            conexao.execute(f"COPY (SELECT * FROM amostras ORDER BY timestamp NULLS FIRST) TO '{temporario}' (FORMAT PARQUET)")
+        finally:
+            conexao.close()
+        os.replace(temporario, arquivo)
+        logger.info(f"Experimento {id_experimento} (versão {versao}) exportado para {arquivo}.")
+
+        for antigo in glob.glob(os.path.join(self.diretorio, f"experimento_{id_experimento}_v*.parquet")):
+            if antigo != arquivo:
+                os.remove(antigo)
+
+        return arquivo
+
+    def _arquivos(self, ids_experimentos: Sequence[int]) -> List[str]:
+        return [arquivo for arquivo in map(self._arquivo_parquet, ids_experimentos) if arquivo is not None]
+
+    def _consulta(self, sql: str, arquivos: List[str]) -> Dict[str, np.ndarray]:
+        conexao = self._duckdb.connect()
+        try:
+            tabela = f"read_parquet([{', '.join(repr(arquivo) for arquivo in arquivos)}])"
+            df = conexao.execute(sql.format(tabela=tabela)).df()
+        finally:
+            conexao.close()
+
+        return {nome: df[nome].to_numpy(dtype=float, na_value=np.nan) for nome in df.columns}
+
+    def colunas_experimentos(self, ids_experimentos, colunas=COLUNAS_AMOSTRA):
+        arquivos = self._arquivos(ids_experimentos)
+        if not arquivos:
+            return {}
+
+        # NULLS FIRST: mesma ordem do SQLite para amostras sem timestamp
+        valores = self._consulta(
+            f"SELECT fk_exp, {', '.join(colunas)} FROM {{tabela}} ORDER BY fk_exp, timestamp NULLS FIRST", arquivos
+        )
+        fk_exp = valores.pop("fk_exp").astype(np.int64)
+
+        return self._separa_por_experimento(fk_exp, valores)
+
+    def estatisticas_experimentos(self, ids_experimentos=None):
+        if ids_experimentos is None:
+            ids_experimentos = [linha[0] for linha in self.db.execute("SELECT id FROM EXPERIMENTO ORDER BY id").fetchall()]
+
+        arquivos = self._arquivos(ids_experimentos)
+        if not arquivos:
+            return []
+
+        valores = self._consulta(SQL_ESTATISTICAS.replace("{filtro}", ""), arquivos)
+        inteiros = ("fk_exp", "amostras", "timestamp_inicial", "timestamp_final")
+
+        return [
+            self._formata_estatistica({
+                nome: (None if np.isnan(coluna[i]) else int(coluna[i]) if nome in inteiros else float(coluna[i]))
+                for nome, coluna in valores.items()
+            })
+            for i in range(len(valores["fk_exp"]))
+        ]
+
+
+def obter_repositorio(db: sqlite3.Connection) -> RepositorioAmostras:
+    """Repositório analítico configurado em ARMAZENAMENTO_ANALITICO."""
+    if ARMAZENAMENTO_ANALITICO == "duckdb":
+        return RepositorioDuckDB(db)
+
+    if ARMAZENAMENTO_ANALITICO != "sqlite":
+        logger.error(f"ARMAZENAMENTO_ANALITICO inválido: {ARMAZENAMENTO_ANALITICO}.")
+        raise ValueError(f"ARMAZENAMENTO_ANALITICO deve ser 'sqlite' ou 'duckdb', não '{ARMAZENAMENTO_ANALITICO}'.")
+
+    return RepositorioSQLite(db)
@@ -0,0 +1,26 @@
+import hmac
+import logging, os
+from typing import Optional
+from dotenv import load_dotenv
+from fastapi import Header, HTTPException
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+ADMIN_TOKEN = os.getenv('ADMIN_TOKEN')
+
+def token_admin_valido(token: Optional[str]) -> bool:
+    """Compara o token informado com o ADMIN_TOKEN configurado no ambiente."""
+    if not ADMIN_TOKEN or not token:
+        return False
+
+    return hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode())
+
+def verifica_admin(x_admin_token: Optional[str] = Header(None, description="Token de administrador")):
+    """Dependência do FastAPI que restringe a rota a administradores."""
+    if not ADMIN_TOKEN:
+        logger.warning("Rota administrativa acessada, mas ADMIN_TOKEN não está configurado.")
+        raise HTTPException(status_code=403, detail="Recursos administrativos desabilitados: defina ADMIN_TOKEN.")
+
+    if not token_admin_valido(x_admin_token):
+        raise HTTPException(status_code=401, detail="Token de administrador inválido.")
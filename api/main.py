@@ -2,7 +2,12 @@ from fastapi import FastAPI
 import logging
 from contextlib import asynccontextmanager
 from api.core.database import create_tables, DATABASE_URL
-from api.routers import experimentos
+from api.routers import experimentos, admin, modelo
+from api.core.profiling import PerfilamentoMiddleware
+from api.core.admissao import AdmissaoIngestaoMiddleware
+from api.utils.graficos import encerrar_executor
+from api.core.preaquecimento import preaquecer_em_segundo_plano
+from api.core.manutencao import iniciar_manutencao_periodica
 from fastapi.middleware.cors import CORSMiddleware
 
 # Configuração de Logging básica
@@ -15,9 +20,14 @@ async def lifespan(app: FastAPI):
     logger.info(f"Conectando ao banco de dados: {DATABASE_URL}")
     create_tables()
     logger.info("Aplicação iniciando... Tabelas do banco de dados verificadas/criadas.")
+    preaquecer_em_segundo_plano()
+    tarefa_manutencao = iniciar_manutencao_periodica()
     yield
 
     logger.info("Aplicação desligando...")
+    if tarefa_manutencao:
+        tarefa_manutencao.cancel()
+    encerrar_executor()
 
 app = FastAPI(
     title="API de Experimentos Científicos",
@@ -26,7 +36,14 @@ app = FastAPI(
     lifespan=lifespan
 )
 
-# CORS
+# Controle de admissão dos uploads de CSV (fila, limite de concorrência e de memória)
+app.add_middleware(AdmissaoIngestaoMiddleware)
+
+# Perfilamento sob demanda (X-Profile) e por amostragem (PROFILING_AMOSTRAGEM)
+app.add_middleware(PerfilamentoMiddleware)
+
+# CORS: adicionado por último para ser a camada externa e cobrir também as
+# respostas 503/413 do controle de admissão
 origins = ["*"]
 
 app.add_middleware(
@@ -35,9 +52,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Retry-After"],
 )
 
 app.include_router(experimentos.router)
+app.include_router(modelo.router)
+app.include_router(admin.router)
 
 @app.get("/", tags=["Root"], summary="Verifica se a API está online")
 async def read_root():
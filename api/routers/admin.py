@@ -0,0 +1,151 @@
+from fastapi import APIRouter, HTTPException, Depends, File, Form, Query, UploadFile
+from fastapi.responses import FileResponse, Response
+from typing import Optional
+import sqlite3
+import logging
+import api.core.backup as backup
+import api.utils.snapshots as snapshots
+from api.core.profiling import armazem_perfis
+from api.core.admissao import controle_admissao
+from api.utils.cache import cache_resultados, execucao_unica
+from api.core.manutencao import manutencao_armazenamento
+from api.core.database import com_conexao
+from api.core.profiling import run_in_threadpool
+from api.core.seguranca import verifica_admin
+
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(
+    prefix="/admin",
+    tags=["Administração"],
+    dependencies=[Depends(verifica_admin)]
+)
+
+def busca_perfil(id_perfil: str):
+    sessao = armazem_perfis.obter(id_perfil)
+    if not sessao:
+        raise HTTPException(status_code=404, detail=f"Perfil {id_perfil} não encontrado.")
+
+    return sessao
+
+@router.get("/perfis", summary="Lista os perfis de requisições armazenados")
+async def lista_perfis():
+    return {
+        "perfis": armazem_perfis.listar()
+    }
+
+@router.get("/perfis/{id_perfil}.pstats", summary="Baixa o perfil no formato pstats (cProfile)")
+async def baixa_perfil_pstats(id_perfil: str):
+    sessao = busca_perfil(id_perfil)
+
+    return Response(
+        content=sessao.pstats_bytes,
+        media_type="application/octet-stream",
+        headers={
+            "Content-Disposition": f"attachment; filename=perfil_{sessao.id}.pstats"
+        }
+    )
+
+@router.get("/perfis/{id_perfil}.collapsed", summary="Baixa as pilhas amostradas no formato collapsed (flame graph)")
+async def baixa_perfil_collapsed(id_perfil: str):
+    sessao = busca_perfil(id_perfil)
+
+    return Response(
+        content=sessao.collapsed(),
+        media_type="text/plain",
+        headers={
+            "Content-Disposition": f"attachment; filename=perfil_{sessao.id}.collapsed"
+        }
+    )
+
+@router.delete("/perfis", summary="Remove todos os perfis armazenados")
+async def limpa_perfis():
+    armazem_perfis.limpar()
+
+    return {
+        "mensagem": "Perfis removidos com sucesso!"
+    }
+
+@router.get("/ingestao", summary="Métricas do controle de admissão dos uploads de CSV")
+async def metricas_ingestao():
+    return controle_admissao.metricas()
+
+@router.get("/armazenamento", summary="Uso de espaço do banco e métricas da manutenção")
+async def estatisticas_armazenamento():
+    return await run_in_threadpool(com_conexao, manutencao_armazenamento.estatisticas)
+
+@router.post("/armazenamento/manutencao", summary="Executa agora a coleta de órfãos e o vacuum incremental")
+async def executa_manutencao():
+    return await run_in_threadpool(com_conexao, manutencao_armazenamento.executar)
+
+@router.post("/backup", summary="Cria um backup online do banco (cópia incremental, sem parar as requisições)")
+async def cria_backup():
+    try:
+        return await run_in_threadpool(com_conexao, backup.criar_backup)
+    except backup.BackupEmAndamento as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except sqlite3.Error as e:
+        logger.error(f"Erro ao criar o backup: {e}")
+        raise HTTPException(status_code=500, detail=f"Erro ao criar o backup: {str(e)}")
+
+@router.get("/backup", summary="Lista os backups disponíveis")
+async def lista_backups():
+    return {
+        "backups": backup.listar_backups()
+    }
+
+@router.get("/backup/{arquivo}", summary="Baixa um backup do banco")
+async def baixa_backup(arquivo: str):
+    caminho = backup.caminho_backup(arquivo)
+    if not caminho:
+        raise HTTPException(status_code=404, detail=f"Backup {arquivo} não encontrado.")
+
+    return FileResponse(caminho, media_type="application/vnd.sqlite3", filename=arquivo)
+
+@router.get("/snapshots", summary="Exporta experimentos (metadados e amostras) num arquivo ZIP compacto")
+async def exporta_snapshot(
+    ids: Optional[str] = Query(None, description="IDs dos experimentos separados por vírgula (todos, se omitido)")
+):
+    ids_experimentos = None
+    if ids:
+        try:
+            ids_experimentos = list(dict.fromkeys(int(valor) for valor in ids.split(",") if valor.strip()))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="ids deve conter números inteiros separados por vírgula.")
+
+    conteudo = await run_in_threadpool(com_conexao, snapshots.exportar_snapshot, ids_experimentos)
+    if conteudo is None:
+        raise HTTPException(status_code=404, detail="Um ou mais experimentos não foram encontrados.")
+
+    return Response(
+        conteudo,
+        media_type="application/zip",
+        headers={"Content-Disposition": "attachment; filename=snapshot_experimentos.zip"}
+    )
+
+@router.post("/snapshots", summary="Importa os experimentos de um snapshot como experimentos novos")
+async def importa_snapshot(
+    arquivo: UploadFile = File(..., description="Snapshot gerado por GET /admin/snapshots"),
+    forcar: bool = Form(False, description="Importa também os experimentos cujo CSV já está no banco")
+):
+    conteudo = await arquivo.read()
+    try:
+        experimentos = await run_in_threadpool(com_conexao, snapshots.importar_snapshot, conteudo, forcar)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except sqlite3.Error as e:
+        logger.error(f"Erro ao importar o snapshot: {e}")
+        raise HTTPException(status_code=500, detail=f"Erro de banco de dados: {str(e)}")
+
+    return {
+        "mensagem": f"{sum(not item['duplicado'] for item in experimentos)} experimentos importados.",
+        "experimentos": experimentos
+    }
+
+@router.get("/cache", summary="Estatísticas do cache de resultados e do agrupamento de requisições idênticas")
+async def estatisticas_cache():
+    return {
+        "cache": cache_resultados.estatisticas(),
+        "execucao_unica": execucao_unica.estatisticas()
+    }
@@ -1,16 +1,26 @@
-from fastapi import APIRouter, File, UploadFile, Form, HTTPException, Depends
-from fastapi.concurrency import run_in_threadpool # Importado para rodar código síncrono em thread separada
-from typing import Annotated
+from fastapi import APIRouter, File, UploadFile, Form, HTTPException, Depends, Query, WebSocket, WebSocketDisconnect
+from api.core.profiling import run_in_threadpool # Roda código síncrono em thread separada (estendendo o perfil da requisição)
+from typing import Annotated, Optional
 from datetime import datetime
+from pydantic import ValidationError
+import asyncio, json
 
-from fastapi.responses import StreamingResponse
-from api.utils.formatacao import gerar_csv_dados
-from api.utils.graficos_teste import plot_distancia_acumulada_vs_tempo
+from fastapi.responses import JSONResponse, Response
+from api.utils.telemetria import experimento_para_json
 import sqlite3
 import logging, traceback
 import api.utils.crud as crud
+import api.utils.trajetoria as trajetoria
+import api.utils.espacial as espacial
+import api.utils.analise as analise
+import api.utils.filtragem as filtragem
+import api.utils.graficos as graficos
+import api.utils.comparacao as comparacao
+import api.utils.deduplicacao as deduplicacao
 import api.schemas.schemas as schemas
-from api.core.database import get_db_connection
+from api.core.database import com_conexao, get_db_connection
+from api.utils.cache import execucao_unica
+from api.utils.ao_vivo import gerenciador_ao_vivo
 
 
 logger = logging.getLogger(__name__)
@@ -30,16 +40,150 @@ def get_db():
 DbDependency = Annotated[sqlite3.Connection, Depends(get_db)]
 
 @router.get("")
-async def busca_todos_experimentos(db:DbDependency):
-    exp = await run_in_threadpool(crud.select_todos_experimentos, db)
+async def busca_todos_experimentos(
+    db: DbDependency,
+    incluir: Optional[str] = Query(None, pattern="^sparkline$", description="sparkline: inclui as miniaturas de altura e distância")
+):
+    exp = await run_in_threadpool(crud.select_todos_experimentos, db, incluir == "sparkline")
     
     return exp
 
+@router.get("/busca/retangulo", summary="Experimentos com amostras dentro de um retângulo geográfico")
+async def busca_experimentos_retangulo(
+    db: DbDependency,
+    lat_min: float = Query(..., ge=-90, le=90),
+    lat_max: float = Query(..., ge=-90, le=90),
+    lon_min: float = Query(..., ge=-180, le=180),
+    lon_max: float = Query(..., ge=-180, le=180)
+):
+    if lat_min > lat_max or lon_min > lon_max:
+        raise HTTPException(status_code=400, detail="Retângulo inválido: os mínimos devem ser menores que os máximos.")
+
+    return await run_in_threadpool(espacial.busca_por_retangulo, db, lat_min, lat_max, lon_min, lon_max)
+
+@router.get("/busca/raio", summary="Experimentos com amostras a até um raio (metros) de um ponto")
+async def busca_experimentos_raio(
+    db: DbDependency,
+    latitude: float = Query(..., ge=-90, le=90),
+    longitude: float = Query(..., ge=-180, le=180),
+    raio: float = Query(..., gt=0, description="Raio em metros")
+):
+    return await run_in_threadpool(espacial.busca_por_raio, db, latitude, longitude, raio)
+
+@router.get("/estatisticas", summary="Agregados por experimento calculados pelo motor analítico")
+async def estatisticas_experimentos(
+    db: DbDependency,
+    ids: Optional[str] = Query(None, description="IDs dos experimentos separados por vírgula (todos, se omitido)")
+):
+    ids_experimentos = None
+    if ids:
+        try:
+            ids_experimentos = list(dict.fromkeys(int(valor) for valor in ids.split(",") if valor.strip()))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="ids deve conter números inteiros separados por vírgula.")
+
+    return await run_in_threadpool(comparacao.estatisticas_experimentos, db, ids_experimentos)
+
+@router.get("/comparar", summary="Compara experimentos numa grade de tempo comum desde o lançamento")
+async def compara_experimentos(
+    db: DbDependency,
+    ids: str = Query(..., description="IDs dos experimentos separados por vírgula"),
+    passo: float = Query(0.1, gt=0, description="Passo da grade em segundos"),
+    antes: float = Query(0.0, ge=0, description="Segundos antes do lançamento incluídos na grade")
+):
+    try:
+        ids_experimentos = list(dict.fromkeys(int(valor) for valor in ids.split(",") if valor.strip()))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids deve conter números inteiros separados por vírgula.")
+
+    if not ids_experimentos:
+        raise HTTPException(status_code=400, detail="Informe ao menos um experimento.")
+
+    resultado = await run_in_threadpool(comparacao.compara_experimentos, db, ids_experimentos, passo, antes)
+    if resultado is None:
+        raise HTTPException(status_code=404, detail="Um ou mais experimentos não foram encontrados.")
+
+    return resultado
+
+@router.get("/graficos", summary="Gera vários gráficos (de um ou mais experimentos) em uma única requisição")
+async def gera_graficos(
+    db: DbDependency,
+    ids: str = Query(..., description="IDs dos experimentos separados por vírgula"),
+    tipos: str = Query(",".join(graficos.TIPOS_GRAFICO), description="Gráficos separados por vírgula: distancia, velocidade, aceleracao"),
+    sobrepor: bool = Query(False, description="Um gráfico por tipo com todos os experimentos (tempo desde o início)"),
+    formato: str = Query("zip", pattern="^(zip|multipart)$")
+):
+    try:
+        ids_experimentos = [int(valor) for valor in ids.split(",") if valor.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids deve conter números inteiros separados por vírgula.")
+
+    tipos_graficos = [tipo.strip() for tipo in tipos.split(",") if tipo.strip()]
+    invalidos = [tipo for tipo in tipos_graficos if tipo not in graficos.TIPOS_GRAFICO]
+    if not ids_experimentos or not tipos_graficos or invalidos:
+        raise HTTPException(status_code=400, detail=f"Parâmetros inválidos. Tipos disponíveis: {', '.join(graficos.TIPOS_GRAFICO)}.")
+
+    async def gerar():
+        series = await run_in_threadpool(com_conexao, graficos.carregar_series, ids_experimentos)
+        nao_encontrados = [id_experimento for id_experimento in ids_experimentos if id_experimento not in series]
+        if nao_encontrados:
+            raise HTTPException(status_code=404, detail=f"Experimentos não encontrados: {nao_encontrados}")
+
+        matriz, tarefas = graficos.planejar_graficos(series, tipos_graficos, sobrepor)
+        arquivos = await graficos.renderizar_graficos(matriz, tarefas)
+
+        if formato == "multipart":
+            return graficos.empacotar_multipart(arquivos)
+        return graficos.empacotar_zip(arquivos), None
+
+    # Requisições idênticas simultâneas (ex.: telão e vários clientes) compartilham a renderização
+    versoes = await run_in_threadpool(crud.select_versoes_dados, db, ids_experimentos)
+    chave = ("graficos", tuple(versoes.items()), tuple(tipos_graficos), sobrepor, formato)
+    corpo, boundary = await execucao_unica.executar(chave, gerar)
+
+    if formato == "multipart":
+        return Response(corpo, media_type=f"multipart/mixed; boundary={boundary}")
+
+    return Response(
+        corpo,
+        media_type="application/zip",
+        headers={"Content-Disposition": "attachment; filename=graficos.zip"}
+    )
+
 @router.get("/{id_experimento}")
-async def busca_experimento(db:DbDependency, id_experimento):
-    exp = await run_in_threadpool(crud.select_experimento_completo, db, id_experimento)
-    
-    return exp
+async def busca_experimento(
+    db:DbDependency,
+    id_experimento,
+    inicio: Optional[int] = Query(None, description="Início do intervalo (epoch em ms)"),
+    fim: Optional[int] = Query(None, description="Fim do intervalo (epoch em ms)"),
+    filtrado: bool = Query(False, description="Usa a série suavizada (Kalman GPS/IMU) e a distância calculada sobre ela"),
+    formato: str = Query("json", pattern="^(json|npy)$", description="json ou npy (dados associados como array estruturado NumPy)")
+):
+    selecionar = filtragem.select_experimento_filtrado if filtrado else crud.select_experimento_completo
+
+    def serializar(db_conexao: sqlite3.Connection) -> Optional[bytes]:
+        exp = selecionar(db_conexao, id_experimento, inicio, fim)
+        if exp is None:
+            return None
+        if formato == "npy":
+            return exp["dados_associados"].para_npy()
+        return experimento_para_json(exp).encode()
+
+    # Leituras idênticas simultâneas compartilham a consulta e a serialização (conexão
+    # própria, pois a computação pode sobreviver à requisição que a iniciou)
+    versao = await run_in_threadpool(crud.select_versao_dados, db, id_experimento)
+    corpo = await execucao_unica.executar(
+        ("experimento", str(id_experimento), versao, inicio, fim, filtrado, formato),
+        lambda: run_in_threadpool(com_conexao, serializar)
+    )
+
+    if corpo is None:
+        return None
+    if formato == "npy":
+        return Response(corpo, media_type="application/octet-stream",
+                        headers={"Content-Disposition": f"attachment; filename=experimento_{id_experimento}.npy"})
+
+    return Response(corpo, media_type="application/json")
 
 @router.post("/novo", summary="Cria um novo experimento com dados de um CSV")
 async def criar_novo_experimento_rota(
@@ -50,7 +194,8 @@ async def criar_novo_experimento_rota(
     pressaoBar: float = Form(..., description="Pressão da água em BAR"),
     volumeAgua: float = Form(..., description="Quantidade de ml de água"),
     massaTotalFoguete: float = Form(..., description="Peso do foguete em gramas"),
-    arquivoDados: UploadFile = File(..., description="Arquivo CSV com os dados do lançamento/experimento")
+    arquivoDados: UploadFile = File(..., description="Arquivo CSV com os dados do lançamento/experimento"),
+    forcarNovo: bool = Form(False, description="Cria um novo experimento mesmo que o mesmo CSV já tenha sido enviado")
 ):
 
     # Verificação para formatação de data e formato do arquivo enviado
@@ -84,16 +229,52 @@ async def criar_novo_experimento_rota(
     registros_csv_salvos = 0
 
     try:
+        # Leitura assíncrona em blocos, calculando o hash do conteúdo normalizado
+        conteudo_csv_bytes, hash_conteudo = await deduplicacao.ler_upload_com_hash(arquivoDados)
+
+        # Upload repetido: devolve o experimento existente sem ler nem gravar o CSV
+        if conteudo_csv_bytes and not forcarNovo:
+            existente = await run_in_threadpool(crud.select_experimento_por_hash, db, hash_conteudo)
+            if existente:
+                logger.info(f"CSV '{arquivoDados.filename}' já enviado no experimento ID {existente['id']}; upload ignorado.")
+
+                return {
+                    "mensagem": "Este CSV já foi enviado; nenhum experimento novo foi criado.",
+                    "experimento_id": existente["id"],
+                    "nome_experimento": existente["nomeExperimento"],
+                    "data_experimento": existente["dataExperimento"],
+                    "nome_arquivo_csv": arquivoDados.filename,
+                    "registros_csv_processados": 0,
+                    "duplicado": True
+                }
+
         experimento_id = await run_in_threadpool(
             crud.create_experimento_db, db, experimento_schema, data_experimento_obj
         )
-        
-        conteudo_csv_bytes = await arquivoDados.read() # Leitura do arquivo é assíncrona
-        
+
         if conteudo_csv_bytes: # Verifica se o arquivo tem conteúdo
             registros_csv_salvos = await run_in_threadpool(
                 crud.processar_e_salvar_csv, db, conteudo_csv_bytes, experimento_id
             )
+
+            # O hash só é gravado após a ingestão; outro upload do mesmo CSV pode ter terminado antes
+            id_existente = await run_in_threadpool(
+                crud.registrar_hash_conteudo, db, experimento_id, hash_conteudo, forcarNovo
+            )
+            if id_existente is not None:
+                await run_in_threadpool(crud.delete_experimento, db, experimento_id)
+                existente = await run_in_threadpool(crud.select_experimento, db, id_existente)
+                logger.info(f"CSV '{arquivoDados.filename}' gravado antes no experimento ID {id_existente}; cópia removida.")
+
+                return {
+                    "mensagem": "Este CSV já foi enviado; nenhum experimento novo foi criado.",
+                    "experimento_id": id_existente,
+                    "nome_experimento": existente["nomeExperimento"],
+                    "data_experimento": existente["dataExperimento"],
+                    "nome_arquivo_csv": arquivoDados.filename,
+                    "registros_csv_processados": 0,
+                    "duplicado": True
+                }
         else:
             logger.info(f"Arquivo CSV '{arquivoDados.filename}' está vazio, nenhum dado de CSV para processar.")
 
@@ -122,7 +303,86 @@ async def criar_novo_experimento_rota(
         "nome_experimento": nomeExperimento,
         "data_experimento": data_experimento_obj.isoformat(),
         "nome_arquivo_csv": arquivoDados.filename,
-        "registros_csv_processados": registros_csv_salvos
+        "registros_csv_processados": registros_csv_salvos,
+        "duplicado": False
+    }
+
+@router.post("/{id_experimento}/dados", summary="Acrescenta dados de um CSV a um experimento existente")
+async def adicionar_dados_experimento_rota(
+    id_experimento: int,
+    db: DbDependency,
+    arquivoDados: UploadFile = File(..., description="Arquivo CSV com dados adicionais do lançamento/experimento")
+):
+    if not arquivoDados.filename.endswith(('.csv', '.CSV')):
+        raise HTTPException(
+            status_code=400,
+            detail="Tipo de arquivo inválido para 'arquivoDados'. Envie um arquivo CSV."
+        )
+
+    experimento = await run_in_threadpool(crud.select_experimento, db, id_experimento)
+    if not experimento:
+        raise HTTPException(status_code=404, detail=f"Experimento com id {id_experimento} não encontrado.")
+
+    try:
+        conteudo_csv_bytes = await arquivoDados.read()
+        resultado = await run_in_threadpool(crud.adicionar_dados_csv, db, conteudo_csv_bytes, id_experimento)
+
+    except sqlite3.Error as e_db:
+        logger.error(f"Erro de banco de dados na rota: {e_db}")
+
+        raise HTTPException(status_code=500, detail=f"Erro de banco de dados: {str(e_db)}")
+
+    except ValueError as e_val:
+        logger.error(f"Erro de validação/processamento de dados: {e_val}")
+
+        raise HTTPException(status_code=400, detail=str(e_val))
+
+    return {
+        "mensagem": "Dados do CSV acrescentados ao experimento com sucesso!",
+        "experimento_id": id_experimento,
+        "nome_arquivo_csv": arquivoDados.filename,
+        **resultado
+    }
+
+@router.get("/{id_experimento}/resumo", summary="Retorna os valores de resumo do voo de um experimento")
+async def busca_resumo_experimento(db: DbDependency, id_experimento: int):
+    experimento = await run_in_threadpool(crud.select_experimento, db, id_experimento)
+    if not experimento:
+        raise HTTPException(status_code=404, detail=f"Experimento com id {id_experimento} não encontrado.")
+
+    resumo = await run_in_threadpool(crud.select_resumo_experimento, db, id_experimento)
+
+    return {
+        "experimento": experimento,
+        "resumo": resumo
+    }
+
+@router.get("/{id_experimento}/trajetoria.geojson", summary="Trajetória do voo simplificada em GeoJSON")
+async def busca_trajetoria_geojson(
+    db: DbDependency,
+    id_experimento: int,
+    tolerancia: float = Query(1.0, ge=0, description="Tolerância da simplificação (Douglas-Peucker) em metros"),
+    propriedades: bool = Query(True, description="Inclui altitude nas coordenadas e tempo/altura/velocidade por vértice")
+):
+    experimento = await run_in_threadpool(crud.select_experimento, db, id_experimento)
+    if not experimento:
+        raise HTTPException(status_code=404, detail=f"Experimento com id {id_experimento} não encontrado.")
+
+    geojson = await run_in_threadpool(trajetoria.busca_trajetoria_geojson, db, id_experimento, tolerancia, propriedades)
+
+    return JSONResponse(content=geojson, media_type="application/geo+json")
+
+@router.get("/{id_experimento}/analise", summary="Fases do voo e métricas físicas do experimento")
+async def busca_analise_experimento(db: DbDependency, id_experimento: int):
+    experimento = await run_in_threadpool(crud.select_experimento, db, id_experimento)
+    if not experimento:
+        raise HTTPException(status_code=404, detail=f"Experimento com id {id_experimento} não encontrado.")
+
+    analise_voo = await run_in_threadpool(analise.busca_analise, db, id_experimento)
+
+    return {
+        "experimento": experimento,
+        "analise": analise_voo
     }
 
 @router.put("/{id_experimento}", summary="Atualiza (substitui) um experimento")
@@ -136,7 +396,7 @@ async def atualizar_experimento_completo_rota(
     volumeAgua: float = Form(..., description="Quantidade de ml de água"),
     massaTotalFoguete: float = Form(..., description="Peso do foguete em gramas")
 ):
-    experimento_existente = await run_in_threadpool(crud.select_experimento_completo, db, id_experimento)
+    experimento_existente = await run_in_threadpool(crud.select_experimento, db, id_experimento)
     if not experimento_existente:
         raise HTTPException(status_code=404, detail=f"Experimento com id {id_experimento} não encontrado.")
 
@@ -194,21 +454,33 @@ async def deleta_experimento(db:DbDependency, id_experimento):
         "mensagem": f"Experimento com ID {id_experimento} deletado com sucesso!"
         }
 
+def _gera_csv_experimento(db: sqlite3.Connection, id_experimento) -> Optional[tuple]:
+    """Nome do experimento e conteúdo do CSV com seus dados, ou None se não existir."""
+    exp = crud.select_experimento_completo(db, id_experimento)
+    if not exp:
+        return None
+
+    return exp['experimento']['nomeExperimento'], exp['dados_associados'].para_csv()
+
 @router.get("/download-csv/{id_experimento}")
 async def faz_download_csv_experimento(db: DbDependency, id_experimento):
     try:
-        exp = await run_in_threadpool(crud.select_experimento_completo, db, id_experimento)
+        versao = await run_in_threadpool(crud.select_versao_dados, db, id_experimento)
+        exp_csv = await execucao_unica.executar(
+            ("csv", str(id_experimento), versao),
+            lambda: run_in_threadpool(com_conexao, _gera_csv_experimento, id_experimento)
+        )
 
-        if not exp:
+        if not exp_csv:
             raise HTTPException(status_code=404, detail="Item não encontrado apra gerar CSV")
 
-        saida_csv = gerar_csv_dados(exp['dados_associados'])
+        nome, saida_csv = exp_csv
         
-        return StreamingResponse(
+        return Response(
             saida_csv,
             media_type="text/csv",
             headers={
-                "Content-Disposition": f"attachment; filename={exp['experimento']['nome']}.csv"
+                "Content-Disposition": f"attachment; filename={nome}.csv"
             }
         )    
         
@@ -223,4 +495,90 @@ async def faz_download_csv_experimento(db: DbDependency, id_experimento):
 
 @router.get("/gerar-grafico/{id_experimento}")
 async def mostra_grafico(id_experimento):
-    plot_distancia_acumulada_vs_tempo(id_experimento)
\ No newline at end of file
+    # Importado sob demanda: carrega o matplotlib.pyplot apenas quando usado
+    from api.utils.graficos_teste import plot_distancia_acumulada_vs_tempo
+
+    plot_distancia_acumulada_vs_tempo(id_experimento)
+
+
+@router.websocket("/{id_experimento}/ao-vivo/ingestao")
+async def ingestao_ao_vivo(websocket: WebSocket, id_experimento: int):
+    """
+    Recebe amostras da estação de solo (objeto JSON ou lista, com as colunas do CSV),
+    distribui cada amostra enriquecida aos painéis e grava em micro-lotes.
+    """
+    canal = await gerenciador_ao_vivo.obter_canal(id_experimento)
+    if canal is None:
+        await websocket.close(code=1008, reason=f"Experimento com id {id_experimento} não encontrado.")
+        return
+
+    if not await canal.iniciar_ingestao():
+        await websocket.close(code=1013, reason="Já existe uma ingestão ao vivo para este experimento.")
+        gerenciador_ao_vivo.liberar_canal(canal)
+        return
+
+    await websocket.accept()
+    gravador = asyncio.create_task(canal.gravador())
+    logger.info(f"Ingestão ao vivo iniciada para o experimento {id_experimento}.")
+
+    try:
+        while True:
+            mensagem = await websocket.receive_text()
+            try:
+                amostras = json.loads(mensagem)
+            except json.JSONDecodeError:
+                await websocket.send_json({"erro": "Mensagem não é um JSON válido."})
+                continue
+
+            for amostra in (amostras if isinstance(amostras, list) else [amostras]):
+                try:
+                    canal.receber(schemas.AmostraTelemetria.model_validate(amostra).model_dump())
+                except (ValidationError, ValueError) as e_val:
+                    await websocket.send_json({"erro": str(e_val), "amostra": amostra})
+
+            if canal.concessao_perdida:
+                await websocket.close(code=1013, reason="A ingestão deste experimento foi assumida por outro processo.")
+                break
+
+    except WebSocketDisconnect:
+        logger.info(f"Ingestão ao vivo encerrada para o experimento {id_experimento}.")
+
+    finally:
+        gravador.cancel()
+        try:
+            await gravador
+        except asyncio.CancelledError:
+            pass
+
+        await canal.encerrar_ingestao()
+        gerenciador_ao_vivo.liberar_canal(canal)
+
+@router.websocket("/{id_experimento}/ao-vivo")
+async def acompanha_ao_vivo(websocket: WebSocket, id_experimento: int):
+    """
+    Envia aos painéis cada amostra enriquecida recebida pela ingestão ao vivo.
+    Assinantes que não acompanham o ritmo são desconectados (código 1013).
+    """
+    canal = await gerenciador_ao_vivo.obter_canal(id_experimento)
+    if canal is None:
+        await websocket.close(code=1008, reason=f"Experimento com id {id_experimento} não encontrado.")
+        return
+
+    await websocket.accept()
+    assinante = canal.inscrever()
+
+    try:
+        while True:
+            amostra = await assinante.fila.get()
+            if amostra is None:
+                await websocket.close(code=1013, reason="Assinante lento descartado.")
+                break
+
+            await websocket.send_json(amostra)
+
+    except WebSocketDisconnect:
+        pass
+
+    finally:
+        canal.cancelar(assinante)
+        gerenciador_ao_vivo.liberar_canal(canal)
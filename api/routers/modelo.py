@@ -0,0 +1,50 @@
+from fastapi import APIRouter, HTTPException, Depends
+from api.core.profiling import run_in_threadpool
+from typing import Annotated
+import sqlite3
+import logging
+import api.utils.modelo as modelo
+import api.schemas.schemas as schemas
+from api.core.database import get_db_connection
+
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(
+    prefix="/modelo",
+    tags=["Modelo de lançamento"]
+)
+
+def get_db():
+    db = get_db_connection()
+    try:
+        yield db
+    finally:
+        db.close()
+
+DbDependency = Annotated[sqlite3.Connection, Depends(get_db)]
+
+@router.get("", summary="Coeficientes e qualidade do ajuste de alcance e apogeu")
+async def busca_modelo(db: DbDependency):
+    return await run_in_threadpool(modelo.busca_modelo, db)
+
+@router.post("/prever", summary="Prevê alcance e apogeu para os parâmetros de lançamento propostos")
+async def prever_lancamento(db: DbDependency, parametros: schemas.ParametrosLancamento):
+    previsoes = await run_in_threadpool(modelo.prever, db, [{
+        "pressao_psi": parametros.pressaoBar,
+        "volume_agua": parametros.volumeAgua,
+        "massa_total_foguete": parametros.massaTotalFoguete,
+    }])
+
+    alcance, apogeu = previsoes["alcance"][0], previsoes["apogeu"][0]
+    if alcance is None:
+        raise HTTPException(status_code=404, detail=(
+            f"O modelo precisa de ao menos {modelo.MINIMO_OBSERVACOES} experimentos com dados, "
+            "com pressão, volume de água e massa variando entre eles, para ser ajustado."
+        ))
+
+    return {
+        "alcance_previsto_m": alcance,
+        "apogeu_previsto_m": apogeu,
+        "diferenca_alvo_m": None if parametros.distanciaAlvo is None else alcance - parametros.distanciaAlvo,
+    }
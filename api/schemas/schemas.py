@@ -1,6 +1,7 @@
 from pydantic import BaseModel, field_validator, ConfigDict
 from typing import Optional
 from datetime import datetime
+from api.utils.formatacao import timestamp_para_epoch_ms
 
 class ExperimentoBase(BaseModel):
     nomeExperimento: str
@@ -49,7 +50,35 @@ class DadosCSV(BaseModel):
     latitude: Optional[float] = None
     longitude: Optional[float] = None
     altitude: Optional[float] = None
-    timestamp: Optional[str] = None
+    timestamp: Optional[int] = None  # Epoch em milissegundos (UTC)
     speed_kmph: Optional[float] = None
     # satellites: Optional[int] = None
     # hdop: Optional[float] = None
+
+
+# Amostra enviada pela estação de solo na ingestão ao vivo (mesmas colunas do CSV)
+class AmostraTelemetria(BaseModel):
+    timestamp: int  # Epoch em milissegundos (UTC); aceita também texto ISO 8601
+    accel_x: Optional[float] = None
+    accel_y: Optional[float] = None
+    accel_z: Optional[float] = None
+    speed_kmph: Optional[float] = None
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    altitude: Optional[float] = None
+
+    @field_validator('timestamp', mode='before')
+    @classmethod
+    def converte_timestamp(cls, v_timestamp):
+        try:
+            return timestamp_para_epoch_ms(v_timestamp)
+        except (TypeError, ValueError):
+            raise ValueError("Timestamp inválido: use epoch em ms ou ISO 8601.")
+
+
+# Parâmetros propostos para um lançamento, enviados ao modelo de previsão
+class ParametrosLancamento(BaseModel):
+    pressaoBar: float
+    volumeAgua: float
+    massaTotalFoguete: float
+    distanciaAlvo: Optional[int] = None  # Se informada, a resposta traz a diferença para o alcance previsto
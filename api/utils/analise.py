@@ -0,0 +1,195 @@
+import sqlite3
+import logging, os
+import numpy as np
+from typing import Any, Dict, List, Optional
+from dotenv import load_dotenv
+import api.utils.crud as crud
+from api.utils.cache import cache_resultados
+from api.utils.espacial import distancias_haversine
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+G = 9.80665  # Aceleração da gravidade padrão (m/s²)
+
+# Limiares da detecção de fases (a magnitude do acelerômetro em repouso é ~1 g)
+LIMIAR_LANCAMENTO_G = float(os.getenv('LIMIAR_LANCAMENTO_G', '2.0'))
+LIMIAR_BURNOUT_G = float(os.getenv('LIMIAR_BURNOUT_G', '1.0'))
+LIMIAR_ALTURA_M = float(os.getenv('LIMIAR_ALTURA_M', '1.0'))
+
+
+def _coluna(dados: List[sqlite3.Row], nome: str) -> np.ndarray:
+    return np.array([np.nan if linha[nome] is None else linha[nome] for linha in dados], dtype=float)
+
+def series_voo(dados: List[sqlite3.Row]) -> Dict[str, np.ndarray]:
+    """
+    Converte os registros de um experimento (ordenados por timestamp) em vetores
+    NumPy: tempo em segundos desde o primeiro registro, aceleração do IMU (m/s²),
+    velocidade (m/s), posição e altura relativa ao lançamento.
+    """
+    colunas = ('timestamp', 'accel_x', 'accel_y', 'accel_z', 'speed_kmph', 'latitude', 'longitude', 'altura')
+    return series_de_colunas({nome: _coluna(dados, nome) for nome in colunas})
+
+def series_de_colunas(colunas: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """Equivalente a series_voo a partir das colunas já em vetores (repositório analítico)."""
+    timestamps = colunas['timestamp']
+    alturas = colunas['altura']
+    alturas_validas = alturas[~np.isnan(alturas)]
+    altura_referencia = alturas_validas[0] if len(alturas_validas) else 0.0
+
+    return {
+        "tempo_s": (timestamps - timestamps[0]) / 1000 if len(timestamps) else timestamps,
+        "accel_x": colunas['accel_x'],
+        "accel_y": colunas['accel_y'],
+        "accel_z": colunas['accel_z'],
+        "velocidade_ms": colunas['speed_kmph'] / 3.6,
+        "latitude": colunas['latitude'],
+        "longitude": colunas['longitude'],
+        "altura": alturas - altura_referencia,
+    }
+
+def aceleracao_imu(accel_x: np.ndarray, accel_y: np.ndarray, accel_z: np.ndarray) -> np.ndarray:
+    """Magnitude da aceleração medida pelo IMU (m/s²)."""
+    return np.sqrt(accel_x**2 + accel_y**2 + accel_z**2)
+
+def aceleracao_por_velocidade(tempo_s: np.ndarray, velocidade_ms: np.ndarray) -> np.ndarray:
+    """
+    Aceleração (m/s²) pela diferença de velocidade entre amostras consecutivas,
+    associada à amostra final de cada intervalo; a primeira amostra e intervalos
+    sem duração ficam como NaN.
+    """
+    aceleracao = np.full(len(tempo_s), np.nan)
+    if len(tempo_s) < 2:
+        return aceleracao
+
+    delta_t = np.diff(tempo_s)
+    delta_v = np.diff(velocidade_ms)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        aceleracao[1:] = np.where(delta_t > 0, delta_v / delta_t, np.nan)
+
+    return aceleracao
+
+def distancia_horizontal_acumulada(latitudes: np.ndarray, longitudes: np.ndarray) -> np.ndarray:
+    """Distância horizontal acumulada (m); trechos sem posição não somam distância."""
+    if len(latitudes) < 2:
+        return np.zeros(len(latitudes))
+
+    segmentos = np.zeros(len(latitudes))
+    segmentos[1:] = distancias_haversine(latitudes[:-1], longitudes[:-1], latitudes[1:], longitudes[1:])
+
+    return np.cumsum(np.nan_to_num(segmentos))
+
+def _primeiro(mascara: np.ndarray, inicio: int = 0) -> Optional[int]:
+    """Índice do primeiro True a partir de inicio (None se não houver)."""
+    if inicio >= len(mascara):
+        return None
+
+    indice = int(np.argmax(mascara[inicio:]))
+    return inicio + indice if mascara[inicio + indice] else None
+
+def detecta_eventos(series: Dict[str, np.ndarray], aceleracao_g: np.ndarray) -> Dict[str, Optional[int]]:
+    """
+    Índices de lançamento, fim da propulsão (burnout), apogeu e pouso.
+    Lançamento: aceleração acima de LIMIAR_LANCAMENTO_G (ou, sem IMU, primeira
+    subida acima de LIMIAR_ALTURA_M). Burnout: aceleração abaixo de LIMIAR_BURNOUT_G
+    após o lançamento. Apogeu: maior altura após o lançamento. Pouso: retorno à
+    altura de lançamento após o apogeu (ou último registro).
+    """
+    alturas = series["altura"]
+    total = len(alturas)
+    if total == 0:
+        return {"lancamento": None, "burnout": None, "apogeu": None, "pouso": None}
+
+    tem_imu = not np.isnan(aceleracao_g).all()
+    acima_altura = np.nan_to_num(alturas, nan=-np.inf) > LIMIAR_ALTURA_M
+
+    if tem_imu:
+        lancamento = _primeiro(np.nan_to_num(aceleracao_g) > LIMIAR_LANCAMENTO_G)
+    else:
+        lancamento = _primeiro(acima_altura)
+        lancamento = max(lancamento - 1, 0) if lancamento is not None else None
+
+    if lancamento is None:
+        return {"lancamento": None, "burnout": None, "apogeu": None, "pouso": None}
+
+    burnout = _primeiro(np.nan_to_num(aceleracao_g, nan=np.inf) < LIMIAR_BURNOUT_G, lancamento + 1) if tem_imu else None
+
+    alturas_voo = np.where(np.arange(total) >= lancamento, np.nan_to_num(alturas, nan=-np.inf), -np.inf)
+    apogeu = int(np.argmax(alturas_voo))
+
+    pouso = _primeiro(~acima_altura & ~np.isnan(alturas), apogeu + 1)
+    if pouso is None:
+        pouso = total - 1
+
+    return {"lancamento": lancamento, "burnout": burnout, "apogeu": apogeu, "pouso": pouso}
+
+def _metricas_fase(nome: str, inicio: Optional[int], fim: Optional[int], series: Dict[str, np.ndarray],
+                   aceleracao_g: np.ndarray, distancia: np.ndarray) -> Optional[Dict[str, Any]]:
+    if inicio is None or fim is None or fim < inicio:
+        return None
+
+    trecho = slice(inicio, fim + 1)
+    aceleracoes = aceleracao_g[trecho]
+
+    return {
+        "fase": nome,
+        "inicio_s": float(series["tempo_s"][inicio]),
+        "fim_s": float(series["tempo_s"][fim]),
+        "duracao_s": float(series["tempo_s"][fim] - series["tempo_s"][inicio]),
+        "max_g": None if np.isnan(aceleracoes).all() else float(np.nanmax(aceleracoes)),
+        "distancia_m": float(distancia[fim] - distancia[inicio]),
+        "altura_max_m": None if np.isnan(series["altura"][trecho]).all() else float(np.nanmax(series["altura"][trecho])),
+    }
+
+def analisa_voo(dados: List[sqlite3.Row]) -> Dict[str, Any]:
+    """
+    Análise física do voo: aceleração (IMU e derivada da velocidade), eventos,
+    tempo até o apogeu, aceleração máxima em g e alcance por fase.
+    """
+    if not dados:
+        return {"amostras": 0, "eventos": None, "fases": []}
+
+    series = series_voo(dados)
+    aceleracao_g = aceleracao_imu(series["accel_x"], series["accel_y"], series["accel_z"]) / G
+    aceleracao_velocidade = aceleracao_por_velocidade(series["tempo_s"], series["velocidade_ms"])
+    distancia = distancia_horizontal_acumulada(series["latitude"], series["longitude"])
+
+    eventos = detecta_eventos(series, aceleracao_g)
+    lancamento, burnout, apogeu, pouso = eventos["lancamento"], eventos["burnout"], eventos["apogeu"], eventos["pouso"]
+
+    fases = [
+        _metricas_fase("propulsao", lancamento, burnout, series, aceleracao_g, distancia),
+        _metricas_fase("subida_inercial", burnout, apogeu, series, aceleracao_g, distancia),
+        _metricas_fase("subida", lancamento, apogeu, series, aceleracao_g, distancia) if burnout is None else None,
+        _metricas_fase("descida", apogeu, pouso, series, aceleracao_g, distancia),
+    ]
+
+    alcance = None
+    if lancamento is not None and not np.isnan([series["latitude"][lancamento], series["latitude"][pouso]]).any():
+        alcance = float(distancias_haversine(series["latitude"][lancamento], series["longitude"][lancamento],
+                                             series["latitude"][pouso], series["longitude"][pouso]))
+
+    return {
+        "amostras": len(dados),
+        "eventos": {
+            nome: None if indice is None else {"indice": indice, "tempo_s": float(series["tempo_s"][indice])}
+            for nome, indice in eventos.items()
+        },
+        "tempo_ate_apogeu_s": None if lancamento is None else float(series["tempo_s"][apogeu] - series["tempo_s"][lancamento]),
+        "apogeu_m": None if lancamento is None else float(series["altura"][apogeu]),
+        "max_g_imu": None if np.isnan(aceleracao_g).all() else float(np.nanmax(aceleracao_g)),
+        "max_aceleracao_velocidade_ms2": None if np.isnan(aceleracao_velocidade).all() else float(np.nanmax(aceleracao_velocidade)),
+        "alcance_m": alcance,
+        "distancia_percorrida_m": float(distancia[-1]),
+        "fases": [fase for fase in fases if fase is not None],
+    }
+
+def busca_analise(db: sqlite3.Connection, id_experimento: int) -> Dict[str, Any]:
+    """Análise do voo com cache por (experimento, versão dos dados)."""
+    versao = crud.select_versao_dados(db, id_experimento)
+
+    def calcular():
+        logger.info(f"Calculando análise do voo do experimento {id_experimento}.")
+        return analisa_voo(crud.select_dados_brutos_experimento(db, id_experimento))
+
+    return cache_resultados.obter_ou_calcular(("analise", id_experimento, versao), calcular)
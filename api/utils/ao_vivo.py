@@ -0,0 +1,297 @@
+import asyncio
+import sqlite3
+import time, uuid
+import logging, os
+from typing import Dict, List, Optional, Set, Tuple
+from dotenv import load_dotenv
+from api.core.database import com_conexao, get_db_connection
+from api.core.profiling import run_in_threadpool
+from api.utils.formatacao import AcumuladorVoo
+import api.utils.crud as crud
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+AO_VIVO_FILA_MAX = int(os.getenv('AO_VIVO_FILA_MAX', '256'))
+AO_VIVO_LOTE_MAX = int(os.getenv('AO_VIVO_LOTE_MAX', '100'))
+AO_VIVO_LOTE_INTERVALO_MS = int(os.getenv('AO_VIVO_LOTE_INTERVALO_MS', '500'))
+# Validade da concessão de ingestão (renovada pelo gravador); com vários workers
+# garante um único processo gravando a ingestão ao vivo de cada experimento
+AO_VIVO_CONCESSAO_MS = int(os.getenv('AO_VIVO_CONCESSAO_MS', '10000'))
+
+
+class Assinante:
+    """Painel inscrito em um canal, com fila limitada de amostras pendentes."""
+
+    def __init__(self, tamanho_fila: int = AO_VIVO_FILA_MAX):
+        self.fila: asyncio.Queue = asyncio.Queue(maxsize=tamanho_fila)
+        self.descartado = False
+
+    def entregar(self, amostra: dict) -> bool:
+        """Enfileira sem bloquear; retorna False se a fila estiver cheia."""
+        try:
+            self.fila.put_nowait(amostra)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    def descartar(self):
+        """Marca o assinante como lento e acorda o consumidor para encerrar a conexão."""
+        self.descartado = True
+        while not self.fila.empty():
+            self.fila.get_nowait()
+        self.fila.put_nowait(None)
+
+
+class CanalAoVivo:
+    """
+    Canal de um experimento: mantém o estado incremental do voo, distribui cada
+    amostra enriquecida aos assinantes e grava as amostras em micro-lotes.
+    """
+
+    def __init__(self, id_experimento: int, acumulador: AcumuladorVoo, versao_dados: int = 0):
+        self.id_experimento = id_experimento
+        self.acumulador = acumulador
+        self.versao_dados = versao_dados
+        self.assinantes: Set[Assinante] = set()
+        self.ingestao_ativa = False
+        self.concessao_perdida = False
+        self._id_concessao: Optional[str] = None
+        self._concessao_renovada_em = 0.0
+        self._pendentes: List[Tuple] = []
+        self._lote_cheio = asyncio.Event()
+        self._lock_gravacao = asyncio.Lock()
+
+    def inscrever(self) -> Assinante:
+        assinante = Assinante()
+        self.assinantes.add(assinante)
+        return assinante
+
+    def cancelar(self, assinante: Assinante):
+        self.assinantes.discard(assinante)
+
+    def publicar(self, amostra: dict):
+        """Distribui a amostra sem esperar pelos assinantes; os lentos são descartados."""
+        for assinante in list(self.assinantes):
+            if not assinante.entregar(amostra):
+                logger.warning(f"Assinante lento descartado do canal ao vivo do experimento {self.id_experimento}.")
+                self.cancelar(assinante)
+                assinante.descartar()
+
+    def receber(self, amostra: dict) -> dict:
+        """
+        Processa uma amostra da estação de solo (chaves do CSV, timestamp em epoch ms):
+        agenda a gravação, enriquece e publica. Retorna a amostra enriquecida.
+        """
+        if amostra.get('latitude') is None or amostra.get('longitude') is None or amostra.get('altitude') is None:
+            raise ValueError("Amostra ao vivo sem latitude, longitude ou altitude.")
+
+        enriquecida = self.acumulador.adicionar({
+            'timestamp': amostra['timestamp'],
+            'accel_x': amostra.get('accel_x'),
+            'accel_y': amostra.get('accel_y'),
+            'accel_z': amostra.get('accel_z'),
+            'speed_kmph': amostra.get('speed_kmph'),
+            'longitude': amostra.get('longitude'),
+            'latitude': amostra.get('latitude'),
+            'altura': amostra.get('altitude'),
+        })
+
+        self._pendentes.append(crud.amostra_para_tupla_db(amostra, self.id_experimento))
+        if len(self._pendentes) >= AO_VIVO_LOTE_MAX:
+            self._lote_cheio.set()
+
+        self.publicar(enriquecida)
+
+        return enriquecida
+
+    async def iniciar_ingestao(self) -> bool:
+        """
+        Obtém a concessão de ingestão do experimento (única entre os processos) e
+        recarrega o estado do voo, que pode ter sido alterado por outro processo.
+        Retorna False se já houver uma ingestão ativa.
+        """
+        if self.ingestao_ativa:
+            return False
+
+        id_concessao = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        if not await run_in_threadpool(_renovar_concessao, self.id_experimento, id_concessao):
+            return False
+
+        self.ingestao_ativa = True
+        self.concessao_perdida = False
+        self._id_concessao = id_concessao
+        self._concessao_renovada_em = time.monotonic()
+
+        estado = await run_in_threadpool(_carregar_estado, self.id_experimento)
+        if estado is not None:
+            self.acumulador, self.versao_dados = estado
+
+        return True
+
+    async def encerrar_ingestao(self):
+        """
+        Grava o que estiver pendente e libera a concessão de ingestão. Protegido
+        contra cancelamento, pois a tarefa da conexão pode ser cancelada ao fechar.
+        """
+        await asyncio.shield(self._finalizar_ingestao())
+
+    async def _finalizar_ingestao(self):
+        try:
+            if not self.concessao_perdida:
+                await self.gravar_pendentes()
+                # A miniatura da listagem é recalculada uma vez, ao fim da sessão
+                await run_in_threadpool(com_conexao, crud.atualizar_sparkline_experimento, self.id_experimento)
+        finally:
+            await run_in_threadpool(_liberar_concessao, self.id_experimento, self._id_concessao)
+            self.ingestao_ativa = False
+            self._id_concessao = None
+
+    async def renovar_concessao(self):
+        """Renova a concessão a cada terço da validade; marca concessao_perdida se outro processo a assumiu."""
+        if time.monotonic() - self._concessao_renovada_em < AO_VIVO_CONCESSAO_MS / 3000:
+            return
+
+        if await run_in_threadpool(_renovar_concessao, self.id_experimento, self._id_concessao):
+            self._concessao_renovada_em = time.monotonic()
+        else:
+            logger.error(f"Concessão da ingestão ao vivo do experimento {self.id_experimento} perdida.")
+            self.concessao_perdida = True
+
+    async def gravar_pendentes(self) -> int:
+        """Grava o micro-lote pendente em DADOS_EXPERIMENTO fora do event loop."""
+        async with self._lock_gravacao:
+            lote, self._pendentes = self._pendentes, []
+            self._lote_cheio.clear()
+            if not lote:
+                return 0
+
+            # O acumulador já reflete exatamente as amostras até o fim deste lote
+            resumo = self.acumulador.para_resumo()
+
+            try:
+                registros_salvos, self.versao_dados, resumo_gravado = await run_in_threadpool(
+                    _salvar_lote, self.id_experimento, lote, resumo, self.versao_dados
+                )
+            except Exception:
+                # O INSERT do lote é desfeito por inteiro: devolve o lote à fila para a próxima gravação
+                self._pendentes = lote + self._pendentes
+                raise
+            if resumo_gravado is not resumo:
+                # Outro processo alterou os dados: retoma o estado do banco e reaplica o que chegou depois
+                acumulador = AcumuladorVoo.de_resumo(resumo_gravado)
+                for tupla in self._pendentes:
+                    acumulador.adicionar(_tupla_para_amostra(tupla))
+                self.acumulador = acumulador
+
+            return registros_salvos
+
+    async def gravador(self):
+        """Tarefa de fundo da ingestão: grava quando o lote enche ou a cada intervalo."""
+        intervalo = AO_VIVO_LOTE_INTERVALO_MS / 1000
+        while True:
+            try:
+                await asyncio.wait_for(self._lote_cheio.wait(), timeout=intervalo)
+            except asyncio.TimeoutError:
+                pass
+
+            try:
+                await self.renovar_concessao()
+                if self.concessao_perdida:
+                    return
+                await self.gravar_pendentes()
+            except Exception as e:
+                logger.error(f"Erro ao gravar micro-lote do experimento {self.id_experimento}: {e}")
+
+
+def _tupla_para_amostra(tupla: Tuple) -> dict:
+    """Tupla na ordem do INSERT de DADOS_EXPERIMENTO para o formato do AcumuladorVoo."""
+    colunas = ('timestamp', 'accel_x', 'accel_y', 'accel_z', 'speed_kmph', 'longitude', 'latitude', 'altura')
+    return dict(zip(colunas, tupla))
+
+def _salvar_lote(id_experimento: int, lote: List[Tuple], resumo: dict, versao_esperada: int) -> Tuple[int, int, dict]:
+    """
+    Grava o lote e o resumo. Se a versão dos dados mudou desde a última gravação
+    deste canal (escrita de outro processo), recalcula o resumo pelo banco.
+    Retorna (registros gravados, nova versão, resumo gravado). Se só o resumo
+    falhar, o lote já está gravado: a versão devolvida (-1) força o recálculo
+    do resumo na próxima gravação.
+    """
+    db = get_db_connection()
+    try:
+        registros_salvos = crud.create_dados_experimento_lote_db(db, lote)
+        try:
+            if crud.select_versao_dados(db, id_experimento) == versao_esperada:
+                crud.salvar_resumo_experimento(db, id_experimento, resumo)
+            else:
+                logger.warning(f"Dados do experimento {id_experimento} alterados por outro processo; recalculando o resumo.")
+                resumo = crud.recalcular_resumo_experimento(db, id_experimento)
+
+            return registros_salvos, crud.select_versao_dados(db, id_experimento), resumo
+        except sqlite3.Error as e:
+            logger.error(f"Lote do experimento {id_experimento} gravado, mas o resumo falhou: {e}")
+            return registros_salvos, -1, resumo
+    finally:
+        db.close()
+
+def _carregar_estado(id_experimento: int) -> Optional[Tuple[AcumuladorVoo, int]]:
+    """Retoma o estado incremental (e a versão dos dados) a partir do resumo gravado do experimento."""
+    db = get_db_connection()
+    try:
+        if crud.select_experimento(db, id_experimento) is None:
+            return None
+
+        resumo = crud.select_resumo_experimento(db, id_experimento)
+        if resumo is None:
+            resumo = crud.recalcular_resumo_experimento(db, id_experimento)
+
+        return AcumuladorVoo.de_resumo(resumo), crud.select_versao_dados(db, id_experimento)
+    finally:
+        db.close()
+
+def _renovar_concessao(id_experimento: int, id_concessao: str) -> bool:
+    db = get_db_connection()
+    try:
+        return crud.renovar_concessao_ingestao(db, id_experimento, id_concessao, AO_VIVO_CONCESSAO_MS)
+    finally:
+        db.close()
+
+def _liberar_concessao(id_experimento: int, id_concessao: Optional[str]):
+    if id_concessao is None:
+        return
+
+    db = get_db_connection()
+    try:
+        crud.liberar_concessao_ingestao(db, id_experimento, id_concessao)
+    finally:
+        db.close()
+
+
+class GerenciadorAoVivo:
+    """Registro dos canais ao vivo abertos, um por experimento."""
+
+    def __init__(self):
+        self.canais: Dict[int, CanalAoVivo] = {}
+        self._lock = asyncio.Lock()
+
+    async def obter_canal(self, id_experimento: int) -> Optional[CanalAoVivo]:
+        """Retorna o canal do experimento, criando-o se necessário (None se o experimento não existe)."""
+        async with self._lock:
+            canal = self.canais.get(id_experimento)
+            if canal is None:
+                estado = await run_in_threadpool(_carregar_estado, id_experimento)
+                if estado is None:
+                    return None
+
+                canal = CanalAoVivo(id_experimento, *estado)
+                self.canais[id_experimento] = canal
+
+            return canal
+
+    def liberar_canal(self, canal: CanalAoVivo):
+        """Remove o canal quando não há mais ingestão nem assinantes."""
+        if not canal.ingestao_ativa and not canal.assinantes:
+            self.canais.pop(canal.id_experimento, None)
+
+
+gerenciador_ao_vivo = GerenciadorAoVivo()
@@ -0,0 +1,118 @@
+import asyncio
+import threading
+import logging, os
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable
+from dotenv import load_dotenv
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+CACHE_MAX_ITENS = int(os.getenv('CACHE_MAX_ITENS', '256'))
+
+
+class CacheLRU:
+    """
+    Cache em memória, seguro entre threads, que descarta os itens usados há mais tempo.
+    As chaves devem incluir a versão dos dados do experimento, de forma que
+    alterações nos dados tornem as entradas antigas inalcançáveis.
+    """
+
+    def __init__(self, maximo: int = CACHE_MAX_ITENS):
+        self.maximo = maximo
+        self._itens: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.falhas = 0
+
+    def obter(self, chave: Hashable, padrao: Any = None) -> Any:
+        with self._lock:
+            if chave not in self._itens:
+                self.falhas += 1
+                return padrao
+
+            self.acertos += 1
+            self._itens.move_to_end(chave)
+            return self._itens[chave]
+
+    def guardar(self, chave: Hashable, valor: Any):
+        with self._lock:
+            self._itens[chave] = valor
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.maximo:
+                self._itens.popitem(last=False)
+
+    def obter_ou_calcular(self, chave: Hashable, calcular: Callable[[], Any]) -> Any:
+        """Retorna o valor em cache ou calcula, guarda e retorna."""
+        sentinela = object()
+        valor = self.obter(chave, sentinela)
+        if valor is sentinela:
+            valor = calcular()
+            self.guardar(chave, valor)
+
+        return valor
+
+    def invalidar(self, condicao: Callable[[Hashable], bool]):
+        """Remove as entradas cujas chaves satisfazem a condição."""
+        with self._lock:
+            for chave in [chave for chave in self._itens if condicao(chave)]:
+                del self._itens[chave]
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+
+    def estatisticas(self) -> dict:
+        with self._lock:
+            return {
+                "itens": len(self._itens),
+                "maximo": self.maximo,
+                "acertos": self.acertos,
+                "falhas": self.falhas,
+            }
+
+
+class ExecucaoUnica:
+    """
+    Agrupa requisições idênticas simultâneas (single-flight): enquanto uma
+    execução com a mesma chave está em andamento, as demais aguardam o mesmo
+    resultado (ou a mesma exceção) em vez de repetir o trabalho. Nada é guardado
+    após o término; as chaves devem incluir a versão dos dados, para que uma
+    requisição feita depois de uma alteração não receba o resultado anterior.
+    O resultado é compartilhado e não deve ser modificado por quem o recebe.
+    """
+
+    def __init__(self):
+        self._em_andamento: Dict[Hashable, asyncio.Task] = {}
+        self.execucoes = 0
+        self.compartilhadas = 0
+
+    async def executar(self, chave: Hashable, calcular: Callable[[], Awaitable[Any]]) -> Any:
+        tarefa = self._em_andamento.get(chave)
+        if tarefa is None:
+            self.execucoes += 1
+            tarefa = asyncio.ensure_future(calcular())
+            self._em_andamento[chave] = tarefa
+            tarefa.add_done_callback(lambda _: self._finalizar(chave, tarefa))
+        else:
+            self.compartilhadas += 1
+
+        # shield: o cancelamento de uma requisição (cliente desconectado) não cancela as demais
+        return await asyncio.shield(tarefa)
+
+    def _finalizar(self, chave: Hashable, tarefa: asyncio.Task):
+        if self._em_andamento.get(chave) is tarefa:
+            del self._em_andamento[chave]
+        if not tarefa.cancelled():
+            tarefa.exception() # Marca a exceção como tratada mesmo se nenhuma requisição restar aguardando
+
+    def estatisticas(self) -> dict:
+        return {
+            "em_andamento": len(self._em_andamento),
+            "execucoes": self.execucoes,
+            "compartilhadas": self.compartilhadas,
+        }
+
+
+cache_resultados = CacheLRU()
+execucao_unica = ExecucaoUnica()
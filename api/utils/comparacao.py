@@ -0,0 +1,120 @@
+import sqlite3
+import logging, os
+import numpy as np
+from typing import Any, Dict, List, Optional, Sequence
+from dotenv import load_dotenv
+from api.core.repositorio import obter_repositorio
+from api.utils.analise import G, aceleracao_imu, detecta_eventos, distancia_horizontal_acumulada, series_de_colunas
+from api.utils.formatacao import formata_nome_colunas_experimento
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+# Limite de pontos da grade comum (o passo é aumentado para respeitá-lo)
+COMPARACAO_MAX_PONTOS = int(os.getenv('COMPARACAO_MAX_PONTOS', '5000'))
+
+METRICAS_COMPARACAO = ("distancia_m", "altura_m", "velocidade_kmph")
+
+
+def select_metadados_experimentos(db: sqlite3.Connection, ids_experimentos: Optional[Sequence[int]] = None) -> Dict[int, Dict[str, Any]]:
+    """Metadados de vários experimentos (todos, se ids_experimentos for None) em uma consulta."""
+    cursor = db.cursor()
+    if ids_experimentos is None:
+        cursor.execute("SELECT * FROM EXPERIMENTO ORDER BY id")
+    else:
+        cursor.execute(f"SELECT * FROM EXPERIMENTO WHERE id IN ({', '.join('?' for _ in ids_experimentos)})", tuple(ids_experimentos))
+
+    return {linha['id']: formata_nome_colunas_experimento(dict(linha)) for linha in cursor.fetchall()}
+
+def series_desde_lancamento(colunas: Optional[Dict[str, np.ndarray]]) -> Optional[Dict[str, np.ndarray]]:
+    """
+    Séries do voo com o tempo relativo ao lançamento (detectado como em
+    analise.detecta_eventos; sem detecção, relativo ao primeiro registro).
+    """
+    if not colunas:
+        return None
+
+    series = series_de_colunas(colunas)
+    eventos = detecta_eventos(series, aceleracao_imu(series["accel_x"], series["accel_y"], series["accel_z"]) / G)
+    lancamento = eventos["lancamento"] or 0
+
+    return {
+        "lancamento_detectado": eventos["lancamento"] is not None,
+        "tempo_s": series["tempo_s"] - series["tempo_s"][lancamento],
+        "distancia_m": distancia_horizontal_acumulada(series["latitude"], series["longitude"]),
+        "altura_m": series["altura"],
+        "velocidade_kmph": series["velocidade_ms"] * 3.6,
+    }
+
+def reamostrar(tempo_s: np.ndarray, valores: np.ndarray, grade: np.ndarray) -> np.ndarray:
+    """Interpolação linear na grade; fora do intervalo medido (ou sem dados) resulta em NaN."""
+    validos = ~np.isnan(valores)
+    if validos.sum() < 2:
+        return np.full(len(grade), np.nan)
+
+    return np.interp(grade, tempo_s[validos], valores[validos], left=np.nan, right=np.nan)
+
+def compara_experimentos(db: sqlite3.Connection, ids_experimentos: Sequence[int], passo_s: float,
+                         antes_s: float = 0.0) -> Optional[Dict[str, Any]]:
+    """
+    Alinha os experimentos pelo tempo desde o lançamento e os reamostra numa grade
+    comum (de -antes_s até a maior duração, com passo_s). Retorna uma matriz
+    colunar por métrica (uma linha por experimento, na ordem de "experimentos"),
+    ou None se algum experimento não existir.
+    """
+    metadados = select_metadados_experimentos(db, ids_experimentos)
+    if any(id_experimento not in metadados for id_experimento in ids_experimentos):
+        return None
+
+    colunas = obter_repositorio(db).colunas_experimentos(ids_experimentos)
+    series = {id_experimento: series_desde_lancamento(colunas.get(id_experimento)) for id_experimento in ids_experimentos}
+    fins = [serie["tempo_s"][-1] for serie in series.values() if serie is not None]
+    fim = max(fins) if fins else 0.0
+
+    pontos = int(np.floor((fim + antes_s) / passo_s)) + 1
+    if pontos > COMPARACAO_MAX_PONTOS:
+        passo_s = (fim + antes_s) / (COMPARACAO_MAX_PONTOS - 1)
+        pontos = COMPARACAO_MAX_PONTOS
+        logger.info(f"Grade da comparação limitada a {pontos} pontos (passo de {passo_s:.3f} s).")
+    grade = -antes_s + passo_s * np.arange(pontos)
+
+    matriz = {metrica: np.full((len(ids_experimentos), pontos), np.nan) for metrica in METRICAS_COMPARACAO}
+    for linha, id_experimento in enumerate(ids_experimentos):
+        serie = series[id_experimento]
+        if serie is None:
+            continue
+        for metrica in METRICAS_COMPARACAO:
+            matriz[metrica][linha] = reamostrar(serie["tempo_s"], serie[metrica], grade)
+
+    return {
+        "passo_s": float(passo_s),
+        "experimentos": [
+            {
+                **metadados[id_experimento],
+                "amostras": len(colunas[id_experimento]["timestamp"]) if id_experimento in colunas else 0,
+                "lancamento_detectado": bool(series[id_experimento] and series[id_experimento]["lancamento_detectado"]),
+            }
+            for id_experimento in ids_experimentos
+        ],
+        "tempo_s": np.round(grade, 6).tolist(),
+        **{metrica: _matriz_json(valores) for metrica, valores in matriz.items()},
+    }
+
+def estatisticas_experimentos(db: sqlite3.Connection, ids_experimentos: Optional[Sequence[int]] = None) -> List[Dict[str, Any]]:
+    """
+    Agregados por experimento (amostras, intervalo de tempo, alturas, velocidade e
+    aceleração máximas), calculados pelo motor analítico configurado, junto aos metadados.
+    """
+    metadados = select_metadados_experimentos(db, ids_experimentos)
+    estatisticas = {
+        linha.pop("fk_exp"): linha
+        for linha in obter_repositorio(db).estatisticas_experimentos(list(metadados))
+    }
+
+    return [
+        {**experimento, **estatisticas.get(id_experimento, {"amostras": 0})}
+        for id_experimento, experimento in metadados.items()
+    ]
+
+def _matriz_json(valores: np.ndarray) -> list:
+    return np.where(np.isnan(valores), None, np.round(valores, 3)).tolist()
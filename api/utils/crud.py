@@ -1,23 +1,31 @@
 import sqlite3
-from typing import Any, Dict, List, Optional, Tuple
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
 from datetime import date, datetime
-import pandas as pd
 import io
+import time
 import logging
 import api.schemas.schemas as schemas
-from api.utils.formatacao import formata_dados_experimento_especifico, formata_nome_colunas_experimento
+import api.utils.espacial as espacial
+import api.utils.sparkline as sparkline
+import api.utils.modelo as modelo
+from api.utils.formatacao import AcumuladorVoo, formata_nome_colunas_experimento
+from api.utils.telemetria import Telemetria
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 
 logger = logging.getLogger(__name__)
 
 
-def create_experimento_db(db: sqlite3.Connection, experimento: schemas.ExperimentoCreate, data_obj: date) -> int:
+def create_experimento_db(db: sqlite3.Connection, experimento: schemas.ExperimentoCreate, data_obj: date,
+                          hash_conteudo: Optional[str] = None) -> int:
     """
-    Insere um novo experimento no banco de dados.
+    Insere um novo experimento no banco de dados, com o hash do CSV de origem (se houver).
     """
     sql = """
-        INSERT INTO EXPERIMENTO (nome, distancia_alvo, data, pressao_psi, volume_agua, massa_total_foguete)
-        VALUES (?, ?, ?, ?, ?, ?)
+        INSERT INTO EXPERIMENTO (nome, distancia_alvo, data, pressao_psi, volume_agua, massa_total_foguete, hash_conteudo)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
     """
     cursor = db.cursor()
     try:
@@ -27,7 +35,8 @@ def create_experimento_db(db: sqlite3.Connection, experimento: schemas.Experimen
             data_obj.isoformat(), # Armazena data como YYYY-MM-DD
             experimento.pressaoBar,
             experimento.volumeAgua,
-            experimento.massaTotalFoguete
+            experimento.massaTotalFoguete,
+            hash_conteudo
         ))
         
         db.commit()
@@ -43,27 +52,39 @@ def create_experimento_db(db: sqlite3.Connection, experimento: schemas.Experimen
         
         raise e # Re-levanta a exceção para ser tratada na rota
 
+def inserir_dados_lote(cursor: sqlite3.Cursor, dados_lote: List[Tuple]) -> int:
+    """
+    Insere os registros em DADOS_EXPERIMENTO e os seus blocos no índice espacial
+    (a transação fica a cargo do chamador).
+    """
+    sql = """
+        INSERT INTO DADOS_EXPERIMENTO (timestamp, accel_x, accel_y, accel_z, speed_kmph, longitude, latitude, altura, fk_exp, bloco_espacial)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """
+
+    # Cada amostra guarda o id do seu bloco no índice espacial
+    ids_blocos = espacial.indexar_lote(cursor, dados_lote)
+    cursor.executemany(sql, [(*tupla, id_bloco) for tupla, id_bloco in zip(dados_lote, ids_blocos)])
+
+    return cursor.rowcount
+
 def create_dados_experimento_lote_db(db: sqlite3.Connection, dados_lote: List[Tuple]) -> int:
     """
     Insere uma lista de registros de dados de experimento no banco de dados.
     """
     if not dados_lote:
         return 0
-    
-    sql = """
-        INSERT INTO DADOS_EXPERIMENTO (timestamp, accel_x, accel_y, accel_z, speed_kmph, longitude, latitude, altura, fk_exp)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-    """
-    
+
     cursor = db.cursor()
     
     try:
-        cursor.executemany(sql, dados_lote)
+        registros_inseridos = inserir_dados_lote(cursor, dados_lote)
+
         db.commit()
         
-        logger.info(f"{cursor.rowcount} registros inseridos na tabela DADOS_EXPERIMENTO.")
+        logger.info(f"{registros_inseridos} registros inseridos na tabela DADOS_EXPERIMENTO.")
         
-        return cursor.rowcount
+        return registros_inseridos
     except sqlite3.Error as e:
         db.rollback()
         
@@ -71,14 +92,110 @@ def create_dados_experimento_lote_db(db: sqlite3.Connection, dados_lote: List[Tu
         
         raise e # Re-levanta a exceção
 
-def select_todos_experimentos(db: sqlite3.Connection) -> Optional[Dict[str, Any]]:
+def amostra_para_tupla_db(amostra, experimento_id: int) -> Tuple:
+    """
+    Monta a tupla de inserção em DADOS_EXPERIMENTO (na ordem das colunas do INSERT)
+    a partir de uma amostra com as chaves do CSV.
+    """
+    return (
+        amostra.get('timestamp'),
+        amostra.get('accel_x'), amostra.get('accel_y'), amostra.get('accel_z'),
+        amostra.get('speed_kmph'),
+        amostra.get('longitude'),
+        amostra.get('latitude'),
+        amostra.get('altitude'),
+        experimento_id
+    )
+
+def select_experimento(db: sqlite3.Connection, id_experimento: int) -> Optional[Dict[str, Any]]:
+    """
+    Seleciona apenas os metadados de um experimento.
+    """
+    sql = """
+        SELECT * FROM EXPERIMENTO
+        WHERE id = ?
+    """
+
+    cursor = db.cursor()
+    cursor.execute(sql, (id_experimento,))
+    linha = cursor.fetchone()
+
+    return formata_nome_colunas_experimento(dict(linha)) if linha else None
+
+def select_experimento_por_hash(db: sqlite3.Connection, hash_conteudo: str) -> Optional[Dict[str, Any]]:
+    """
+    Seleciona os metadados do primeiro experimento criado a partir de um CSV com o
+    hash informado (cópias forçadas do mesmo arquivo compartilham o hash).
+    """
+    sql = """
+        SELECT * FROM EXPERIMENTO
+        WHERE hash_conteudo = ?
+        ORDER BY id ASC
+        LIMIT 1
+    """
+
+    cursor = db.cursor()
+    cursor.execute(sql, (hash_conteudo,))
+    linha = cursor.fetchone()
+
+    return formata_nome_colunas_experimento(dict(linha)) if linha else None
+
+def registrar_hash_conteudo(db: sqlite3.Connection, id_experimento: int, hash_conteudo: str, forcar: bool = False) -> Optional[int]:
+    """
+    Grava o hash do CSV de origem depois que a ingestão deu certo (um upload que
+    falhou não bloqueia o reenvio do arquivo). Sem forcar, a verificação e a
+    gravação são a mesma instrução: se outro experimento já tem o hash (upload
+    simultâneo do mesmo arquivo), nada é gravado e o id dele é retornado.
+    """
+    sql = """
+        UPDATE EXPERIMENTO SET hash_conteudo = ?
+        WHERE id = ? AND (? OR NOT EXISTS (SELECT 1 FROM EXPERIMENTO WHERE hash_conteudo = ?))
+    """
+    cursor = db.cursor()
+
+    try:
+        cursor.execute(sql, (hash_conteudo, id_experimento, forcar, hash_conteudo))
+        db.commit()
+    except sqlite3.Error as e:
+        db.rollback()
+        logger.error(f"Erro ao gravar o hash do CSV do experimento {id_experimento}: {e}")
+        raise e
+
+    if cursor.rowcount > 0:
+        return None
+
+    existente = select_experimento_por_hash(db, hash_conteudo)
+    return existente["id"] if existente else None
+
+def select_dados_brutos_experimento(db: sqlite3.Connection, id_experimento: int) -> List[sqlite3.Row]:
+    """
+    Seleciona os registros de dados de um experimento como gravados (timestamp em epoch ms).
+    """
+    sql = """
+        SELECT timestamp, accel_x, accel_y, accel_z, speed_kmph, longitude, latitude, altura FROM DADOS_EXPERIMENTO
+        WHERE fk_exp = ?
+        ORDER BY timestamp ASC
+    """
+
+    cursor = db.cursor()
+    cursor.execute(sql, (id_experimento,))
+
+    return cursor.fetchall()
+
+def select_todos_experimentos(db: sqlite3.Connection, incluir_sparkline: bool = False) -> Optional[Dict[str, Any]]:
     """
-    Retorna todos os experimentos, mas apenas seus metadados.
+    Retorna todos os experimentos, mas apenas seus metadados. Com incluir_sparkline,
+    traz na mesma consulta as miniaturas gravadas na ingestão (None sem dados).
     """
     
     sql = """
         SELECT * FROM EXPERIMENTO
     """
+    if incluir_sparkline:
+        sql = f"""
+        SELECT e.*, {", ".join(f"s.{serie}" for serie in sparkline.SERIES_SPARKLINE)} FROM EXPERIMENTO e
+        LEFT JOIN SPARKLINE_EXPERIMENTO s ON s.fk_exp = e.id
+    """
     
     cursor = db.cursor()
     
@@ -86,14 +203,20 @@ def select_todos_experimentos(db: sqlite3.Connection) -> Optional[Dict[str, Any]
     dados_rows = cursor.fetchall() # Pega todas as linhas correspondentes
     
     lista_experimentos = [formata_nome_colunas_experimento(dict(row)) for row in dados_rows]
+    if incluir_sparkline:
+        for experimento, row in zip(lista_experimentos, dados_rows):
+            experimento["sparkline"] = sparkline.sparkline_da_linha(dict(row))
     
     return {
                 "experimentos": lista_experimentos,
             }
 
-def select_experimento_completo(db: sqlite3.Connection, id_experimento: int) -> dict:
+def select_experimento_completo(db: sqlite3.Connection, id_experimento: int,
+                                inicio_ms: Optional[int] = None, fim_ms: Optional[int] = None) -> dict:
     """
-    Seleciona os detalhes de um experimento e todos os seus registros de dados associados.
+    Seleciona os detalhes de um experimento e todos os seus registros de dados associados
+    (enriquecidos, em colunas: telemetria.Telemetria). O intervalo opcional
+    [inicio_ms, fim_ms] (epoch em ms) filtra os dados pelo timestamp.
     """
     experimento = None
 
@@ -102,9 +225,18 @@ def select_experimento_completo(db: sqlite3.Connection, id_experimento: int) ->
         WHERE id = ?
     """
     
-    sql_dados_experimento = """
+    filtros = ["fk_exp = ?"]
+    parametros = [id_experimento]
+    if inicio_ms is not None:
+        filtros.append("timestamp >= ?")
+        parametros.append(inicio_ms)
+    if fim_ms is not None:
+        filtros.append("timestamp <= ?")
+        parametros.append(fim_ms)
+
+    sql_dados_experimento = f"""
         SELECT timestamp, accel_x, accel_y, accel_z, speed_kmph, longitude, latitude, altura FROM DADOS_EXPERIMENTO
-        WHERE fk_exp = ?
+        WHERE {" AND ".join(filtros)}
         ORDER BY timestamp ASC
     """
     
@@ -113,15 +245,17 @@ def select_experimento_completo(db: sqlite3.Connection, id_experimento: int) ->
     try:
         # Coleta dados gerais de um único experimento
         cursor.execute(sql_experimento, (id_experimento,))
-        experimento = dict(cursor.fetchone())
+        linha_experimento = cursor.fetchone()
         
-        if not experimento:
+        if not linha_experimento:
             logger.info(f"Experimento com ID {id_experimento} não encontrado.")
             return None
 
-        # Coleta dados de voo do experimento
-        cursor.execute(sql_dados_experimento, (id_experimento,))
-        dados_experimento = cursor.fetchall()
+        experimento = dict(linha_experimento)
+
+        # Coleta dados de voo do experimento direto em colunas (sem um dicionário por amostra)
+        cursor.execute(sql_dados_experimento, parametros)
+        dados_experimento = Telemetria.de_cursor(cursor)
         
         logger.info(f"Experimento ID {experimento['id']} com {len(dados_experimento)} registros de dados.")
         
@@ -129,7 +263,7 @@ def select_experimento_completo(db: sqlite3.Connection, id_experimento: int) ->
         # Monta o resultado final
         resultado_completo = {
             "experimento": formata_nome_colunas_experimento(experimento),
-            "dados_associados": formata_dados_experimento_especifico(dados_experimento)
+            "dados_associados": dados_experimento.enriquecida()
         }
         
         return resultado_completo
@@ -139,64 +273,366 @@ def select_experimento_completo(db: sqlite3.Connection, id_experimento: int) ->
         logger.error(f"Erro ao selecionar dados para o experimento ID {id_experimento}: {e}")
         raise e # Re-levanta a exceção para ser tratada pelo chamador
 
-def processar_e_salvar_csv(db: sqlite3.Connection, arquivo_csv_bytes: bytes, experimento_id: int) -> int:
+def converte_timestamps_epoch_ms(timestamps: "pd.Series") -> "pd.Series":
     """
-    Lê o conteúdo de um arquivo CSV (em bytes), processa os dados e os salva no banco.
+    Converte a coluna de timestamps do CSV para epoch em milissegundos (UTC).
+    Colunas numéricas são consideradas já em epoch ms; textos aceitam ISO 8601
+    com fração de segundo. Valores inválidos viram None.
+    """
+    import pandas as pd
+
+    if pd.api.types.is_numeric_dtype(timestamps):
+        epoch_ms = timestamps.round().astype('Int64')
+    else:
+        datas = pd.to_datetime(timestamps, format='ISO8601', errors='coerce', utc=True)
+        epoch_ms = ((datas - pd.Timestamp(0, tz='UTC')) // pd.Timedelta(milliseconds=1)).astype('Int64')
+
+    return epoch_ms.astype(object).where(epoch_ms.notna(), None)
+
+def ler_amostras_csv(arquivo_csv_bytes: bytes) -> List[Dict[str, Any]]:
+    """
+    Lê o conteúdo de um arquivo CSV (em bytes) e retorna as amostras válidas,
+    com as chaves do CSV, timestamp em epoch ms e valores ausentes como None.
+    Um arquivo vazio resulta em lista vazia.
     """
+    # Importado sob demanda: o pandas só é necessário na leitura de CSV
+    import pandas as pd
+
+    arquivo_csv_stream = io.BytesIO(arquivo_csv_bytes)
+    # Tenta decodificar como UTF-8, com fallback para latin-1
     try:
-        arquivo_csv_stream = io.BytesIO(arquivo_csv_bytes)
-        # Tenta decodificar como UTF-8, com fallback para latin-1
+        df = pd.read_csv(arquivo_csv_stream, encoding='utf-8', na_filter=True, keep_default_na=True)
+    except UnicodeDecodeError:
+        arquivo_csv_stream.seek(0)
+        df = pd.read_csv(arquivo_csv_stream, encoding='latin-1', na_filter=True, keep_default_na=True)
+    except pd.errors.EmptyDataError:
+        logger.warning("O arquivo CSV está vazio.")
+        return []
+    
+    logger.info(f"CSV lido. Colunas encontradas: {df.columns.tolist()}")
+
+    if 'timestamp' in df.columns:
+        # Parse único e vetorizado: daqui em diante o timestamp é epoch em ms
+        df['timestamp'] = converte_timestamps_epoch_ms(df['timestamp'])
+
+        timestamps_invalidos = df['timestamp'].isna()
+        if timestamps_invalidos.any():
+            logger.warning(f"{int(timestamps_invalidos.sum())} linhas do CSV com timestamp inválido foram ignoradas.")
+            df = df[~timestamps_invalidos]
+
+    df = df.astype(object).where(df.notna(), None)
+
+    amostras = []
+    for index, row_data in df.iterrows():
         try:
-            df = pd.read_csv(arquivo_csv_stream, encoding='utf-8', na_filter=True, keep_default_na=True)
-        except UnicodeDecodeError:
-            df = pd.read_csv(arquivo_csv_stream, encoding='latin-1', na_filter=True, keep_default_na=True)
-        
-        logger.info(f"CSV lido. Colunas encontradas: {df.columns.tolist()}")
-
-        dados_para_inserir_db = []
-        for index, row_data in df.iterrows():
-            try:
-                schemas.DadosCSV(
-                    latitude=row_data.get('latitude'),
-                    longitude=row_data.get('longitude'),
-                    altitude=row_data.get('altitude'),
-                    speed_kmph=row_data.get('speed_kmph'),
-                    timestamp=row_data.get('timestamp')
-                )
-            except Exception as e_val:
-                logger.warning(f"Linha {index} do CSV com dados inválidos: {row_data}. Erro: {e_val}")
-                continue
-
-            dados_linha_tupla = (
-                row_data.get('timestamp'),
-                row_data.get('accel_x'), row_data.get('accel_y'), row_data.get('accel_z'),
-                row_data.get('speed_kmph'),
-                row_data.get('latitude'),
-                row_data.get('longitude'),
-                row_data.get('altitude'),
-                experimento_id
+            schemas.DadosCSV(
+                latitude=row_data.get('latitude'),
+                longitude=row_data.get('longitude'),
+                altitude=row_data.get('altitude'),
+                speed_kmph=row_data.get('speed_kmph'),
+                timestamp=row_data.get('timestamp')
             )
-            dados_para_inserir_db.append(dados_linha_tupla)
+        except Exception as e_val:
+            logger.warning(f"Linha {index} do CSV com dados inválidos: {row_data}. Erro: {e_val}")
+            continue
+
+        amostras.append(row_data.to_dict())
+
+    return amostras
+
+def processar_e_salvar_csv(db: sqlite3.Connection, arquivo_csv_bytes: bytes, experimento_id: int) -> int:
+    """
+    Lê o conteúdo de um arquivo CSV (em bytes), processa os dados e os salva no banco.
+    """
+    try:
+        amostras = ler_amostras_csv(arquivo_csv_bytes)
         
-        if dados_para_inserir_db:
-            return create_dados_experimento_lote_db(db, dados_para_inserir_db)
+        if amostras:
+            registros_salvos = create_dados_experimento_lote_db(
+                db, [amostra_para_tupla_db(amostra, experimento_id) for amostra in amostras]
+            )
+            atualizar_resumo_experimento(db, experimento_id, amostras)
+            atualizar_sparkline_experimento(db, experimento_id)
+
+            return registros_salvos
         else:
             logger.info(f"Nenhum dado válido para inserir do CSV para o experimento ID {experimento_id}.")
             return 0
 
-    except pd.errors.EmptyDataError:
-        logger.warning("O arquivo CSV está vazio.")
-        
-        return 0
     except Exception as e_csv:
         logger.error(f"Erro ao processar o arquivo CSV: {e_csv}")
         
         raise ValueError(f"Erro ao processar o arquivo CSV: {str(e_csv)}")
 
+def adicionar_dados_csv(db: sqlite3.Connection, arquivo_csv_bytes: bytes, experimento_id: int) -> Dict[str, Any]:
+    """
+    Acrescenta um novo lote de dados (CSV) a um experimento existente, ignorando
+    amostras com timestamp já gravado, e atualiza o resumo incrementalmente.
+    A verificação de duplicatas, a inserção, o resumo e a miniatura formam uma
+    única transação BEGIN IMMEDIATE: acréscimos simultâneos ao mesmo experimento
+    são serializados pelo lock de escrita e não duplicam amostras.
+    """
+    try:
+        amostras = ler_amostras_csv(arquivo_csv_bytes)
+    except Exception as e_csv:
+        logger.error(f"Erro ao processar o arquivo CSV: {e_csv}")
+        raise ValueError(f"Erro ao processar o arquivo CSV: {str(e_csv)}")
+
+    if any(amostra.get('timestamp') is None for amostra in amostras):
+        raise ValueError("O CSV precisa da coluna 'timestamp' para acrescentar dados a um experimento.")
+
+    # Remove duplicatas dentro do próprio lote (mantém a primeira ocorrência)
+    amostras_lote = list({amostra['timestamp']: amostra for amostra in reversed(amostras)}.values())
+
+    cursor = db.cursor()
+
+    try:
+        # O lock de escrita é obtido antes da leitura dos timestamps já gravados
+        cursor.execute("BEGIN IMMEDIATE")
+
+        novas_amostras = []
+        if amostras_lote:
+            timestamps = [amostra['timestamp'] for amostra in amostras_lote]
+            timestamps_existentes = select_timestamps_existentes(db, experimento_id, min(timestamps), max(timestamps))
+            novas_amostras = [amostra for amostra in amostras_lote if amostra['timestamp'] not in timestamps_existentes]
+
+        registros_inseridos = 0
+        resumo = select_resumo_experimento(db, experimento_id)
+        if novas_amostras:
+            registros_inseridos = inserir_dados_lote(
+                cursor, [amostra_para_tupla_db(amostra, experimento_id) for amostra in novas_amostras]
+            )
+            resumo = calcular_resumo_atualizado(db, experimento_id, novas_amostras)
+            gravar_resumo(cursor, experimento_id, resumo)
+            sparkline.gravar_sparkline(cursor, experimento_id)
+
+        db.commit()
+    except sqlite3.Error as e:
+        db.rollback()
+        logger.error(f"Erro ao acrescentar dados ao experimento {experimento_id} no DB: {e}")
+        raise e
+
+    logger.info(
+        f"Experimento ID {experimento_id}: {registros_inseridos} registros acrescentados, "
+        f"{len(amostras) - registros_inseridos} duplicados ignorados."
+    )
+
+    return {
+        "registros_inseridos": registros_inseridos,
+        "registros_duplicados": len(amostras) - registros_inseridos,
+        "resumo": resumo
+    }
+
+def select_timestamps_existentes(db: sqlite3.Connection, id_experimento: int, inicio_ms: int, fim_ms: int) -> set:
+    """
+    Retorna os timestamps já gravados de um experimento dentro do intervalo [inicio_ms, fim_ms].
+    """
+    sql = """
+        SELECT timestamp FROM DADOS_EXPERIMENTO
+        WHERE fk_exp = ? AND timestamp BETWEEN ? AND ?
+    """
+
+    cursor = db.cursor()
+    cursor.execute(sql, (id_experimento, inicio_ms, fim_ms))
+
+    return {linha[0] for linha in cursor.fetchall()}
+
+def select_resumo_experimento(db: sqlite3.Connection, id_experimento: int) -> Optional[Dict[str, Any]]:
+    """
+    Seleciona o resumo gravado (valores derivados) de um experimento.
+    """
+    sql = f"""
+        SELECT {", ".join(AcumuladorVoo.CAMPOS_RESUMO)} FROM RESUMO_EXPERIMENTO
+        WHERE fk_exp = ?
+    """
+
+    cursor = db.cursor()
+    cursor.execute(sql, (id_experimento,))
+    linha = cursor.fetchone()
+
+    return dict(zip(AcumuladorVoo.CAMPOS_RESUMO, linha)) if linha else None
+
+def gravar_resumo(cursor: sqlite3.Cursor, id_experimento: int, resumo: Dict[str, Any]):
+    """
+    Grava (insere ou atualiza) o resumo de um experimento, incrementa a versão dos
+    seus dados e atualiza as estatísticas do modelo de lançamento (a transação
+    fica a cargo do chamador).
+    """
+    campos = AcumuladorVoo.CAMPOS_RESUMO
+    sql = f"""
+        INSERT INTO RESUMO_EXPERIMENTO (fk_exp, {", ".join(campos)}, versao)
+        VALUES (?, {", ".join("?" for _ in campos)}, 1)
+        ON CONFLICT (fk_exp) DO UPDATE SET
+        {", ".join(f"{campo} = excluded.{campo}" for campo in campos)}, versao = versao + 1
+    """
+
+    cursor.execute(sql, (id_experimento, *(resumo[campo] for campo in campos)))
+    modelo.atualizar_observacao(cursor, id_experimento)
+
+def salvar_resumo_experimento(db: sqlite3.Connection, id_experimento: int, resumo: Dict[str, Any]):
+    """
+    Grava (insere ou atualiza) o resumo de um experimento e incrementa a versão dos
+    seus dados. As estatísticas do modelo de lançamento são atualizadas na mesma transação.
+    """
+    cursor = db.cursor()
+
+    try:
+        gravar_resumo(cursor, id_experimento, resumo)
+        db.commit()
+    except sqlite3.Error as e:
+        db.rollback()
+        logger.error(f"Erro ao gravar o resumo do experimento {id_experimento} no DB: {e}")
+        raise e
+
+def select_versao_dados(db: sqlite3.Connection, id_experimento: int) -> int:
+    """
+    Retorna a versão dos dados de um experimento (0 se ainda não há dados).
+    """
+    sql = """
+        SELECT versao FROM RESUMO_EXPERIMENTO
+        WHERE fk_exp = ?
+    """
+
+    cursor = db.cursor()
+    cursor.execute(sql, (id_experimento,))
+    linha = cursor.fetchone()
+
+    return linha[0] if linha else 0
+
+def select_versoes_dados(db: sqlite3.Connection, ids_experimentos: List[int]) -> Dict[int, int]:
+    """
+    Retorna a versão dos dados de vários experimentos (0 para os que ainda não têm dados).
+    """
+    if not ids_experimentos:
+        return {}
+
+    sql = f"""
+        SELECT fk_exp, versao FROM RESUMO_EXPERIMENTO
+        WHERE fk_exp IN ({", ".join("?" for _ in ids_experimentos)})
+    """
+
+    cursor = db.cursor()
+    cursor.execute(sql, tuple(ids_experimentos))
+    versoes = dict(cursor.fetchall())
+
+    return {id_experimento: versoes.get(id_experimento, 0) for id_experimento in ids_experimentos}
+
+def renovar_concessao_ingestao(db: sqlite3.Connection, id_experimento: int, id_concessao: str, validade_ms: int) -> bool:
+    """
+    Obtém ou renova a concessão de ingestão ao vivo do experimento. Só é concedida
+    se estiver livre, expirada ou já pertencer a id_concessao.
+    """
+    sql = """
+        INSERT INTO INGESTAO_AO_VIVO (fk_exp, processo, expira_ms)
+        VALUES (?, ?, ?)
+        ON CONFLICT (fk_exp) DO UPDATE SET processo = excluded.processo, expira_ms = excluded.expira_ms
+        WHERE INGESTAO_AO_VIVO.processo = excluded.processo OR INGESTAO_AO_VIVO.expira_ms < ?
+    """
+    agora_ms = int(time.time() * 1000)
+    cursor = db.cursor()
+
+    try:
+        cursor.execute(sql, (id_experimento, id_concessao, agora_ms + validade_ms, agora_ms))
+        db.commit()
+    except sqlite3.Error as e:
+        db.rollback()
+        logger.error(f"Erro ao renovar a concessão de ingestão do experimento {id_experimento}: {e}")
+        raise e
+
+    return cursor.rowcount > 0
+
+def liberar_concessao_ingestao(db: sqlite3.Connection, id_experimento: int, id_concessao: str):
+    """Remove a concessão de ingestão, se ainda pertencer a id_concessao."""
+    sql = "DELETE FROM INGESTAO_AO_VIVO WHERE fk_exp = ? AND processo = ?"
+
+    cursor = db.cursor()
+
+    try:
+        cursor.execute(sql, (id_experimento, id_concessao))
+        db.commit()
+    except sqlite3.Error as e:
+        db.rollback()
+        logger.error(f"Erro ao liberar a concessão de ingestão do experimento {id_experimento}: {e}")
+        raise e
+
+def calcular_resumo_completo(db: sqlite3.Connection, id_experimento: int) -> Dict[str, Any]:
+    """
+    Calcula o resumo de um experimento percorrendo todos os seus dados, sem gravá-lo.
+    """
+    acumulador = AcumuladorVoo()
+    for linha in select_dados_brutos_experimento(db, id_experimento):
+        acumulador.adicionar(dict(linha))
+
+    return acumulador.para_resumo()
+
+def recalcular_resumo_experimento(db: sqlite3.Connection, id_experimento: int) -> Dict[str, Any]:
+    """
+    Recalcula o resumo de um experimento percorrendo todos os seus dados.
+    """
+    resumo = calcular_resumo_completo(db, id_experimento)
+    salvar_resumo_experimento(db, id_experimento, resumo)
+    atualizar_sparkline_experimento(db, id_experimento)
+
+    return resumo
+
+def calcular_resumo_atualizado(db: sqlite3.Connection, id_experimento: int, novas_amostras: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Calcula, sem gravar, o resumo de um experimento a partir do último ponto
+    conhecido com as amostras recém-gravadas (chaves do CSV). Se alguma amostra
+    for anterior ao fim do voo já resumido, o resumo é calculado por completo.
+    """
+    amostras = sorted(novas_amostras, key=lambda amostra: (amostra.get('timestamp') is not None, amostra.get('timestamp') or 0))
+    resumo = select_resumo_experimento(db, id_experimento)
+
+    if resumo and resumo['timestamp_final'] is not None and amostras and amostras[0].get('timestamp') is not None \
+            and amostras[0]['timestamp'] <= resumo['timestamp_final']:
+        logger.info(f"Amostras fora de ordem no experimento {id_experimento}: resumo recalculado por completo.")
+        return calcular_resumo_completo(db, id_experimento)
+
+    acumulador = AcumuladorVoo.de_resumo(resumo) if resumo else AcumuladorVoo()
+    for amostra in amostras:
+        acumulador.adicionar({
+            'timestamp': amostra.get('timestamp'),
+            'speed_kmph': amostra.get('speed_kmph'),
+            'latitude': amostra.get('latitude'),
+            'longitude': amostra.get('longitude'),
+            'altura': amostra.get('altitude'),
+        })
+
+    return acumulador.para_resumo()
+
+def atualizar_resumo_experimento(db: sqlite3.Connection, id_experimento: int, novas_amostras: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Atualiza o resumo de um experimento com as amostras recém-gravadas (chaves do
+    CSV), incrementalmente ou por completo (ver calcular_resumo_atualizado).
+    """
+    resumo = calcular_resumo_atualizado(db, id_experimento, novas_amostras)
+    salvar_resumo_experimento(db, id_experimento, resumo)
+
+    return resumo
+
+def atualizar_sparkline_experimento(db: sqlite3.Connection, id_experimento: int) -> Dict[str, List[float]]:
+    """
+    Recalcula e grava a miniatura (sparkline) do experimento a partir de todos os
+    seus dados. Chamada na ingestão, para que a listagem não leia as amostras.
+    """
+    cursor = db.cursor()
+
+    try:
+        resultado = sparkline.gravar_sparkline(cursor, id_experimento)
+        db.commit()
+    except sqlite3.Error as e:
+        db.rollback()
+        logger.error(f"Erro ao gravar a miniatura do experimento {id_experimento} no DB: {e}")
+        raise e
+
+    return resultado
+
 def update_experimento(db: sqlite3.Connection, id_experimento:int, dados_lote: List[Tuple]) -> int:
     """
-    Edita os metadados de um experimento no banco de dados.
-    """ 
+    Edita os metadados de um experimento no banco de dados, atualizando as
+    estatísticas do modelo de lançamento na mesma transação.
+    """
 
     sql_experimento = """
         UPDATE EXPERIMENTO SET 
@@ -215,6 +651,7 @@ def update_experimento(db: sqlite3.Connection, id_experimento:int, dados_lote: L
     try:
         # Buscar os detalhes do experimento
         cursor.execute(sql_experimento, parametros_finais)
+        modelo.atualizar_observacao(db.cursor(), id_experimento)
 
         print(parametros_finais)
         db.commit()
@@ -229,7 +666,10 @@ def update_experimento(db: sqlite3.Connection, id_experimento:int, dados_lote: L
 
 def delete_experimento(db: sqlite3.Connection, id_experimento: int):
     """
-    Deleta um registro da tabela EXPERIMENTO com base no ID fornecido.
+    Deleta um registro da tabela EXPERIMENTO com base no ID fornecido. As amostras
+    e demais linhas do experimento são removidas depois, em lotes, pela
+    manutenção do armazenamento (api.core.manutencao); a contribuição ao modelo de
+    lançamento é retirada na mesma transação.
     """
     sql = "DELETE FROM EXPERIMENTO WHERE id = ?"
     
@@ -237,6 +677,7 @@ def delete_experimento(db: sqlite3.Connection, id_experimento: int):
     
     try:
         cursor.execute(sql, (id_experimento,))
+        modelo.atualizar_observacao(db.cursor(), id_experimento)
         db.commit()
         
         # cursor.rowcount informará se alguma linha foi de fato deletada (1) ou não (0)
@@ -0,0 +1,65 @@
+import hashlib
+import logging
+from typing import Tuple
+from fastapi import UploadFile
+
+logger = logging.getLogger(__name__)
+
+# Tamanho dos blocos lidos do upload (o hash é calculado durante a leitura)
+TAMANHO_BLOCO = 1024 * 1024
+
+BOM_UTF8 = b"\xef\xbb\xbf"
+QUEBRAS_DE_LINHA = b"\r\n"
+
+
+class HashCSV:
+    """
+    SHA-256 incremental do conteúdo normalizado de um CSV: sem BOM, com quebras
+    de linha \\r\\n e \\r convertidas em \\n e sem as quebras de linha finais. Assim,
+    o mesmo arquivo salvo no Windows ou no Linux resulta no mesmo hash.
+    """
+
+    def __init__(self):
+        self._sha256 = hashlib.sha256()
+        self._inicio = True
+        # Quebras de linha no fim do último bloco: só entram no hash se vier mais conteúdo
+        self._pendente = b""
+
+    def atualizar(self, bloco: bytes):
+        if self._inicio:
+            # O BOM pode chegar dividido entre os primeiros blocos
+            bloco = self._pendente + bloco
+            self._pendente = b""
+            if len(bloco) < len(BOM_UTF8) and BOM_UTF8.startswith(bloco):
+                self._pendente = bloco
+                return
+            self._inicio = False
+            if bloco.startswith(BOM_UTF8):
+                bloco = bloco[len(BOM_UTF8):]
+
+        dados = self._pendente + bloco
+        sem_final = dados.rstrip(QUEBRAS_DE_LINHA)
+        self._pendente = dados[len(sem_final):]
+
+        self._sha256.update(sem_final.replace(b"\r\n", b"\n").replace(b"\r", b"\n"))
+
+    def hexdigest(self) -> str:
+        return self._sha256.hexdigest()
+
+
+def hash_csv(conteudo: bytes) -> str:
+    """Hash do conteúdo normalizado de um CSV já em memória."""
+    hash_conteudo = HashCSV()
+    hash_conteudo.atualizar(conteudo)
+
+    return hash_conteudo.hexdigest()
+
+async def ler_upload_com_hash(arquivo: UploadFile, tamanho_bloco: int = TAMANHO_BLOCO) -> Tuple[bytes, str]:
+    """Lê o upload em blocos, calculando o hash do conteúdo normalizado durante a leitura."""
+    hash_conteudo = HashCSV()
+    blocos = []
+    while bloco := await arquivo.read(tamanho_bloco):
+        hash_conteudo.atualizar(bloco)
+        blocos.append(bloco)
+
+    return b"".join(blocos), hash_conteudo.hexdigest()
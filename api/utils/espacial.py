@@ -0,0 +1,167 @@
+import sqlite3
+import math
+import logging, os
+import numpy as np
+from itertools import groupby
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from dotenv import load_dotenv
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+R_TERRA = 6371000  # Raio da Terra em metros
+
+# Quantidade de amostras consecutivas (no tempo) resumidas em cada retângulo do R*Tree
+ESPACIAL_BLOCO = int(os.getenv('ESPACIAL_BLOCO', '32'))
+
+SQL_INSERE_BLOCO = """
+    INSERT INTO DADOS_EXPERIMENTO_RTREE (min_lat, max_lat, min_lon, max_lon, fk_exp, inicio_ms, fim_ms, amostras)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def agrupar_blocos(amostras: List[Tuple]) -> List[Tuple[Tuple, List[int]]]:
+    """
+    Agrupa amostras (timestamp, latitude, longitude, fk_exp) em blocos de
+    ESPACIAL_BLOCO amostras consecutivas por experimento e devolve, para cada
+    bloco, o retângulo envolvente e o intervalo de tempo, na ordem de
+    SQL_INSERE_BLOCO, junto com as posições das amostras do bloco em `amostras`.
+    """
+    validas = sorted(
+        (indice for indice, amostra in enumerate(amostras) if amostra[1] is not None and amostra[2] is not None),
+        key=lambda indice: (amostras[indice][3], amostras[indice][0] is None, amostras[indice][0] or 0)
+    )
+
+    blocos = []
+    for fk_exp, grupo in groupby(validas, key=lambda indice: amostras[indice][3]):
+        grupo = list(grupo)
+        for inicio in range(0, len(grupo), ESPACIAL_BLOCO):
+            indices = grupo[inicio:inicio + ESPACIAL_BLOCO]
+            bloco = [amostras[indice] for indice in indices]
+            latitudes = [amostra[1] for amostra in bloco]
+            longitudes = [amostra[2] for amostra in bloco]
+            timestamps = [amostra[0] for amostra in bloco if amostra[0] is not None]
+            blocos.append(((
+                min(latitudes), max(latitudes), min(longitudes), max(longitudes), fk_exp,
+                min(timestamps) if timestamps else None, max(timestamps) if timestamps else None, len(bloco)
+            ), indices))
+
+    return blocos
+
+def blocos_espaciais(amostras: Iterable[Tuple]) -> List[Tuple]:
+    """Retângulos dos blocos de agrupar_blocos, na ordem de SQL_INSERE_BLOCO."""
+    return [bloco for bloco, _ in agrupar_blocos(list(amostras))]
+
+def _inserir_blocos(cursor: sqlite3.Cursor, amostras: List[Tuple]) -> List[Optional[int]]:
+    """Insere os blocos no R*Tree e devolve, para cada amostra, o id do seu bloco (None sem posição)."""
+    ids_blocos: List[Optional[int]] = [None] * len(amostras)
+    for bloco, indices in agrupar_blocos(amostras):
+        cursor.execute(SQL_INSERE_BLOCO, bloco)
+        for indice in indices:
+            ids_blocos[indice] = cursor.lastrowid
+
+    return ids_blocos
+
+def indexar_lote(cursor: sqlite3.Cursor, dados_lote: List[Tuple]) -> List[Optional[int]]:
+    """
+    Indexa no R*Tree as tuplas a inserir em DADOS_EXPERIMENTO (ordem das colunas
+    do INSERT: timestamp, ..., longitude, latitude, altura, fk_exp) e devolve o
+    id do bloco de cada tupla, gravado com a amostra (coluna bloco_espacial).
+    Deve rodar na mesma transação do INSERT.
+    """
+    return _inserir_blocos(cursor, [(tupla[0], tupla[6], tupla[5], tupla[8]) for tupla in dados_lote])
+
+def reindexar_experimento(cursor: sqlite3.Cursor, id_experimento: int):
+    """Reconstrói os blocos do R*Tree de um experimento a partir dos dados gravados."""
+    cursor.execute("DELETE FROM DADOS_EXPERIMENTO_RTREE WHERE fk_exp = ?", (id_experimento,))
+    cursor.execute("""
+        SELECT id, timestamp, latitude, longitude, fk_exp FROM DADOS_EXPERIMENTO
+        WHERE fk_exp = ?
+    """, (id_experimento,))
+    linhas = cursor.fetchall()
+
+    ids_blocos = _inserir_blocos(cursor, [tuple(linha)[1:] for linha in linhas])
+    cursor.executemany(
+        "UPDATE DADOS_EXPERIMENTO SET bloco_espacial = ? WHERE id = ?",
+        [(id_bloco, linha[0]) for linha, id_bloco in zip(linhas, ids_blocos)]
+    )
+
+def retangulo_do_raio(latitude: float, longitude: float, raio_m: float) -> Tuple[float, float, float, float]:
+    """Retângulo (lat_min, lat_max, lon_min, lon_max) que contém o círculo de raio_m metros."""
+    delta_lat = math.degrees(raio_m / R_TERRA)
+    cos_lat = max(math.cos(math.radians(latitude)), 1e-12)
+    delta_lon = min(math.degrees(raio_m / (R_TERRA * cos_lat)), 180.0)
+
+    return latitude - delta_lat, latitude + delta_lat, longitude - delta_lon, longitude + delta_lon
+
+def distancias_haversine(latitude: float, longitude: float, latitudes: np.ndarray, longitudes: np.ndarray) -> np.ndarray:
+    """Distâncias (metros) de um ponto a um vetor de pontos, pela fórmula de Haversine."""
+    phi1 = np.radians(latitude)
+    phi2 = np.radians(latitudes)
+    a = np.sin((phi2 - phi1) / 2.0)**2 + \
+        np.cos(phi1) * np.cos(phi2) * np.sin(np.radians(longitudes - longitude) / 2.0)**2
+
+    return 2 * R_TERRA * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+def _busca_espacial(db: sqlite3.Connection, lat_min: float, lat_max: float, lon_min: float, lon_max: float,
+                    filtro_preciso) -> Dict[str, Any]:
+    """
+    Consulta o R*Tree e refina, numa única consulta, somente as amostras dos
+    blocos candidatos (pelo índice de bloco_espacial; cada amostra pertence a um
+    só bloco), agrupando o resultado por experimento e bloco.
+    filtro_preciso recebe vetores de latitude/longitude e devolve a máscara das amostras aceitas.
+    """
+    sql = """
+        SELECT r.id, r.fk_exp, e.nome, d.timestamp, d.latitude, d.longitude
+        FROM DADOS_EXPERIMENTO_RTREE r
+        JOIN EXPERIMENTO e ON e.id = r.fk_exp
+        JOIN DADOS_EXPERIMENTO d ON d.bloco_espacial = r.id
+        WHERE r.max_lat >= ? AND r.min_lat <= ? AND r.max_lon >= ? AND r.min_lon <= ?
+        AND d.latitude BETWEEN ? AND ? AND d.longitude BETWEEN ? AND ?
+        ORDER BY r.fk_exp, r.inicio_ms, r.id
+    """
+    cursor = db.cursor()
+    cursor.execute(sql, (lat_min, lat_max, lon_min, lon_max, lat_min, lat_max, lon_min, lon_max))
+    linhas = cursor.fetchall()
+
+    experimentos: Dict[int, Dict[str, Any]] = {}
+    for (id_bloco, fk_exp, nome), grupo in groupby(linhas, key=lambda linha: (linha[0], linha[1], linha[2])):
+        valores = np.array([tuple(linha)[3:] for linha in grupo], dtype=float)
+        aceitas = valores[filtro_preciso(valores[:, 1], valores[:, 2])]
+        if len(aceitas) == 0:
+            continue
+
+        experimento = experimentos.setdefault(fk_exp, {
+            "experimento_id": fk_exp,
+            "nomeExperimento": nome,
+            "amostras": 0,
+            "intervalos": [],
+        })
+        timestamps = aceitas[:, 0][~np.isnan(aceitas[:, 0])]
+        experimento["amostras"] += len(aceitas)
+        experimento["intervalos"].append({
+            "inicio_ms": int(timestamps.min()) if len(timestamps) else None,
+            "fim_ms": int(timestamps.max()) if len(timestamps) else None,
+            "amostras": len(aceitas),
+        })
+
+    return {
+        "total_experimentos": len(experimentos),
+        "experimentos": list(experimentos.values()),
+    }
+
+def busca_por_retangulo(db: sqlite3.Connection, lat_min: float, lat_max: float, lon_min: float, lon_max: float) -> Dict[str, Any]:
+    """Experimentos e intervalos de amostras dentro do retângulo informado."""
+    return _busca_espacial(
+        db, lat_min, lat_max, lon_min, lon_max,
+        lambda latitudes, longitudes: np.ones(len(latitudes), dtype=bool)
+    )
+
+def busca_por_raio(db: sqlite3.Connection, latitude: float, longitude: float, raio_m: float) -> Dict[str, Any]:
+    """Experimentos e intervalos de amostras a até raio_m metros do ponto informado."""
+    lat_min, lat_max, lon_min, lon_max = retangulo_do_raio(latitude, longitude, raio_m)
+
+    return _busca_espacial(
+        db, lat_min, lat_max, lon_min, lon_max,
+        lambda latitudes, longitudes: distancias_haversine(latitude, longitude, latitudes, longitudes) <= raio_m
+    )
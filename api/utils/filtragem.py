@@ -0,0 +1,194 @@
+import sqlite3
+import logging, os
+import numpy as np
+from typing import Any, Dict, List, Optional
+from dotenv import load_dotenv
+import api.utils.crud as crud
+from api.utils.cache import cache_resultados
+from api.utils.telemetria import Telemetria
+from api.utils.trajetoria import R_TERRA, projeta_local_metros
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+G = 9.80665  # Aceleração da gravidade padrão (m/s²)
+
+# Desvios-padrão do modelo (metros e m/s³)
+FILTRO_SIGMA_GPS_M = float(os.getenv('FILTRO_SIGMA_GPS_M', '2.5'))
+FILTRO_SIGMA_ALTURA_M = float(os.getenv('FILTRO_SIGMA_ALTURA_M', '1.0'))
+FILTRO_JERK_REPOUSO = float(os.getenv('FILTRO_JERK_REPOUSO', '0.05'))
+FILTRO_JERK_VOO = float(os.getenv('FILTRO_JERK_VOO', '50.0'))
+# Rejeição de outliers: velocidade implícita entre fixes e teste de inovação (em desvios-padrão)
+FILTRO_VELOCIDADE_MAX_MS = float(os.getenv('FILTRO_VELOCIDADE_MAX_MS', '100.0'))
+FILTRO_GATE_SIGMAS = float(os.getenv('FILTRO_GATE_SIGMAS', '3.0'))
+
+
+def rejeita_saltos(tempo_s: np.ndarray, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """
+    Marca como outlier o fix GPS cuja velocidade implícita em relação ao último
+    fix aceito excede FILTRO_VELOCIDADE_MAX_MS. Retorna a máscara de rejeitados.
+    """
+    rejeitados = np.isnan(x) | np.isnan(y)
+    ultimo = None
+    for i in np.flatnonzero(~rejeitados):
+        if ultimo is not None:
+            delta_t = max(tempo_s[i] - tempo_s[ultimo], 1e-3)
+            if np.hypot(x[i] - x[ultimo], y[i] - y[ultimo]) / delta_t > FILTRO_VELOCIDADE_MAX_MS:
+                rejeitados[i] = True
+                continue
+        ultimo = i
+
+    return rejeitados
+
+def kalman_aceleracao_constante(tempo_s: np.ndarray, medidas: np.ndarray, sigmas_medida: np.ndarray,
+                                jerk: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Filtro de Kalman de aceleração constante (estado [posição, velocidade, aceleração])
+    seguido do suavizador RTS, vetorizado sobre os eixos.
+
+    medidas: N x E (NaN = sem medida); sigmas_medida: E; jerk: N (desvio-padrão
+    do jerk por amostra, usado para adaptar o ruído de processo ao IMU).
+    Retorna as posições suavizadas (N x E) e a máscara de medidas rejeitadas pelo
+    teste de inovação.
+    """
+    total, eixos = medidas.shape
+    estados = np.zeros((total, eixos, 3))
+    covariancias = np.zeros((total, eixos, 3, 3))
+    estados_previstos = np.zeros((total, eixos, 3))
+    covariancias_previstas = np.zeros((total, eixos, 3, 3))
+    transicoes = np.zeros((total, 3, 3))
+    rejeitadas = np.zeros((total, eixos), dtype=bool)
+    variancias_medida = np.asarray(sigmas_medida, dtype=float) ** 2
+
+    # Posição inicial de cada eixo: primeira medida disponível
+    estado = np.zeros((eixos, 3))
+    for eixo in range(eixos):
+        disponiveis = medidas[~np.isnan(medidas[:, eixo]), eixo]
+        estado[eixo, 0] = disponiveis[0] if len(disponiveis) else 0.0
+    covariancia = np.tile(np.diag([variancias_medida.max() * 10, 100.0, 100.0]), (eixos, 1, 1))
+
+    for k in range(total):
+        delta_t = tempo_s[k] - tempo_s[k - 1] if k > 0 else 0.0
+        F = np.array([[1.0, delta_t, delta_t**2 / 2], [0.0, 1.0, delta_t], [0.0, 0.0, 1.0]])
+        Q = jerk[k]**2 * np.array([
+            [delta_t**5 / 20, delta_t**4 / 8, delta_t**3 / 6],
+            [delta_t**4 / 8, delta_t**3 / 3, delta_t**2 / 2],
+            [delta_t**3 / 6, delta_t**2 / 2, delta_t],
+        ])
+
+        # Predição para todos os eixos de uma vez
+        estado = estado @ F.T
+        covariancia = F @ covariancia @ F.T + Q
+        transicoes[k] = F
+        estados_previstos[k] = estado
+        covariancias_previstas[k] = covariancia
+
+        # Atualização (H = [1, 0, 0]) com teste de inovação
+        inovacao = medidas[k] - estado[:, 0]
+        variancia_inovacao = covariancia[:, 0, 0] + variancias_medida
+        valida = ~np.isnan(inovacao) & (inovacao**2 <= FILTRO_GATE_SIGMAS**2 * variancia_inovacao)
+        rejeitadas[k] = ~np.isnan(inovacao) & ~valida
+
+        ganho = covariancia[:, :, 0] / variancia_inovacao[:, None]
+        ganho[~valida] = 0.0
+        estado = estado + ganho * np.nan_to_num(inovacao)[:, None]
+        covariancia = covariancia - ganho[:, :, None] * covariancia[:, 0, None, :]
+
+        estados[k] = estado
+        covariancias[k] = covariancia
+
+    # Suavizador Rauch-Tung-Striebel (passo para trás)
+    suavizados = estados.copy()
+    for k in range(total - 2, -1, -1):
+        F = transicoes[k + 1]
+        ganho = covariancias[k] @ F.T @ np.linalg.pinv(covariancias_previstas[k + 1])
+        suavizados[k] = estados[k] + np.einsum('eij,ej->ei', ganho, suavizados[k + 1] - estados_previstos[k + 1])
+
+    return {"posicoes": suavizados[:, :, 0], "rejeitadas": rejeitadas}
+
+def filtra_dados_voo(dados: List[sqlite3.Row]) -> List[Dict[str, Any]]:
+    """
+    Suaviza posição (latitude/longitude) e altura fundindo o GPS com o acelerômetro:
+    a magnitude do IMU adapta o ruído de processo (baixo em repouso na base,
+    alto durante a propulsão), o que elimina o jitter do GPS parado. Fixes com
+    saltos impossíveis ou inovação fora do limite são rejeitados.
+    Retorna os registros com os valores filtrados e timestamp em epoch ms.
+    """
+    registros = [dict(linha) for linha in dados]
+    if len(registros) < 2:
+        return [{**registro, 'gps_rejeitado': False} for registro in registros]
+
+    def coluna(nome):
+        return np.array([np.nan if registro[nome] is None else registro[nome] for registro in registros], dtype=float)
+
+    tempo_s = (coluna('timestamp') - registros[0]['timestamp']) / 1000
+    latitudes, longitudes, alturas = coluna('latitude'), coluna('longitude'), coluna('altura')
+
+    validos = ~np.isnan(latitudes) & ~np.isnan(longitudes)
+    if not validos.any():
+        return [{**registro, 'gps_rejeitado': False} for registro in registros]
+
+    referencia = np.flatnonzero(validos)[0]
+    lat0, lon0 = latitudes[referencia], longitudes[referencia]
+    x, y = projeta_local_metros(np.r_[lat0, latitudes], np.r_[lon0, longitudes])
+    x, y = x[1:], y[1:]
+
+    saltos = rejeita_saltos(tempo_s, x, y) & validos
+    x[saltos] = np.nan
+    y[saltos] = np.nan
+
+    aceleracao = np.sqrt(coluna('accel_x')**2 + coluna('accel_y')**2 + coluna('accel_z')**2)
+    desvio_g = np.nan_to_num(np.abs(aceleracao - G) / G, nan=1.0)
+    jerk = FILTRO_JERK_REPOUSO + FILTRO_JERK_VOO * np.minimum(desvio_g, 10.0)
+
+    resultado = kalman_aceleracao_constante(
+        tempo_s,
+        np.column_stack((x, y, alturas)),
+        np.array([FILTRO_SIGMA_GPS_M, FILTRO_SIGMA_GPS_M, FILTRO_SIGMA_ALTURA_M]),
+        jerk
+    )
+    posicoes = resultado["posicoes"]
+    rejeitados = saltos | resultado["rejeitadas"][:, 0] | resultado["rejeitadas"][:, 1]
+
+    latitudes_filtradas = lat0 + np.degrees(posicoes[:, 1] / R_TERRA)
+    longitudes_filtradas = lon0 + np.degrees(posicoes[:, 0] / (R_TERRA * np.cos(np.radians(lat0))))
+
+    for i, registro in enumerate(registros):
+        registro['latitude'] = float(latitudes_filtradas[i])
+        registro['longitude'] = float(longitudes_filtradas[i])
+        if registro['altura'] is not None:
+            registro['altura'] = round(float(posicoes[i, 2]), 3)
+        registro['gps_rejeitado'] = bool(rejeitados[i])
+
+    return registros
+
+def busca_dados_filtrados(db: sqlite3.Connection, id_experimento: int) -> List[Dict[str, Any]]:
+    """Série filtrada do experimento, calculada uma vez por versão dos dados."""
+    versao = crud.select_versao_dados(db, id_experimento)
+
+    def calcular():
+        logger.info(f"Filtrando a série do experimento {id_experimento}.")
+        return filtra_dados_voo(crud.select_dados_brutos_experimento(db, id_experimento))
+
+    return cache_resultados.obter_ou_calcular(("filtrado", id_experimento, versao), calcular)
+
+def select_experimento_filtrado(db: sqlite3.Connection, id_experimento: int,
+                                inicio_ms: Optional[int] = None, fim_ms: Optional[int] = None) -> Optional[dict]:
+    """
+    Equivalente a crud.select_experimento_completo, com os dados associados
+    vindos da série filtrada e a distância acumulada calculada sobre ela.
+    """
+    experimento = crud.select_experimento(db, id_experimento)
+    if not experimento:
+        logger.info(f"Experimento com ID {id_experimento} não encontrado.")
+        return None
+
+    dados = [
+        registro for registro in busca_dados_filtrados(db, id_experimento)
+        if (inicio_ms is None or registro['timestamp'] >= inicio_ms) and (fim_ms is None or registro['timestamp'] <= fim_ms)
+    ]
+
+    return {
+        "experimento": experimento,
+        "dados_associados": Telemetria.de_registros(dados).enriquecida()
+    }
@@ -1,5 +1,8 @@
 import math, io, csv
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
 
 
 def haversine(lat1, lon1, lat2, lon2):
@@ -22,43 +25,128 @@ def haversine(lat1, lon1, lat2, lon2):
     distance = R * c
     return distance
 
-def formata_dados_experimento_especifico(dados_experimento : list):
-    dados_registros = []
-    distancia_acumulada = 0.0
-    altura_inicial = 0.0
-    datetime_inicial = datetime.strptime(dict(dados_experimento[0])['timestamp'], '%Y-%m-%d %H:%M:%S')
-    
-    for i in range(0, len(dados_experimento)):
-        dict_dados = dict(dados_experimento[i])
-        
-        if i == 0:
-            dict_dados['distancia'] = distancia_acumulada
-            dict_dados['altura_lancamento'] = altura_inicial
-            altura_inicial = dict_dados['altura']
-            
+class AcumuladorVoo:
+    """
+    Estado incremental do enriquecimento dos dados de voo (distância acumulada,
+    altura relativa ao lançamento e segundos desde o primeiro registro), junto
+    com os valores de resumo do experimento. Permite enriquecer amostras uma a
+    uma, como na ingestão ao vivo, e retomar a partir do resumo gravado.
+    Amostras sem posição não somam distância; sem altura, não têm altura relativa.
+    """
+
+    # Campos persistidos na tabela RESUMO_EXPERIMENTO
+    CAMPOS_RESUMO = (
+        "total_amostras", "timestamp_inicial", "timestamp_final", "altura_inicial",
+        "altura_maxima", "velocidade_maxima", "distancia_total", "ultima_latitude", "ultima_longitude",
+    )
+
+    def __init__(self):
+        self.timestamp_inicial = None
+        self.timestamp_final = None
+        self.altura_inicial = 0.0
+        self.altura_maxima = None
+        self.velocidade_maxima = None
+        self.distancia_acumulada = 0.0
+        self.ultimo_ponto = None
+        self.total_amostras = 0
+
+    def adicionar(self, dict_dados: dict) -> dict:
+        timestamp = dict_dados['timestamp']
+        altura = dict_dados.get('altura')
+        velocidade = dict_dados.get('speed_kmph')
+        ponto = None
+        if dict_dados.get('latitude') is not None and dict_dados.get('longitude') is not None:
+            ponto = (dict_dados['latitude'], dict_dados['longitude'])
+
+        if self.timestamp_inicial is None:
+            self.timestamp_inicial = timestamp
+            dict_dados['distancia'] = self.distancia_acumulada
+            dict_dados['altura_lancamento'] = self.altura_inicial
+            dict_dados['timestamp'] = 0.0
+            self.altura_inicial = altura
+
         else:
-            dict_ant = dict(dados_experimento[i-1])
-            
-            tempo_atual_datetime = datetime.strptime(dict_dados['timestamp'], '%Y-%m-%d %H:%M:%S')
-            segundos_atual = (tempo_atual_datetime - datetime_inicial).total_seconds()
-            
-            distancia_calculada = haversine(dict_ant['latitude'],
-                                            dict_ant['longitude'],
-                                            dict_dados['latitude'],
-                                            dict_dados['longitude'],
-                                            )
-            
-                        
-            distancia_acumulada += distancia_calculada
-            
-            dict_dados['distancia'] = round(distancia_acumulada,2)
-            dict_dados['altura_lancamento'] = round(dict_dados['altura'] - altura_inicial,2)
-            dict_dados['timestamp'] = segundos_atual
-        
-        dados_registros.append(dict_dados)
+            if ponto is not None and self.ultimo_ponto is not None:
+                self.distancia_acumulada += haversine(self.ultimo_ponto[0],
+                                                      self.ultimo_ponto[1],
+                                                      ponto[0],
+                                                      ponto[1],
+                                                      )
 
-    
-    return dados_registros
+            dict_dados['distancia'] = round(self.distancia_acumulada,2)
+            dict_dados['altura_lancamento'] = (
+                round(altura - self.altura_inicial,2) if altura is not None and self.altura_inicial is not None else None
+            )
+            dict_dados['timestamp'] = (timestamp - self.timestamp_inicial) / 1000
+
+        if ponto is not None:
+            self.ultimo_ponto = ponto
+        if altura is not None:
+            self.altura_maxima = altura if self.altura_maxima is None else max(self.altura_maxima, altura)
+        if velocidade is not None:
+            self.velocidade_maxima = velocidade if self.velocidade_maxima is None else max(self.velocidade_maxima, velocidade)
+        self.timestamp_final = timestamp
+        self.total_amostras += 1
+
+        return dict_dados
+
+    def para_resumo(self) -> dict:
+        """Valores de resumo do voo até a última amostra adicionada."""
+        ultima_latitude, ultima_longitude = self.ultimo_ponto if self.ultimo_ponto else (None, None)
+
+        return {
+            "total_amostras": self.total_amostras,
+            "timestamp_inicial": self.timestamp_inicial,
+            "timestamp_final": self.timestamp_final,
+            "altura_inicial": self.altura_inicial if self.timestamp_inicial is not None else None,
+            "altura_maxima": self.altura_maxima,
+            "velocidade_maxima": self.velocidade_maxima,
+            "distancia_total": self.distancia_acumulada,
+            "ultima_latitude": ultima_latitude,
+            "ultima_longitude": ultima_longitude,
+        }
+
+    @classmethod
+    def de_resumo(cls, resumo: dict) -> "AcumuladorVoo":
+        """Recria o estado incremental a partir de um resumo gravado."""
+        acumulador = cls()
+        acumulador.total_amostras = resumo["total_amostras"]
+        acumulador.timestamp_inicial = resumo["timestamp_inicial"]
+        acumulador.timestamp_final = resumo["timestamp_final"]
+        acumulador.altura_inicial = resumo["altura_inicial"] if resumo["timestamp_inicial"] is not None else 0.0
+        acumulador.altura_maxima = resumo["altura_maxima"]
+        acumulador.velocidade_maxima = resumo["velocidade_maxima"]
+        acumulador.distancia_acumulada = resumo["distancia_total"] or 0.0
+        if resumo["ultima_latitude"] is not None and resumo["ultima_longitude"] is not None:
+            acumulador.ultimo_ponto = (resumo["ultima_latitude"], resumo["ultima_longitude"])
+
+        return acumulador
+
+def formata_dados_experimento_especifico(dados_experimento : list):
+    """
+    Enriquece os registros com distância acumulada e altura relativa ao lançamento.
+    O timestamp (epoch em ms) é convertido para segundos desde o primeiro registro.
+    """
+    acumulador = AcumuladorVoo()
+
+    return [acumulador.adicionar(dict(linha)) for linha in dados_experimento]
+
+def timestamp_para_epoch_ms(valor) -> Optional[int]:
+    """
+    Converte um timestamp isolado (epoch em ms ou texto ISO 8601) para epoch em ms (UTC).
+    Levanta ValueError se o texto não puder ser interpretado.
+    """
+    if valor is None:
+        return None
+
+    if isinstance(valor, (int, float)):
+        return int(round(valor))
+
+    data = datetime.fromisoformat(str(valor).strip())
+    if data.tzinfo is None:
+        data = data.replace(tzinfo=timezone.utc)
+
+    return (data - EPOCH) // timedelta(milliseconds=1)
 
 def formata_nome_colunas_experimento(experimento : dict):
     mapeamento_chaves = {
@@ -0,0 +1,221 @@
+import sqlite3
+import asyncio
+import io, zipfile, uuid
+import logging, os
+import numpy as np
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from dotenv import load_dotenv
+from api.core.profiling import run_in_threadpool
+from api.core.repositorio import obter_repositorio
+from api.utils.analise import aceleracao_por_velocidade, distancia_horizontal_acumulada
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+# Processos de renderização (0 ou 1 renderiza na própria thread da requisição)
+GRAFICOS_WORKERS = int(os.getenv('GRAFICOS_WORKERS', str(min(4, os.cpu_count() or 1))))
+
+TIPOS_GRAFICO = {
+    "distancia": {"coluna": 1, "rotulo": "Distância Acumulada (km)", "titulo": "Distância Acumulada vs. Tempo"},
+    "velocidade": {"coluna": 2, "rotulo": "Velocidade (km/h)", "titulo": "Velocidade vs. Tempo"},
+    "aceleracao": {"coluna": 3, "rotulo": "Aceleração (m/s²)", "titulo": "Aceleração vs. Tempo"},
+}
+# Colunas da matriz de séries: tempo (epoch ms), distância (km), velocidade (km/h), aceleração (m/s²)
+COLUNAS_SERIE = 4
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def carregar_series(db: sqlite3.Connection, ids_experimentos: Sequence[int]) -> Dict[int, Dict[str, Any]]:
+    """
+    Carrega de uma vez (pelo repositório analítico) as amostras dos experimentos e
+    calcula, com NumPy, todas as séries usadas pelos gráficos. Retorna
+    {id: {"nome", "dados" (N x COLUNAS_SERIE)}} somente para os experimentos encontrados.
+    """
+    marcadores = ", ".join("?" for _ in ids_experimentos)
+    cursor = db.cursor()
+    cursor.execute(f"SELECT id, nome FROM EXPERIMENTO WHERE id IN ({marcadores})", tuple(ids_experimentos))
+    nomes = {linha['id']: linha['nome'] for linha in cursor.fetchall()}
+
+    colunas = obter_repositorio(db).colunas_experimentos(
+        [id_experimento for id_experimento in ids_experimentos if id_experimento in nomes],
+        ("timestamp", "latitude", "longitude", "speed_kmph")
+    )
+
+    series = {}
+    for id_experimento in ids_experimentos:
+        if id_experimento not in nomes or id_experimento in series:
+            continue
+
+        amostras = colunas.get(id_experimento)
+        if amostras is None:
+            validos = np.zeros(0, dtype=bool)
+            amostras = {nome: np.zeros(0) for nome in ("timestamp", "latitude", "longitude", "speed_kmph")}
+        else:
+            validos = ~np.isnan(amostras["latitude"]) & ~np.isnan(amostras["longitude"]) & ~np.isnan(amostras["timestamp"])
+
+        tempo_ms = amostras["timestamp"][validos]
+        dados = np.empty((len(tempo_ms), COLUNAS_SERIE))
+        dados[:, 0] = tempo_ms
+        dados[:, 1] = distancia_horizontal_acumulada(amostras["latitude"][validos], amostras["longitude"][validos]) / 1000
+        dados[:, 2] = amostras["speed_kmph"][validos]
+        dados[:, 3] = aceleracao_por_velocidade((tempo_ms - tempo_ms[:1]) / 1000, dados[:, 2] / 3.6)
+        series[id_experimento] = {"nome": nomes[id_experimento], "dados": dados}
+
+    return series
+
+def planejar_graficos(series: Dict[int, Dict[str, Any]], tipos: Sequence[str], sobrepor: bool) -> Tuple[np.ndarray, List[Dict[str, Any]]]:
+    """
+    Junta as séries numa única matriz e descreve cada gráfico como uma tarefa que
+    referencia trechos (linhas inicio:fim) dessa matriz. Com sobrepor, há um
+    gráfico por tipo com todos os experimentos; sem, um por (experimento, tipo).
+    """
+    blocos, trechos, inicio = [], {}, 0
+    for id_experimento, serie in series.items():
+        blocos.append(serie["dados"])
+        trechos[id_experimento] = (serie["nome"], inicio, inicio + len(serie["dados"]))
+        inicio += len(serie["dados"])
+
+    matriz = np.concatenate(blocos) if blocos else np.empty((0, COLUNAS_SERIE))
+
+    tarefas = []
+    for tipo in tipos:
+        if sobrepor:
+            tarefas.append({
+                "arquivo": f"{tipo}_vs_tempo.png",
+                "tipo": tipo,
+                "relativo": True,
+                "series": list(trechos.values()),
+            })
+        else:
+            tarefas.extend({
+                "arquivo": f"{tipo}_vs_tempo_exp_{id_experimento}.png",
+                "tipo": tipo,
+                "relativo": False,
+                "series": [trecho],
+            } for id_experimento, trecho in trechos.items())
+
+    return matriz, tarefas
+
+def renderizar_grafico(matriz: np.ndarray, tarefa: Dict[str, Any]) -> bytes:
+    """
+    Renderiza o gráfico descrito pela tarefa em PNG. Usa a API orientada a
+    objetos do matplotlib (sem pyplot), sem estado global entre gráficos.
+    """
+    # Importados sob demanda: só a renderização precisa do matplotlib
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    import matplotlib.dates as mdates
+
+    tipo = TIPOS_GRAFICO[tarefa["tipo"]]
+    figura = Figure(figsize=(12, 6))
+    FigureCanvasAgg(figura)
+    eixo = figura.add_subplot()
+
+    for nome, inicio, fim in tarefa["series"]:
+        trecho = matriz[inicio:fim]
+        valores = trecho[:, tipo["coluna"]]
+        validos = ~np.isnan(valores)
+        if tarefa["relativo"]:
+            tempos = (trecho[validos, 0] - trecho[0, 0]) / 1000 if len(trecho) else trecho[validos, 0]
+        else:
+            tempos = trecho[validos, 0].astype('int64').astype('datetime64[ms]')
+        eixo.plot(tempos, valores[validos], linestyle='-', label=nome)
+
+    if tarefa["tipo"] == "aceleracao":
+        eixo.axhline(0, color='black', linewidth=0.8, linestyle='--')
+
+    eixo.set_ylabel(tipo["rotulo"])
+    eixo.grid(True)
+    if tarefa["relativo"]:
+        eixo.set_xlabel("Tempo desde o início (s)")
+        eixo.set_title(tipo["titulo"])
+        eixo.legend()
+    else:
+        eixo.set_xlabel("Tempo")
+        eixo.set_title(f"{tipo['titulo']} - {tarefa['series'][0][0]}")
+        eixo.xaxis.set_major_formatter(mdates.DateFormatter('%H:%M:%S'))
+        figura.autofmt_xdate()
+
+    saida = io.BytesIO()
+    figura.savefig(saida, format="png")
+
+    return saida.getvalue()
+
+def _renderizar_em_worker(nome_memoria: str, forma: Tuple[int, int], tarefa: Dict[str, Any]) -> bytes:
+    """Executado no processo de renderização: lê a matriz direto da memória compartilhada."""
+    memoria = shared_memory.SharedMemory(name=nome_memoria)
+    matriz = np.ndarray(forma, dtype=np.float64, buffer=memoria.buf)
+    try:
+        return renderizar_grafico(matriz, tarefa)
+    finally:
+        del matriz
+        memoria.close()
+
+def _obter_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        # spawn: os workers não herdam threads nem conexões do servidor
+        _executor = ProcessPoolExecutor(max_workers=GRAFICOS_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        logger.info(f"Pool de renderização de gráficos iniciado com {GRAFICOS_WORKERS} processos.")
+
+    return _executor
+
+def encerrar_executor():
+    """Finaliza o pool de renderização (chamado no desligamento da aplicação)."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(cancel_futures=True)
+        _executor = None
+
+async def renderizar_graficos(matriz: np.ndarray, tarefas: List[Dict[str, Any]]) -> Dict[str, bytes]:
+    """
+    Renderiza as tarefas em paralelo nos processos do pool. A matriz é copiada
+    uma única vez para um bloco de memória compartilhada, lido pelos workers
+    sem serialização dos dados. Retorna {nome do arquivo: PNG}.
+    """
+    if GRAFICOS_WORKERS <= 1 or len(tarefas) <= 1 or matriz.size == 0:
+        resultados = [await run_in_threadpool(renderizar_grafico, matriz, tarefa) for tarefa in tarefas]
+        return {tarefa["arquivo"]: png for tarefa, png in zip(tarefas, resultados)}
+
+    memoria = shared_memory.SharedMemory(create=True, size=matriz.nbytes)
+    try:
+        np.ndarray(matriz.shape, dtype=np.float64, buffer=memoria.buf)[:] = matriz
+        loop = asyncio.get_running_loop()
+        executor = _obter_executor()
+        resultados = await asyncio.gather(*(
+            loop.run_in_executor(executor, _renderizar_em_worker, memoria.name, matriz.shape, tarefa)
+            for tarefa in tarefas
+        ))
+    finally:
+        memoria.close()
+        memoria.unlink()
+
+    return {tarefa["arquivo"]: png for tarefa, png in zip(tarefas, resultados)}
+
+def empacotar_zip(arquivos: Dict[str, bytes]) -> bytes:
+    """ZIP sem compressão (PNG já é comprimido)."""
+    saida = io.BytesIO()
+    with zipfile.ZipFile(saida, "w", compression=zipfile.ZIP_STORED) as arquivo_zip:
+        for nome, conteudo in arquivos.items():
+            arquivo_zip.writestr(nome, conteudo)
+
+    return saida.getvalue()
+
+def empacotar_multipart(arquivos: Dict[str, bytes]) -> Tuple[bytes, str]:
+    """Corpo multipart/mixed com uma parte image/png por gráfico. Retorna (corpo, boundary)."""
+    boundary = uuid.uuid4().hex
+    partes = []
+    for nome, conteudo in arquivos.items():
+        partes.append(
+            f"--{boundary}\r\n"
+            f"Content-Type: image/png\r\n"
+            f"Content-Disposition: attachment; filename=\"{nome}\"\r\n"
+            f"Content-Length: {len(conteudo)}\r\n\r\n".encode() + conteudo + b"\r\n"
+        )
+    partes.append(f"--{boundary}--\r\n".encode())
+
+    return b"".join(partes), boundary
@@ -1,9 +1,10 @@
-import sqlite3
-from datetime import datetime
+import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
-from api.core.database import DATABASE_URL
+from api.core.database import get_db_connection
+from api.core.repositorio import obter_repositorio
 from api.utils.formatacao import haversine
+from api.utils.analise import aceleracao_por_velocidade
 import dotenv
 
 dotenv.load_dotenv()
@@ -14,21 +15,33 @@ def get_dados_experimento(experimento_id: int):
     Busca latitude, longitude e timestamp para um dado experimento_id,
     ordenados por timestamp.
     """
-    conn = sqlite3.connect(DATABASE_URL)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-    
-    cursor.execute("""
-        SELECT timestamp, latitude, longitude, speed_kmph
-        FROM DADOS_EXPERIMENTO 
-        WHERE fk_exp = ? AND latitude IS NOT NULL AND longitude IS NOT NULL AND timestamp IS NOT NULL
-        ORDER BY timestamp ASC 
-    """, (experimento_id,))
-    
-    rows = cursor.fetchall()
-    conn.close()
-    
-    return rows
+    conn = get_db_connection()
+    try:
+        colunas = obter_repositorio(conn).colunas_experimentos(
+            [experimento_id], ("timestamp", "latitude", "longitude", "speed_kmph")
+        ).get(experimento_id)
+    finally:
+        conn.close()
+
+    if colunas is None:
+        return []
+
+    validos = ~np.isnan(colunas['latitude']) & ~np.isnan(colunas['longitude']) & ~np.isnan(colunas['timestamp'])
+
+    return [
+        {
+            'timestamp': int(timestamp), 'latitude': float(latitude), 'longitude': float(longitude),
+            'speed_kmph': None if np.isnan(velocidade) else float(velocidade),
+        }
+        for timestamp, latitude, longitude, velocidade in zip(
+            colunas['timestamp'][validos], colunas['latitude'][validos],
+            colunas['longitude'][validos], colunas['speed_kmph'][validos]
+        )
+    ]
+
+def epoch_ms_para_datetime64(timestamps_ms):
+    """Converte timestamps em epoch ms para datetime64 (eixo de tempo do matplotlib)."""
+    return np.asarray(timestamps_ms, dtype='int64').astype('datetime64[ms]')
 
 def plot_distancia_acumulada_vs_tempo(experimento_id: int, nome_experimento: str = "Experimento"):
     """
@@ -43,42 +56,17 @@ def plot_distancia_acumulada_vs_tempo(experimento_id: int, nome_experimento: str
     tempos = []
     distancias_acumuladas = []
     distancia_total = 0.0
-    
-    # Parse do primeiro timestamp para referência de tempo decorrido
-    try:
-        primeiro_timestamp_obj = datetime.strptime(dados[0]['timestamp'], '%Y-%m-%d %H:%M:%S')
-
-    except ValueError as e:
-        print(f"Erro ao parsear o primeiro timestamp: {dados[0]['timestamp']}. Erro: {e}")
-
-        try:
-            primeiro_timestamp_obj = datetime.fromisoformat(dados[0]['timestamp'])
-        except ValueError:
-            print("Não foi possível parsear o timestamp. Verifique o formato no CSV e no banco.")
-            return
-
 
     ponto_anterior = {
         'lat': dados[0]['latitude'],
         'lon': dados[0]['longitude'],
-        'time_obj': primeiro_timestamp_obj
     }
 
-    tempos.append(primeiro_timestamp_obj) # Usar objetos datetime para o eixo x
+    tempos.append(dados[0]['timestamp'])
     distancias_acumuladas.append(0.0)
 
     for i in range(1, len(dados)):
         linha_atual = dados[i]
-        
-        try:
-            timestamp_atual_obj = datetime.strptime(linha_atual['timestamp'], '%Y-%m-%d %H:%M:%S')
-        except ValueError:
-            try:
-                timestamp_atual_obj = datetime.fromisoformat(linha_atual['timestamp'])
-            except ValueError:
-                print(f"Pulando linha devido a erro no parse do timestamp: {linha_atual['timestamp']}")
-                continue
-
 
         lat_atual = linha_atual['latitude']
         lon_atual = linha_atual['longitude']
@@ -86,12 +74,14 @@ def plot_distancia_acumulada_vs_tempo(experimento_id: int, nome_experimento: str
         distancia_segmento = haversine(ponto_anterior['lat'], ponto_anterior['lon'], lat_atual, lon_atual)
         distancia_total += distancia_segmento
 
-        tempos.append(timestamp_atual_obj)
+        tempos.append(linha_atual['timestamp'])
         distancias_acumuladas.append(distancia_total / 1000)  # Convertendo para km
 
         ponto_anterior['lat'] = lat_atual
         ponto_anterior['lon'] = lon_atual
-        ponto_anterior['time_obj'] = timestamp_atual_obj
+
+    # Timestamps já estão em epoch ms: conversão direta, sem parse de texto
+    tempos = epoch_ms_para_datetime64(tempos)
 
     # Plotagem
     plt.figure(figsize=(12, 6))
@@ -125,8 +115,8 @@ def plot_velocidade_vs_tempo(experimento_id: int, nome_experimento: str="Experim
         print(f"Não há dados suficientes para gerar o gráfico para o experimento ID {experimento_id}.")
         return
 
-    tempos = [datetime.strptime(d['timestamp'], '%Y-%m-%d %H:%M:%S') for d in dados]
-    velocidades = [d['speed_kpmh'] for d in dados]
+    tempos = epoch_ms_para_datetime64([d['timestamp'] for d in dados])
+    velocidades = [d['speed_kmph'] for d in dados]
 
     plt.figure(figsize=(12, 6))
     plt.plot(tempos, velocidades, color='blue', linestyle='-')
@@ -152,32 +142,20 @@ def plot_aceleracao_vs_tempo(experimento_id: int, dados, nome_experimento: str):
         print("Dados insuficientes para calcular aceleração.")
         return
 
-    tempos_aceleracao = []
-    aceleracoes = []
-
-    for i in range(1, len(dados)):
-        ponto_anterior = dados[i-1]
-        ponto_atual = dados[i]
-
-        # Converter velocidades de km/h para m/s
-        v_anterior_ms = ponto_anterior['speed_kpmh'] * (1000 / 3600)
-        v_atual_ms = ponto_atual['speed_kpmh'] * (1000 / 3600)
-
-        # Converter timestamps para objetos datetime e calcular delta T em segundos
-        t_anterior = datetime.strptime(ponto_anterior['timestamp'], '%Y-%m-%d %H:%M:%S')
-        t_atual = datetime.strptime(ponto_atual['timestamp'], '%Y-%m-%d %H:%M:%S')
-        delta_t_s = (t_atual - t_anterior).total_seconds()
+    # Cálculo vetorizado (timestamps em epoch ms, velocidades em km/h -> m/s)
+    timestamps = np.array([d['timestamp'] for d in dados], dtype='int64')
+    velocidades_ms = np.array([np.nan if d['speed_kmph'] is None else d['speed_kmph'] for d in dados], dtype=float) / 3.6
+    aceleracoes = aceleracao_por_velocidade((timestamps - timestamps[0]) / 1000, velocidades_ms)
 
-        if delta_t_s > 0:
-            # Calcular aceleração: a = (v_final - v_inicial) / delta_t
-            aceleracao = (v_atual_ms - v_anterior_ms) / delta_t_s
-            aceleracoes.append(aceleracao)
-            tempos_aceleracao.append(t_atual) # Associar aceleração com o timestamp do ponto final do intervalo
-
-    if not tempos_aceleracao:
+    # Aceleração associada ao timestamp do ponto final de cada intervalo
+    validos = ~np.isnan(aceleracoes)
+    if not validos.any():
         print("Não foi possível calcular nenhum ponto de aceleração.")
         return
 
+    tempos_aceleracao = epoch_ms_para_datetime64(timestamps[validos])
+    aceleracoes = aceleracoes[validos]
+
     plt.figure(figsize=(12, 6))
     plt.plot(tempos_aceleracao, aceleracoes, color='red', linestyle='-')
     
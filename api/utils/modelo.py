@@ -0,0 +1,193 @@
+import json
+import sqlite3
+import logging
+import numpy as np
+from typing import Any, Dict, List, Optional
+from api.utils.cache import cache_resultados
+
+logger = logging.getLogger(__name__)
+
+# Parâmetros de lançamento (colunas de EXPERIMENTO) usados como variáveis explicativas, além do intercepto
+VARIAVEIS = ("pressao_psi", "volume_agua", "massa_total_foguete")
+
+# Respostas ajustadas e a expressão que as obtém do resumo do voo (NULL se o voo não permite calculá-la)
+RESPOSTAS = {
+    "alcance": "CASE WHEN r.ultima_latitude IS NULL THEN NULL ELSE r.distancia_total END",
+    "apogeu": "r.altura_maxima - r.altura_inicial",
+}
+
+# Observações necessárias para determinar os coeficientes (intercepto e um por variável)
+MINIMO_OBSERVACOES = len(VARIAVEIS) + 1
+# Menor valor singular de X'X (escalado) para considerar os coeficientes determinados
+TOLERANCIA_POSTO = 1e-9
+
+SQL_OBSERVACOES = f"""
+    SELECT e.id, {", ".join(f"e.{variavel}" for variavel in VARIAVEIS)},
+    {", ".join(f"{expressao} AS {resposta}" for resposta, expressao in RESPOSTAS.items())}
+    FROM EXPERIMENTO e
+    JOIN RESUMO_EXPERIMENTO r ON r.fk_exp = e.id
+"""
+
+
+def vetores(observacoes: np.ndarray, resposta: int) -> np.ndarray:
+    """
+    Vetores z = (1, variáveis..., y) das observações (linhas com as variáveis
+    seguidas das respostas) que têm a resposta de índice `resposta` e todas as variáveis.
+    """
+    observacoes = np.asarray(observacoes, dtype=float).reshape(-1, len(VARIAVEIS) + len(RESPOSTAS))
+    colunas = np.column_stack([
+        np.ones(len(observacoes)), observacoes[:, :len(VARIAVEIS)], observacoes[:, len(VARIAVEIS) + resposta]
+    ])
+
+    return colunas[~np.isnan(colunas).any(axis=1)]
+
+def estatisticas_suficientes(observacoes: np.ndarray, resposta: int) -> np.ndarray:
+    """
+    Matriz Z'Z das observações: contém X'X, X'y e y'y, tudo o que o ajuste por
+    mínimos quadrados precisa. É aditiva, então incluir ou remover uma observação
+    é somar ou subtrair a sua parcela.
+    """
+    z = vetores(observacoes, resposta)
+    return z.T @ z
+
+def ajustar(matriz: np.ndarray) -> Optional[Dict[str, Any]]:
+    """
+    Coeficientes de mínimos quadrados a partir de Z'Z (equações normais), com R²
+    e erro padrão dos resíduos. None enquanto o ajuste é indeterminado: com menos
+    de MINIMO_OBSERVACOES observações ou com X'X singular (uma variável constante
+    ou combinação das demais), quando os coeficientes não seriam únicos.
+    """
+    xtx, xty, yty = matriz[:-1, :-1], matriz[:-1, -1], matriz[-1, -1]
+    observacoes = int(round(xtx[0, 0]))
+    if observacoes < MINIMO_OBSERVACOES:
+        return None
+
+    # Posto de X'X escalado pela diagonal, para as escalas das variáveis não afetarem a
+    # tolerância, que absorve o erro de arredondamento das somas e subtrações incrementais
+    escala = np.sqrt(np.diag(xtx))
+    if (escala == 0).any() or np.linalg.matrix_rank(xtx / np.outer(escala, escala), tol=TOLERANCIA_POSTO) < len(VARIAVEIS) + 1:
+        logger.warning("Ajuste indeterminado: as variáveis dos experimentos não variam o suficiente.")
+        return None
+
+    coeficientes = np.linalg.lstsq(xtx, xty, rcond=None)[0]
+    soma_residuos = max(float(yty - coeficientes @ xty), 0.0)
+    soma_total = float(yty - xty[0] ** 2 / observacoes)
+    graus_liberdade = observacoes - (len(VARIAVEIS) + 1)
+
+    return {
+        "observacoes": observacoes,
+        "intercepto": float(coeficientes[0]),
+        "coeficientes": dict(zip(VARIAVEIS, coeficientes[1:].tolist())),
+        "r2": 1 - soma_residuos / soma_total if soma_total > 1e-9 else None,
+        "erro_padrao": float(np.sqrt(soma_residuos / graus_liberdade)) if graus_liberdade > 0 else None,
+    }
+
+def _observacao_gravada(cursor: sqlite3.Cursor, id_experimento: int) -> Optional[tuple]:
+    cursor.execute(f"""
+        SELECT {", ".join((*VARIAVEIS, *RESPOSTAS))} FROM MODELO_OBSERVACAO
+        WHERE fk_exp = ?
+    """, (id_experimento,))
+    linha = cursor.fetchone()
+
+    return tuple(linha) if linha else None
+
+def _observacao_atual(cursor: sqlite3.Cursor, id_experimento: int) -> Optional[tuple]:
+    cursor.execute(f"{SQL_OBSERVACOES} WHERE e.id = ?", (id_experimento,))
+    linha = cursor.fetchone()
+
+    return tuple(linha)[1:] if linha else None
+
+def _somar_estatisticas(cursor: sqlite3.Cursor, resposta: str, delta: np.ndarray):
+    linha = cursor.execute("SELECT matriz FROM MODELO_ESTATISTICAS WHERE resposta = ?", (resposta,)).fetchone()
+    matriz = np.array(json.loads(linha[0])) if linha else np.zeros_like(delta)
+
+    cursor.execute("""
+        INSERT INTO MODELO_ESTATISTICAS (resposta, matriz, versao)
+        VALUES (?, ?, 1)
+        ON CONFLICT (resposta) DO UPDATE SET matriz = excluded.matriz, versao = versao + 1
+    """, (resposta, json.dumps((matriz + delta).tolist())))
+
+def atualizar_observacao(cursor: sqlite3.Cursor, id_experimento: int):
+    """
+    Atualiza as estatísticas do modelo com a observação atual do experimento
+    (parâmetros de EXPERIMENTO e respostas do resumo): subtrai a parcela gravada
+    e soma a nova, sem reajustar sobre todos os experimentos. Um experimento
+    removido ou sem resumo deixa de contribuir. A transação fica a cargo do chamador.
+    """
+    anterior = _observacao_gravada(cursor, id_experimento)
+    atual = _observacao_atual(cursor, id_experimento)
+    if anterior == atual:
+        return
+
+    for indice, resposta in enumerate(RESPOSTAS):
+        delta = estatisticas_suficientes(np.array([atual or ()], dtype=float), indice) \
+            - estatisticas_suficientes(np.array([anterior or ()], dtype=float), indice)
+        if delta.any():
+            _somar_estatisticas(cursor, resposta, delta)
+
+    if atual is None:
+        cursor.execute("DELETE FROM MODELO_OBSERVACAO WHERE fk_exp = ?", (id_experimento,))
+    else:
+        cursor.execute(f"""
+            INSERT OR REPLACE INTO MODELO_OBSERVACAO (fk_exp, {", ".join((*VARIAVEIS, *RESPOSTAS))})
+            VALUES (?, {", ".join("?" for _ in (*VARIAVEIS, *RESPOSTAS))})
+        """, (id_experimento, *atual))
+
+def recalcular_estatisticas(cursor: sqlite3.Cursor) -> int:
+    """
+    Reconstrói as observações e as estatísticas do modelo a partir de todos os
+    experimentos com resumo (a transação fica a cargo do chamador).
+    """
+    linhas = cursor.execute(SQL_OBSERVACOES).fetchall()
+    observacoes = np.array([tuple(linha)[1:] for linha in linhas], dtype=float)
+
+    cursor.execute("DELETE FROM MODELO_OBSERVACAO")
+    cursor.executemany(f"""
+        INSERT INTO MODELO_OBSERVACAO (fk_exp, {", ".join((*VARIAVEIS, *RESPOSTAS))})
+        VALUES (?, {", ".join("?" for _ in (*VARIAVEIS, *RESPOSTAS))})
+    """, [tuple(linha) for linha in linhas])
+
+    for indice, resposta in enumerate(RESPOSTAS):
+        cursor.execute("""
+            INSERT INTO MODELO_ESTATISTICAS (resposta, matriz, versao)
+            VALUES (?, ?, 1)
+            ON CONFLICT (resposta) DO UPDATE SET matriz = excluded.matriz, versao = versao + 1
+        """, (resposta, json.dumps(estatisticas_suficientes(observacoes, indice).tolist())))
+
+    return len(linhas)
+
+def busca_modelo(db: sqlite3.Connection) -> Dict[str, Optional[Dict[str, Any]]]:
+    """
+    Ajuste de cada resposta, com cache pela versão das estatísticas (uma
+    alteração em qualquer processo muda a versão e, portanto, a chave).
+    """
+    linhas = db.execute("SELECT resposta, versao, matriz FROM MODELO_ESTATISTICAS ORDER BY resposta").fetchall()
+    matrizes = {resposta: matriz for resposta, _, matriz in linhas}
+
+    def calcular():
+        logger.info("Ajustando o modelo de lançamento a partir das estatísticas gravadas.")
+        return {
+            resposta: ajustar(np.array(json.loads(matrizes[resposta]))) if resposta in matrizes else None
+            for resposta in RESPOSTAS
+        }
+
+    return cache_resultados.obter_ou_calcular(("modelo", tuple((resposta, versao) for resposta, versao, _ in linhas)), calcular)
+
+def prever(db: sqlite3.Connection, parametros: List[Dict[str, float]]) -> Dict[str, List[Optional[float]]]:
+    """
+    Respostas previstas para cada conjunto de parâmetros (chaves de VARIAVEIS),
+    num único produto matriz-vetor por resposta. None para respostas sem ajuste.
+    """
+    modelo = busca_modelo(db)
+    x = np.array([[parametro[variavel] for variavel in VARIAVEIS] for parametro in parametros], dtype=float)
+
+    previsoes = {}
+    for resposta, ajuste in modelo.items():
+        if ajuste is None:
+            previsoes[resposta] = [None] * len(parametros)
+            continue
+
+        coeficientes = np.array([ajuste["coeficientes"][variavel] for variavel in VARIAVEIS])
+        previsoes[resposta] = (ajuste["intercepto"] + x @ coeficientes).tolist()
+
+    return previsoes
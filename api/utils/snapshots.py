@@ -0,0 +1,155 @@
+import io
+import json
+import sqlite3
+import zipfile
+import logging
+import numpy as np
+from datetime import date, datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence
+import api.schemas.schemas as schemas
+import api.utils.crud as crud
+from api.core.repositorio import RepositorioSQLite
+
+logger = logging.getLogger(__name__)
+
+FORMATO_SNAPSHOT = "snapshot-experimentos"
+VERSAO_SNAPSHOT = 1
+
+# Colunas gravadas por experimento (arquivo .npz, um vetor float64 por coluna, NaN para ausentes;
+# o timestamp em epoch ms é representado exatamente em float64)
+COLUNAS_SNAPSHOT = ("timestamp", "accel_x", "accel_y", "accel_z", "speed_kmph", "longitude", "latitude", "altura")
+COLUNAS_METADADOS = ("nome", "distancia_alvo", "data", "pressao_psi", "volume_agua", "massa_total_foguete", "hash_conteudo")
+
+# Amostras inseridas por transação na importação
+LOTE_IMPORTACAO = 5000
+
+
+def exportar_snapshot(db: sqlite3.Connection, ids_experimentos: Optional[Sequence[int]] = None) -> Optional[bytes]:
+    """
+    Snapshot dos experimentos (todos, se ids_experimentos for None): ZIP com
+    manifesto.json (metadados) e um .npz colunar com as amostras de cada
+    experimento. Retorna None se algum dos experimentos pedidos não existir.
+    """
+    cursor = db.cursor()
+    if ids_experimentos is None:
+        cursor.execute("SELECT * FROM EXPERIMENTO ORDER BY id")
+    else:
+        cursor.execute(f"SELECT * FROM EXPERIMENTO WHERE id IN ({', '.join('?' for _ in ids_experimentos)}) ORDER BY id", tuple(ids_experimentos))
+    experimentos = [dict(linha) for linha in cursor.fetchall()]
+    if ids_experimentos is not None and len(experimentos) != len(set(ids_experimentos)):
+        return None
+
+    repositorio = RepositorioSQLite(db)
+    manifesto = {
+        "formato": FORMATO_SNAPSHOT,
+        "versao": VERSAO_SNAPSHOT,
+        "criado_em": datetime.now(timezone.utc).isoformat(),
+        "experimentos": [],
+    }
+
+    saida = io.BytesIO()
+    with zipfile.ZipFile(saida, "w", compression=zipfile.ZIP_DEFLATED) as arquivo_zip:
+        for experimento in experimentos:
+            # Um experimento por vez: a memória fica limitada ao maior deles
+            colunas = repositorio.colunas_experimentos([experimento["id"]], COLUNAS_SNAPSHOT).get(experimento["id"])
+            if colunas is None:
+                colunas = {coluna: np.empty(0) for coluna in COLUNAS_SNAPSHOT}
+
+            nome_arquivo = f"amostras/{experimento['id']}.npz"
+            conteudo = io.BytesIO()
+            np.savez(conteudo, **colunas)
+            arquivo_zip.writestr(nome_arquivo, conteudo.getvalue())
+
+            manifesto["experimentos"].append({
+                "id_origem": experimento["id"],
+                **{coluna: experimento.get(coluna) for coluna in COLUNAS_METADADOS},
+                "amostras": len(colunas["timestamp"]),
+                "arquivo": nome_arquivo,
+            })
+
+        arquivo_zip.writestr("manifesto.json", json.dumps(manifesto, ensure_ascii=False, indent=2))
+
+    logger.info(f"Snapshot com {len(experimentos)} experimentos exportado ({saida.tell()} bytes).")
+
+    return saida.getvalue()
+
+def _ler_manifesto(arquivo_zip: zipfile.ZipFile) -> Dict[str, Any]:
+    try:
+        manifesto = json.loads(arquivo_zip.read("manifesto.json"))
+    except (KeyError, json.JSONDecodeError) as e:
+        raise ValueError(f"Snapshot sem manifesto.json válido: {e}")
+
+    if manifesto.get("formato") != FORMATO_SNAPSHOT or manifesto.get("versao") != VERSAO_SNAPSHOT:
+        raise ValueError(f"Formato de snapshot não suportado: {manifesto.get('formato')} (versão {manifesto.get('versao')}).")
+
+    return manifesto
+
+def _importar_experimento(db: sqlite3.Connection, arquivo_zip: zipfile.ZipFile, item: Dict[str, Any]) -> int:
+    """Cria o experimento do item do manifesto e insere suas amostras em lotes."""
+    experimento = schemas.ExperimentoCreate(
+        nomeExperimento=item["nome"],
+        distanciaAlvo=item["distancia_alvo"],
+        dataExperimento=date.fromisoformat(item["data"]).strftime("%d/%m/%Y"),
+        pressaoBar=item["pressao_psi"],
+        volumeAgua=item["volume_agua"],
+        massaTotalFoguete=item["massa_total_foguete"]
+    )
+    id_experimento = crud.create_experimento_db(
+        db, experimento, date.fromisoformat(item["data"]), item.get("hash_conteudo")
+    )
+
+    try:
+        with np.load(io.BytesIO(arquivo_zip.read(item["arquivo"]))) as colunas:
+            matriz = np.column_stack([colunas[coluna].astype(object) for coluna in COLUNAS_SNAPSHOT])
+
+        for inicio in range(0, len(matriz), LOTE_IMPORTACAO):
+            crud.create_dados_experimento_lote_db(db, [
+                (
+                    None if np.isnan(linha[0]) else int(linha[0]),
+                    *(None if np.isnan(valor) else float(valor) for valor in linha[1:]),
+                    id_experimento
+                )
+                for linha in matriz[inicio:inicio + LOTE_IMPORTACAO]
+            ])
+
+        crud.recalcular_resumo_experimento(db, id_experimento)
+    except Exception:
+        # Remove o experimento incompleto; as amostras já gravadas ficam para a manutenção
+        crud.delete_experimento(db, id_experimento)
+        raise
+
+    return id_experimento
+
+def importar_snapshot(db: sqlite3.Connection, conteudo: bytes, forcar: bool = False) -> List[Dict[str, Any]]:
+    """
+    Importa os experimentos de um snapshot como experimentos novos. Os que têm o
+    hash de um CSV já presente no banco são ignorados, a menos que forcar seja True.
+    Retorna, para cada experimento do snapshot, o id de origem e o id no banco.
+    """
+    try:
+        arquivo_zip = zipfile.ZipFile(io.BytesIO(conteudo))
+    except zipfile.BadZipFile:
+        raise ValueError("O snapshot deve ser um arquivo ZIP.")
+
+    with arquivo_zip:
+        manifesto = _ler_manifesto(arquivo_zip)
+
+        resultado = []
+        for item in manifesto["experimentos"]:
+            existente = None
+            if item.get("hash_conteudo") and not forcar:
+                existente = crud.select_experimento_por_hash(db, item["hash_conteudo"])
+
+            if existente:
+                resultado.append({"id_origem": item["id_origem"], "experimento_id": existente["id"], "duplicado": True})
+                continue
+
+            try:
+                id_experimento = _importar_experimento(db, arquivo_zip, item)
+            except (KeyError, TypeError) as e:
+                raise ValueError(f"Experimento {item.get('id_origem')} do snapshot inválido: {e}")
+            resultado.append({"id_origem": item["id_origem"], "experimento_id": id_experimento, "duplicado": False})
+
+    logger.info(f"Snapshot importado: {sum(not item['duplicado'] for item in resultado)} experimentos criados.")
+
+    return resultado
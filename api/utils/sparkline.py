@@ -0,0 +1,69 @@
+import json
+import sqlite3
+import logging, os
+import numpy as np
+from typing import Dict, List, Optional
+from dotenv import load_dotenv
+from api.utils.telemetria import Telemetria
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+# Pontos de cada série da miniatura (metade dos intervalos, um mínimo e um máximo por intervalo)
+SPARKLINE_PONTOS = int(os.getenv('SPARKLINE_PONTOS', '64'))
+
+# Séries da miniatura: colunas da telemetria enriquecida
+SERIES_SPARKLINE = ("altura_lancamento", "distancia")
+
+
+def reduzir_min_max(valores: np.ndarray, pontos: int = SPARKLINE_PONTOS) -> List[float]:
+    """
+    Reduz a série a no máximo `pontos` valores: divide-a em pontos // 2 intervalos
+    consecutivos e guarda o mínimo e o máximo de cada um, na ordem em que
+    aparecem. Picos (como o apogeu) são preservados. Valores ausentes (NaN) são
+    descartados; séries curtas são devolvidas inteiras.
+    """
+    valores = valores[~np.isnan(valores)]
+    if len(valores) <= pontos:
+        return np.round(valores, 2).tolist()
+
+    intervalos = max(pontos // 2, 1)
+    limites = np.linspace(0, len(valores), intervalos + 1).astype(int)
+
+    indices = []
+    for inicio, fim in zip(limites[:-1], limites[1:]):
+        trecho = valores[inicio:fim]
+        indice_min, indice_max = inicio + int(np.argmin(trecho)), inicio + int(np.argmax(trecho))
+        indices.extend(sorted((indice_min, indice_max)))
+
+    return np.round(valores[indices], 2).tolist()
+
+def gerar_sparkline(telemetria: Telemetria, pontos: int = SPARKLINE_PONTOS) -> Dict[str, List[float]]:
+    """Miniaturas de altura relativa ao lançamento e distância acumulada de uma telemetria enriquecida."""
+    return {serie: reduzir_min_max(telemetria.colunas[serie], pontos) for serie in SERIES_SPARKLINE}
+
+def gravar_sparkline(cursor: sqlite3.Cursor, id_experimento: int, pontos: int = SPARKLINE_PONTOS) -> Dict[str, List[float]]:
+    """
+    Recalcula a miniatura do experimento a partir dos dados gravados e a grava em
+    SPARKLINE_EXPERIMENTO (a transação fica a cargo do chamador).
+    """
+    cursor.execute("""
+        SELECT timestamp, accel_x, accel_y, accel_z, speed_kmph, longitude, latitude, altura FROM DADOS_EXPERIMENTO
+        WHERE fk_exp = ?
+        ORDER BY timestamp ASC
+    """, (id_experimento,))
+    sparkline = gerar_sparkline(Telemetria.de_cursor(cursor).enriquecida(), pontos)
+
+    cursor.execute(f"""
+        INSERT OR REPLACE INTO SPARKLINE_EXPERIMENTO (fk_exp, {", ".join(SERIES_SPARKLINE)})
+        VALUES (?, {", ".join("?" for _ in SERIES_SPARKLINE)})
+    """, (id_experimento, *(json.dumps(sparkline[serie]) for serie in SERIES_SPARKLINE)))
+
+    return sparkline
+
+def sparkline_da_linha(linha: Dict[str, Optional[str]]) -> Optional[Dict[str, List[float]]]:
+    """Miniatura a partir das colunas de SPARKLINE_EXPERIMENTO (None se o experimento não tem dados)."""
+    if linha.get(SERIES_SPARKLINE[0]) is None:
+        return None
+
+    return {serie: json.loads(linha[serie]) for serie in SERIES_SPARKLINE}
@@ -0,0 +1,188 @@
+import io
+import csv
+import json
+import sqlite3
+import numpy as np
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+# Colunas de DADOS_EXPERIMENTO devolvidas pela API, na ordem das consultas
+COLUNAS_AMOSTRA = ("timestamp", "accel_x", "accel_y", "accel_z", "speed_kmph", "longitude", "latitude", "altura")
+
+# Linhas lidas do cursor por vez ao montar as colunas
+BLOCO_LEITURA = 10000
+
+R_TERRA = 6371000  # Raio da Terra em metros
+
+
+def _haversine_consecutivos(latitudes: np.ndarray, longitudes: np.ndarray) -> np.ndarray:
+    """Distâncias (m) entre pontos consecutivos, com a mesma fórmula de formatacao.haversine."""
+    phi1, phi2 = np.radians(latitudes[:-1]), np.radians(latitudes[1:])
+    delta_phi = np.radians(latitudes[1:] - latitudes[:-1])
+    delta_lambda = np.radians(longitudes[1:] - longitudes[:-1])
+
+    a = np.sin(delta_phi / 2.0)**2 + np.cos(phi1) * np.cos(phi2) * np.sin(delta_lambda / 2.0)**2
+
+    return R_TERRA * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+def _tokens_json(coluna: np.ndarray) -> List[str]:
+    if coluna.dtype == bool:
+        return ["true" if valor else "false" for valor in coluna.tolist()]
+
+    # repr(float) é a mesma representação usada pelo módulo json; NaN (ausente) vira null
+    return [repr(valor) if valor == valor else "null" for valor in coluna.tolist()]
+
+def _tokens_csv(coluna: np.ndarray) -> List[str]:
+    if coluna.dtype == bool:
+        return [str(valor) for valor in coluna.tolist()]
+
+    return [repr(valor) if valor == valor else "" for valor in coluna.tolist()]
+
+
+class Telemetria:
+    """
+    Amostras de um experimento em colunas NumPy: float64 com NaN para valores
+    ausentes (bool para marcadores, como gps_rejeitado). Ocupa ~8 bytes por valor,
+    em vez de um dicionário por amostra, e é serializada direto para JSON, CSV ou
+    .npy. Indexar ou iterar devolve dicionários criados sob demanda, um por vez.
+    """
+
+    __slots__ = ("colunas",)
+
+    def __init__(self, colunas: Dict[str, np.ndarray]):
+        self.colunas = colunas
+
+    @classmethod
+    def de_cursor(cls, cursor: sqlite3.Cursor, nomes: Sequence[str] = COLUNAS_AMOSTRA,
+                  bloco: int = BLOCO_LEITURA) -> "Telemetria":
+        """Lê o resultado da consulta (colunas na ordem de nomes) em blocos, sem criar dicionários."""
+        cursor.row_factory = None # Tuplas simples em vez de sqlite3.Row
+        partes = []
+        while linhas := cursor.fetchmany(bloco):
+            partes.append(np.array(linhas, dtype=float).reshape(-1, len(nomes)))
+
+        matriz = np.concatenate(partes) if partes else np.empty((0, len(nomes)))
+
+        return cls({nome: np.ascontiguousarray(matriz[:, i]) for i, nome in enumerate(nomes)})
+
+    @classmethod
+    def de_registros(cls, registros: List[Dict[str, Any]], nomes: Optional[Sequence[str]] = None) -> "Telemetria":
+        """Converte uma lista de dicionários (ex.: a série filtrada) em colunas."""
+        if nomes is None:
+            nomes = list(registros[0].keys()) if registros else list(COLUNAS_AMOSTRA)
+
+        colunas = {}
+        for nome in nomes:
+            valores = [registro[nome] for registro in registros]
+            if valores and all(isinstance(valor, bool) for valor in valores):
+                colunas[nome] = np.array(valores, dtype=bool)
+            else:
+                colunas[nome] = np.array(valores, dtype=float)
+
+        return cls(colunas)
+
+    @property
+    def nomes(self) -> List[str]:
+        return list(self.colunas)
+
+    def __len__(self) -> int:
+        return len(next(iter(self.colunas.values()))) if self.colunas else 0
+
+    def __getitem__(self, indice: int) -> Dict[str, Any]:
+        """Amostra `indice` como dicionário (None para ausentes), criado na hora."""
+        amostra = {}
+        for nome, coluna in self.colunas.items():
+            valor = coluna[indice].item()
+            amostra[nome] = None if valor != valor else valor
+        return amostra
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for indice in range(len(self)):
+            yield self[indice]
+
+    def enriquecida(self) -> "Telemetria":
+        """
+        Versão vetorizada de formatacao.formata_dados_experimento_especifico:
+        acrescenta distância acumulada e altura relativa ao lançamento e converte
+        o timestamp (epoch ms) em segundos desde o primeiro registro.
+        """
+        total = len(self)
+        timestamps = self.colunas["timestamp"]
+        alturas = self.colunas["altura"]
+        latitudes, longitudes = self.colunas["latitude"], self.colunas["longitude"]
+
+        # Como no AcumuladorVoo, registros iniciais sem timestamp são tratados como o primeiro
+        com_timestamp = np.flatnonzero(~np.isnan(timestamps))
+        primeiros = int(com_timestamp[0]) + 1 if len(com_timestamp) else total
+
+        tempo_s = np.zeros(total)
+        altura_lancamento = np.zeros(total)
+        distancia = np.zeros(total)
+
+        if primeiros > 1:
+            altura_lancamento[1:primeiros] = alturas[:primeiros - 1]
+
+        if primeiros < total:
+            tempo_s[primeiros:] = (timestamps[primeiros:] - timestamps[primeiros - 1]) / 1000
+            altura_lancamento[primeiros:] = np.round(alturas[primeiros:] - alturas[primeiros - 1], 2)
+
+            # Só somam distância os trechos entre posições válidas que terminam após o primeiro registro
+            validos = np.flatnonzero(~np.isnan(latitudes) & ~np.isnan(longitudes))
+            trechos = np.zeros(total)
+            if len(validos) > 1:
+                trechos[validos[1:]] = _haversine_consecutivos(latitudes[validos], longitudes[validos])
+            trechos[:primeiros] = 0.0
+            distancia[primeiros:] = np.round(np.cumsum(trechos)[primeiros:], 2)
+
+        colunas = dict(self.colunas)
+        colunas["timestamp"] = tempo_s
+        colunas["distancia"] = distancia
+        colunas["altura_lancamento"] = altura_lancamento
+
+        return Telemetria(colunas)
+
+    def para_json(self) -> str:
+        """Lista de objetos JSON (mesmo formato das respostas da API), montada coluna a coluna."""
+        if not len(self):
+            return "[]"
+
+        modelo = "{" + ",".join(f"{json.dumps(nome)}:%s" for nome in self.colunas) + "}"
+        tokens = [_tokens_json(coluna) for coluna in self.colunas.values()]
+
+        return "[" + ",".join(modelo % valores for valores in zip(*tokens)) + "]"
+
+    def para_csv(self) -> str:
+        """CSV com cabeçalho (mesmo formato de formatacao.gerar_csv_dados); vazio se não houver amostras."""
+        if not len(self):
+            return ""
+
+        saida = io.StringIO()
+        escritor = csv.writer(saida)
+        escritor.writerow(self.colunas.keys())
+        escritor.writerows(zip(*(_tokens_csv(coluna) for coluna in self.colunas.values())))
+
+        return saida.getvalue()
+
+    def para_npy(self) -> bytes:
+        """Array estruturado NumPy (.npy): uma linha por amostra, NaN para ausentes."""
+        estruturado = np.empty(len(self), dtype=[(nome, coluna.dtype) for nome, coluna in self.colunas.items()])
+        for nome, coluna in self.colunas.items():
+            estruturado[nome] = coluna
+
+        saida = io.BytesIO()
+        np.save(saida, estruturado, allow_pickle=False)
+
+        return saida.getvalue()
+
+    def memoria_bytes(self) -> int:
+        return sum(coluna.nbytes for coluna in self.colunas.values())
+
+
+def experimento_para_json(experimento: Dict[str, Any]) -> str:
+    """
+    Serializa o resultado de select_experimento_completo ({"experimento",
+    "dados_associados": Telemetria}) sem converter as amostras em dicionários.
+    """
+    return (
+        '{"experimento":' + json.dumps(experimento["experimento"], ensure_ascii=False, separators=(",", ":"))
+        + ',"dados_associados":' + experimento["dados_associados"].para_json() + "}"
+    )
@@ -0,0 +1,133 @@
+import sqlite3
+import logging
+import numpy as np
+from typing import Any, Dict, List
+import api.utils.crud as crud
+from api.utils.cache import cache_resultados
+
+logger = logging.getLogger(__name__)
+
+R_TERRA = 6371000  # Raio da Terra em metros
+
+
+def projeta_local_metros(latitudes: np.ndarray, longitudes: np.ndarray):
+    """
+    Projeção equiretangular em torno do primeiro ponto: (x, y) em metros.
+    Adequada às distâncias de um lançamento (centenas de metros).
+    """
+    lat0 = np.radians(latitudes[0])
+    x = R_TERRA * np.radians(longitudes - longitudes[0]) * np.cos(lat0)
+    y = R_TERRA * np.radians(latitudes - latitudes[0])
+
+    return x, y
+
+def douglas_peucker(pontos: np.ndarray, tolerancia: float) -> np.ndarray:
+    """
+    Simplifica uma polilinha (N x D, em metros) pelo algoritmo de Douglas-Peucker.
+    A distância de todos os pontos de um trecho ao segmento é calculada de uma vez
+    com NumPy; retorna a máscara booleana dos pontos mantidos.
+    """
+    total = len(pontos)
+    manter = np.zeros(total, dtype=bool)
+    if total == 0:
+        return manter
+
+    manter[0] = manter[-1] = True
+    pilha = [(0, total - 1)]
+
+    while pilha:
+        inicio, fim = pilha.pop()
+        if fim - inicio < 2:
+            continue
+
+        segmento = pontos[fim] - pontos[inicio]
+        relativos = pontos[inicio + 1:fim] - pontos[inicio]
+        comprimento2 = float(segmento @ segmento)
+
+        if comprimento2 == 0.0:
+            distancias = np.linalg.norm(relativos, axis=1)
+        else:
+            t = np.clip(relativos @ segmento / comprimento2, 0.0, 1.0)
+            distancias = np.linalg.norm(relativos - t[:, None] * segmento, axis=1)
+
+        indice_max = int(np.argmax(distancias))
+        if distancias[indice_max] > tolerancia:
+            indice = inicio + 1 + indice_max
+            manter[indice] = True
+            pilha.append((inicio, indice))
+            pilha.append((indice, fim))
+
+    return manter
+
+def gerar_geojson_trajetoria(dados: List[sqlite3.Row], id_experimento: int,
+                             tolerancia: float, incluir_propriedades: bool = True) -> Dict[str, Any]:
+    """
+    Monta a trajetória do voo como uma Feature GeoJSON (LineString) simplificada
+    com a tolerância em metros. Com incluir_propriedades, as coordenadas levam a
+    altitude e as propriedades trazem, por vértice, tempo, altura e velocidade.
+    """
+    dados = [linha for linha in dados if linha['latitude'] is not None and linha['longitude'] is not None]
+
+    propriedades: Dict[str, Any] = {
+        "experimento_id": id_experimento,
+        "tolerancia_m": tolerancia,
+        "pontos_originais": len(dados),
+    }
+
+    if not dados:
+        propriedades["pontos_simplificados"] = 0
+        return {"type": "Feature", "geometry": None, "properties": propriedades}
+
+    latitudes = np.array([linha['latitude'] for linha in dados], dtype=float)
+    longitudes = np.array([linha['longitude'] for linha in dados], dtype=float)
+    alturas = np.array([np.nan if linha['altura'] is None else linha['altura'] for linha in dados], dtype=float)
+    velocidades = np.array([np.nan if linha['speed_kmph'] is None else linha['speed_kmph'] for linha in dados], dtype=float)
+    timestamps = np.array([linha['timestamp'] for linha in dados], dtype=float)
+
+    x, y = projeta_local_metros(latitudes, longitudes)
+    if np.isnan(alturas).any():
+        pontos = np.column_stack((x, y))
+    else:
+        # Considera a altura para não descartar o apogeu de um voo quase vertical
+        pontos = np.column_stack((x, y, alturas - alturas[0]))
+
+    manter = douglas_peucker(pontos, tolerancia)
+    propriedades["pontos_simplificados"] = int(manter.sum())
+
+    if incluir_propriedades and not np.isnan(alturas).any():
+        coordenadas = np.column_stack((longitudes[manter], latitudes[manter], alturas[manter]))
+    else:
+        coordenadas = np.column_stack((longitudes[manter], latitudes[manter]))
+
+    if incluir_propriedades:
+        propriedades["tempo_s"] = _lista_json((timestamps[manter] - timestamps[0]) / 1000)
+        propriedades["altura"] = _lista_json(alturas[manter])
+        propriedades["speed_kmph"] = _lista_json(velocidades[manter])
+
+    return {
+        "type": "Feature",
+        "geometry": {
+            "type": "LineString",
+            "coordinates": coordenadas.tolist(),
+        },
+        "properties": propriedades,
+    }
+
+def _lista_json(valores: np.ndarray) -> list:
+    return [None if np.isnan(valor) else float(valor) for valor in valores]
+
+def busca_trajetoria_geojson(db: sqlite3.Connection, id_experimento: int,
+                             tolerancia: float, incluir_propriedades: bool = True) -> Dict[str, Any]:
+    """
+    Retorna a trajetória simplificada do experimento, usando o cache por
+    (experimento, versão dos dados, tolerância, propriedades).
+    """
+    versao = crud.select_versao_dados(db, id_experimento)
+    chave = ("trajetoria", id_experimento, versao, round(tolerancia, 3), incluir_propriedades)
+
+    def calcular():
+        logger.info(f"Gerando trajetória do experimento {id_experimento} (tolerância {tolerancia} m).")
+        dados = crud.select_dados_brutos_experimento(db, id_experimento)
+        return gerar_geojson_trajetoria(dados, id_experimento, tolerancia, incluir_propriedades)
+
+    return cache_resultados.obter_ou_calcular(chave, calcular)
@@ -0,0 +1,90 @@
+"""
+Benchmark de inicialização da API.
+
+Mede, em processos novos:
+  - o total de `python -X importtime -c "import api.main"` e os módulos mais caros;
+  - o tempo até a primeira resposta (subir o uvicorn e receber 200 em GET /).
+
+Uso (na raiz do projeto):
+    python benchmarks/inicializacao.py [--repeticoes 5] [--porta 8765] [--top 10]
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def medir_importtime(top: int) -> dict:
+    """Roda `-X importtime` e devolve o tempo cumulativo de api.main e os módulos mais caros (ms)."""
+    processo = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import api.main"],
+        cwd=RAIZ, capture_output=True, text=True, check=True
+    )
+
+    modulos = []
+    for linha in processo.stderr.splitlines():
+        if not linha.startswith("import time:") or "cumulative" in linha:
+            continue
+        _, proprio, cumulativo, nome = [parte.strip() for parte in linha.replace("import time:", "|").split("|")]
+        modulos.append({"modulo": nome, "proprio_ms": int(proprio) / 1000, "cumulativo_ms": int(cumulativo) / 1000})
+
+    total = next(modulo["cumulativo_ms"] for modulo in modulos if modulo["modulo"] == "api.main")
+    maiores = sorted(modulos, key=lambda modulo: modulo["proprio_ms"], reverse=True)[:top]
+
+    return {"total_ms": total, "maiores_proprio": maiores}
+
+def medir_primeira_resposta(porta: int, limite_s: float = 30.0) -> float:
+    """Sobe o uvicorn e mede o tempo (ms) até GET / responder 200."""
+    inicio = time.perf_counter()
+    servidor = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api.main:app", "--port", str(porta), "--log-level", "warning"],
+        cwd=RAIZ, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        while time.perf_counter() - inicio < limite_s:
+            if servidor.poll() is not None:
+                raise RuntimeError("O uvicorn encerrou antes de responder.")
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{porta}/", timeout=1) as resposta:
+                    if resposta.status == 200:
+                        return (time.perf_counter() - inicio) * 1000
+            except (urllib.error.URLError, ConnectionError, socket.timeout):
+                time.sleep(0.01)
+        raise TimeoutError(f"Sem resposta em {limite_s} s.")
+    finally:
+        servidor.terminate()
+        servidor.wait()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--porta", type=int, default=8765)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    totais = [medir_importtime(args.top) for _ in range(args.repeticoes)]
+    primeira_resposta = [medir_primeira_resposta(args.porta) for _ in range(args.repeticoes)]
+
+    print(json.dumps({
+        "importtime_api_main_ms": {
+            "mediana": statistics.median(t["total_ms"] for t in totais),
+            "minimo": min(t["total_ms"] for t in totais),
+        },
+        "primeira_resposta_ms": {
+            "mediana": statistics.median(primeira_resposta),
+            "minimo": min(primeira_resposta),
+        },
+        "maiores_modulos": totais[-1]["maiores_proprio"],
+    }, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
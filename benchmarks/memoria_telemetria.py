@@ -0,0 +1,90 @@
+"""
+Benchmark de memória das amostras de um experimento.
+
+Compara, para o mesmo voo sintético (com alguns valores ausentes):
+  - a lista de dicionários de formata_dados_experimento_especifico;
+  - as colunas NumPy de Telemetria (enriquecida).
+
+Mede com tracemalloc os bytes retidos por amostra e o tempo para montar e
+serializar em JSON cada representação.
+
+Uso (na raiz do projeto):
+    python benchmarks/memoria_telemetria.py [--amostras 200000]
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+import tracemalloc
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from api.utils.formatacao import formata_dados_experimento_especifico  # noqa: E402
+from api.utils.telemetria import COLUNAS_AMOSTRA, Telemetria  # noqa: E402
+
+
+def criar_banco(amostras: int) -> sqlite3.Connection:
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    conn.execute(f"CREATE TABLE dados ({', '.join(COLUNAS_AMOSTRA)})")
+    conn.executemany(
+        f"INSERT INTO dados VALUES ({', '.join('?' for _ in COLUNAS_AMOSTRA)})",
+        (
+            (1746100800000 + i * 40, 0.1 * (i % 7), 0.2, 9.8 + (i % 13) / 10, (i % 90) / 3,
+             None if i % 50 == 0 else -47.0 + i * 1e-6, None if i % 50 == 0 else -15.0 + i * 1e-6,
+             1000.0 + (i % 400) / 4)
+            for i in range(amostras)
+        )
+    )
+    return conn
+
+def medir(construir, serializar) -> dict:
+    """Memória retida pela estrutura montada (bytes) e tempos de montagem e serialização (ms)."""
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    estrutura = construir()
+    montagem_ms = (time.perf_counter() - inicio) * 1000
+    retida, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    inicio = time.perf_counter()
+    serializar(estrutura)
+    serializacao_ms = (time.perf_counter() - inicio) * 1000
+
+    return {"retida": retida, "pico": pico, "montagem_ms": round(montagem_ms, 1), "serializacao_ms": round(serializacao_ms, 1)}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--amostras", type=int, default=200000)
+    args = parser.parse_args()
+
+    conn = criar_banco(args.amostras)
+    consulta = f"SELECT {', '.join(COLUNAS_AMOSTRA)} FROM dados ORDER BY timestamp"
+
+    dicionarios = medir(
+        lambda: formata_dados_experimento_especifico(conn.execute(consulta).fetchall()),
+        lambda dados: json.dumps(dados, separators=(",", ":"))
+    )
+    colunas = medir(
+        lambda: Telemetria.de_cursor(conn.execute(consulta)).enriquecida(),
+        lambda telemetria: telemetria.para_json()
+    )
+
+    resultado = {"amostras": args.amostras}
+    for nome, medicao in (("lista_de_dicionarios", dicionarios), ("telemetria_colunar", colunas)):
+        resultado[nome] = {
+            "bytes_por_amostra": round(medicao["retida"] / args.amostras, 1),
+            "pico_mb": round(medicao["pico"] / 1024 / 1024, 1),
+            "montagem_ms": medicao["montagem_ms"],
+            "serializacao_json_ms": medicao["serializacao_ms"],
+        }
+    resultado["reducao_memoria"] = round(dicionarios["retida"] / colunas["retida"], 1)
+
+    print(json.dumps(resultado, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
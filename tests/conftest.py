@@ -0,0 +1,14 @@
+import pytest
+
+from api.core import database
+
+
+# Fixture com um banco SQLite real (arquivo temporário) e as tabelas criadas
+@pytest.fixture
+def db_sqlite(mocker, tmp_path):
+    mocker.patch.object(database, "DATABASE_URL", str(tmp_path / "teste.db"))
+    database.create_tables()
+
+    conn = database.get_db_connection()
+    yield conn
+    conn.close()
@@ -0,0 +1,96 @@
+import asyncio
+import pytest
+
+from api.core.admissao import ControleAdmissao, IngestaoRecusada
+
+
+def test_admissao_limita_concorrencia_e_fila():
+    """
+    Testa se uploads além do limite esperam na fila (em ordem) e se a fila
+    cheia recusa novos uploads com 503.
+    """
+    async def cenario():
+        controle = ControleAdmissao(max_concorrentes=1, memoria_mb=100, fila_max=1, espera_max_s=5)
+        ordem = []
+        liberar = asyncio.Event()
+
+        async def upload(nome):
+            async with controle.admitir(1000):
+                ordem.append(nome)
+                await liberar.wait()
+
+        primeiro = asyncio.create_task(upload("primeiro"))
+        await asyncio.sleep(0.01)
+        segundo = asyncio.create_task(upload("segundo"))
+        await asyncio.sleep(0.01)
+
+        with pytest.raises(IngestaoRecusada) as recusa:
+            async with controle.admitir(1000):
+                pass
+        metricas_saturado = controle.metricas()
+
+        liberar.set()
+        await asyncio.gather(primeiro, segundo)
+
+        return ordem, recusa.value, metricas_saturado, controle.metricas()
+
+    ordem, recusa, saturado, final = asyncio.run(cenario())
+
+    assert ordem == ["primeiro", "segundo"]
+    assert recusa.status == 503
+    assert saturado["em_execucao"] == 1 and saturado["fila"] == 1
+    assert final["admitidas"] == 2 and final["recusadas_fila_cheia"] == 1
+    assert final["em_execucao"] == 0 and final["memoria_reservada_mb"] == 0
+
+def test_admissao_orcamento_de_memoria_e_tempo_de_espera():
+    """
+    Testa se o orçamento de memória bloqueia uploads que não cabem (até esgotar
+    a espera) e recusa com 413 os maiores que o orçamento inteiro.
+    """
+    async def cenario():
+        controle = ControleAdmissao(max_concorrentes=5, memoria_mb=1, fila_max=5, espera_max_s=0.05)
+        meio_mb = 512 * 1024 // 10  # Estimativa de 0,5 MB com o fator padrão
+
+        with pytest.raises(IngestaoRecusada) as grande:
+            async with controle.admitir(10 * 1024 * 1024):
+                pass
+
+        async with controle.admitir(meio_mb):
+            async with controle.admitir(meio_mb):
+                with pytest.raises(IngestaoRecusada) as esgotado:
+                    async with controle.admitir(meio_mb):
+                        pass
+
+        return grande.value, esgotado.value, controle.metricas()
+
+    grande, esgotado, metricas = asyncio.run(cenario())
+
+    assert grande.status == 413
+    assert esgotado.status == 503
+    assert metricas["recusadas_tempo_esgotado"] == 1 and metricas["fila"] == 0
+
+def test_recusa_da_admissao_com_cabecalhos_cors():
+    """
+    Testa se as respostas do controle de admissão passam pelo CORS (o navegador
+    só lê o status e o Retry-After com Access-Control-Allow-Origin).
+    """
+    from api import main
+
+    scope = {
+        "type": "http", "method": "POST", "path": "/experimentos/novo", "query_string": b"",
+        "headers": [(b"origin", b"http://painel.local"), (b"content-length", str(10 ** 12).encode())],
+    }
+    mensagens = []
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(mensagem):
+        mensagens.append(mensagem)
+
+    asyncio.run(main.app(scope, receive, send))
+
+    headers = dict(mensagens[0]["headers"])
+    assert mensagens[0]["status"] == 413
+    assert headers[b"access-control-allow-origin"] == b"*"
+    assert b"retry-after" in headers[b"access-control-expose-headers"].lower()
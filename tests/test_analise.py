@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from api.utils import analise
+
+G = analise.G
+
+
+def voo_sintetico():
+    """
+    Voo com amostras a cada 100 ms: 3 em repouso (1 g), 3 de propulsão (5 g),
+    subida inercial até o apogeu (20 m) e descida até o solo.
+    """
+    alturas = [0, 0, 0, 1, 3, 6, 10, 14, 17, 19, 20, 19, 15, 10, 5, 0.5, 0]
+    aceleracoes_g = [1, 1, 1, 5, 5, 5, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 3, 1]
+
+    return [
+        {
+            'timestamp': 1000 + 100 * i, 'accel_x': 0.0, 'accel_y': 0.0, 'accel_z': aceleracao * G,
+            'speed_kmph': 10.0 * i, 'latitude': -15.0, 'longitude': -47.0 + i * 1e-5, 'altura': 1000.0 + altura,
+        }
+        for i, (altura, aceleracao) in enumerate(zip(alturas, aceleracoes_g))
+    ]
+
+def test_aceleracao_por_velocidade_vetorizada():
+    """
+    Testa a aceleração pela diferença de velocidades, ignorando intervalos sem duração.
+    """
+    tempo = np.array([0.0, 1.0, 1.0, 3.0])
+    velocidade = np.array([0.0, 2.0, 5.0, 9.0])
+
+    aceleracao = analise.aceleracao_por_velocidade(tempo, velocidade)
+
+    assert np.isnan(aceleracao[0]) and np.isnan(aceleracao[2])
+    assert aceleracao[1] == 2.0
+    assert aceleracao[3] == 2.0
+
+def test_analisa_voo_detecta_eventos():
+    """
+    Testa a detecção de lançamento, burnout, apogeu e pouso e as métricas do voo.
+    """
+    resultado = analise.analisa_voo(voo_sintetico())
+
+    eventos = {nome: evento["indice"] for nome, evento in resultado["eventos"].items()}
+    assert eventos == {"lancamento": 3, "burnout": 6, "apogeu": 10, "pouso": 15}
+    assert resultado["tempo_ate_apogeu_s"] == pytest.approx(0.7)
+    assert resultado["apogeu_m"] == 20.0
+    assert resultado["max_g_imu"] == pytest.approx(5.0)
+    assert [fase["fase"] for fase in resultado["fases"]] == ["propulsao", "subida_inercial", "descida"]
+    assert resultado["fases"][0]["max_g"] == pytest.approx(5.0)
+    assert resultado["alcance_m"] == pytest.approx(12 * 1.0746, rel=1e-2)
+
+def test_analisa_voo_sem_imu_usa_altura():
+    """
+    Testa a detecção do lançamento pela altura quando não há dados do IMU.
+    """
+    dados = voo_sintetico()
+    for linha in dados:
+        linha['accel_x'] = linha['accel_y'] = linha['accel_z'] = None
+
+    resultado = analise.analisa_voo(dados)
+
+    assert resultado["eventos"]["lancamento"]["indice"] == 3
+    assert resultado["eventos"]["burnout"] is None
+    assert resultado["max_g_imu"] is None
+    assert [fase["fase"] for fase in resultado["fases"]] == ["subida", "descida"]
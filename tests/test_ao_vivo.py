@@ -0,0 +1,151 @@
+import asyncio
+import sqlite3
+import pytest
+from datetime import date
+
+from api.utils import ao_vivo, crud
+from api.schemas import schemas
+from api.utils.formatacao import AcumuladorVoo
+
+
+def amostra(timestamp, latitude=-15.0, longitude=-47.0, altitude=1000.0):
+    return {'timestamp': timestamp, 'latitude': latitude, 'longitude': longitude, 'altitude': altitude}
+
+def test_receber_enriquece_publica_e_agenda_gravacao():
+    """
+    Testa se a amostra recebida é enriquecida, publicada e agendada para gravação.
+    """
+    async def cenario():
+        canal = ao_vivo.CanalAoVivo(1, AcumuladorVoo())
+        assinante = canal.inscrever()
+
+        canal.receber(amostra(1000))
+        canal.receber(amostra(1500, altitude=1010.0))
+
+        return canal, [assinante.fila.get_nowait() for _ in range(2)]
+
+    canal, recebidas = asyncio.run(cenario())
+
+    assert [r['timestamp'] for r in recebidas] == [0.0, 0.5]
+    assert recebidas[1]['altura_lancamento'] == 10.0
+    # Tupla na ordem das colunas do INSERT: ..., longitude, latitude, altura, fk_exp
+    assert canal._pendentes[0] == (1000, None, None, None, None, -47.0, -15.0, 1000.0, 1)
+
+def test_assinante_lento_descartado():
+    """
+    Testa se um assinante com a fila cheia é descartado sem bloquear os demais.
+    """
+    async def cenario():
+        canal = ao_vivo.CanalAoVivo(1, AcumuladorVoo())
+        lento = ao_vivo.Assinante(tamanho_fila=1)
+        canal.assinantes.add(lento)
+        rapido = ao_vivo.Assinante(tamanho_fila=10)
+        canal.assinantes.add(rapido)
+
+        canal.receber(amostra(1000))
+        canal.receber(amostra(2000))
+
+        return canal, lento, rapido
+
+    canal, lento, rapido = asyncio.run(cenario())
+
+    assert lento.descartado
+    assert lento.fila.get_nowait() is None
+    assert canal.assinantes == {rapido}
+    assert rapido.fila.qsize() == 2
+
+def test_receber_rejeita_amostra_sem_posicao():
+    """
+    Testa se amostras sem posição são rejeitadas sem alterar o estado do voo.
+    """
+    canal = ao_vivo.CanalAoVivo(1, AcumuladorVoo())
+
+    with pytest.raises(ValueError):
+        canal.receber(amostra(1000, latitude=None))
+
+    assert canal._pendentes == []
+    assert canal.acumulador.ultimo_ponto is None
+
+def cria_experimento(db):
+    experimento = schemas.ExperimentoCreate(
+        nomeExperimento="Ao vivo", distanciaAlvo=100, dataExperimento="01/05/2025",
+        pressaoBar=3.0, volumeAgua=500, massaTotalFoguete=200
+    )
+    return crud.create_experimento_db(db, experimento, date(2025, 5, 1))
+
+def test_concessao_de_ingestao_exclusiva(db_sqlite):
+    """
+    Testa se apenas um processo obtém a concessão de ingestão e se ela pode ser
+    assumida depois de expirada ou liberada.
+    """
+    id_experimento = cria_experimento(db_sqlite)
+
+    assert crud.renovar_concessao_ingestao(db_sqlite, id_experimento, "worker-a", 10000)
+    assert crud.renovar_concessao_ingestao(db_sqlite, id_experimento, "worker-a", 10000)
+    assert not crud.renovar_concessao_ingestao(db_sqlite, id_experimento, "worker-b", 10000)
+
+    # Concessão expirada
+    crud.renovar_concessao_ingestao(db_sqlite, id_experimento, "worker-a", -1)
+    assert crud.renovar_concessao_ingestao(db_sqlite, id_experimento, "worker-b", 10000)
+
+    crud.liberar_concessao_ingestao(db_sqlite, id_experimento, "worker-a")
+    assert not crud.renovar_concessao_ingestao(db_sqlite, id_experimento, "worker-a", 10000)
+    crud.liberar_concessao_ingestao(db_sqlite, id_experimento, "worker-b")
+    assert crud.renovar_concessao_ingestao(db_sqlite, id_experimento, "worker-a", 10000)
+
+def test_gravacao_recalcula_resumo_apos_escrita_de_outro_processo(db_sqlite):
+    """
+    Testa se o canal retoma o estado do banco quando outro processo gravou dados
+    do experimento desde a sua última gravação.
+    """
+    id_experimento = cria_experimento(db_sqlite)
+
+    async def cenario():
+        canal = await ao_vivo.GerenciadorAoVivo().obter_canal(id_experimento)
+        canal.receber(amostra(1000))
+        await canal.gravar_pendentes()
+
+        # Outro processo acrescenta uma amostra e grava o resumo (nova versão)
+        crud.create_dados_experimento_lote_db(db_sqlite, [(500, None, None, None, None, -47.0, -15.0, 1000.0, id_experimento)])
+        crud.recalcular_resumo_experimento(db_sqlite, id_experimento)
+
+        canal.receber(amostra(2000))
+        await canal.gravar_pendentes()
+
+        return canal
+
+    canal = asyncio.run(cenario())
+
+    resumo = crud.select_resumo_experimento(db_sqlite, id_experimento)
+    assert resumo["total_amostras"] == 3
+    assert canal.acumulador.para_resumo()["total_amostras"] == 3
+    assert canal.versao_dados == crud.select_versao_dados(db_sqlite, id_experimento)
+
+def test_lote_devolvido_a_fila_quando_gravacao_falha(db_sqlite, mocker):
+    """
+    Testa se um micro-lote cuja gravação falhou volta para a fila, antes das
+    amostras recebidas depois, e é gravado na tentativa seguinte.
+    """
+    id_experimento = cria_experimento(db_sqlite)
+
+    async def cenario():
+        canal = await ao_vivo.GerenciadorAoVivo().obter_canal(id_experimento)
+        canal.receber(amostra(1000))
+        canal.receber(amostra(2000))
+
+        falha = mocker.patch.object(ao_vivo, "_salvar_lote", side_effect=sqlite3.OperationalError("database is locked"))
+        with pytest.raises(sqlite3.OperationalError):
+            await canal.gravar_pendentes()
+        pendentes = [tupla[0] for tupla in canal._pendentes]
+
+        mocker.stop(falha)
+        canal.receber(amostra(3000))
+        await canal.gravar_pendentes()
+
+        return pendentes
+
+    pendentes = asyncio.run(cenario())
+
+    assert pendentes == [1000, 2000]
+    assert [linha["timestamp"] for linha in crud.select_dados_brutos_experimento(db_sqlite, id_experimento)] == [1000, 2000, 3000]
+    assert crud.select_resumo_experimento(db_sqlite, id_experimento)["total_amostras"] == 3
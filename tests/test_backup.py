@@ -0,0 +1,75 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from api.core import backup, database
+
+
+def test_backup_online_em_passos(db_sqlite, tmp_path):
+    """
+    Testa se o backup copia o banco em vários passos (com escrita concorrente
+    liberada entre eles) e gera uma cópia íntegra, listada e localizável pelo nome.
+    """
+    db_sqlite.executemany(
+        "INSERT INTO DADOS_EXPERIMENTO (timestamp, altura, fk_exp) VALUES (?, ?, 1)",
+        [(i, float(i)) for i in range(5000)]
+    )
+    db_sqlite.commit()
+    diretorio = str(tmp_path / "backups")
+
+    resultado = backup.criar_backup(db_sqlite, diretorio, paginas_por_passo=2, pausa_ms=0)
+
+    assert resultado["passos"] > 1
+    copia = sqlite3.connect(backup.caminho_backup(resultado["arquivo"], diretorio))
+    assert copia.execute("SELECT COUNT(*), SUM(altura) FROM DADOS_EXPERIMENTO").fetchone() == (5000, float(sum(range(5000))))
+    copia.close()
+
+    assert [item["arquivo"] for item in backup.listar_backups(diretorio)] == [resultado["arquivo"]]
+    assert backup.caminho_backup("../teste.db", diretorio) is None
+
+def test_backup_com_escritor_concorrente(db_sqlite, tmp_path):
+    """
+    Testa se o backup termina enquanto outra conexão grava sem parar (cada
+    escrita recomeça a cópia em passos), recorrendo à cópia num único passo.
+    """
+    db_sqlite.executemany(
+        "INSERT INTO DADOS_EXPERIMENTO (timestamp, altura, fk_exp) VALUES (?, ?, 1)",
+        [(i, float(i)) for i in range(5000)]
+    )
+    db_sqlite.commit()
+    parar = threading.Event()
+
+    def escrever():
+        conn = database.get_db_connection()
+        timestamp = 5000
+        while not parar.is_set():
+            conn.execute("INSERT INTO DADOS_EXPERIMENTO (timestamp, altura, fk_exp) VALUES (?, 0, 1)", (timestamp,))
+            conn.commit()
+            timestamp += 1
+            time.sleep(0.001)
+        conn.close()
+
+    escritor = threading.Thread(target=escrever)
+    escritor.start()
+    try:
+        time.sleep(0.05)
+        resultado = backup.criar_backup(db_sqlite, str(tmp_path), paginas_por_passo=2, pausa_ms=5, max_reinicios=3)
+    finally:
+        parar.set()
+        escritor.join()
+
+    assert resultado["reinicios"] > 3
+    copia = sqlite3.connect(backup.caminho_backup(resultado["arquivo"], str(tmp_path)))
+    assert copia.execute("SELECT COUNT(*) FROM DADOS_EXPERIMENTO WHERE timestamp < 5000").fetchone() == (5000,)
+    copia.close()
+    assert not backup._lock_backup.locked()
+
+def test_backup_concorrente_recusado(db_sqlite, tmp_path):
+    """
+    Testa se um segundo backup no mesmo processo é recusado enquanto o primeiro roda.
+    """
+    with backup._lock_backup:
+        with pytest.raises(backup.BackupEmAndamento):
+            backup.criar_backup(db_sqlite, str(tmp_path))
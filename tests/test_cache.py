@@ -0,0 +1,78 @@
+import asyncio
+
+from api.utils.cache import CacheLRU, ExecucaoUnica
+
+
+def test_cache_descarta_item_menos_usado():
+    """
+    Testa se o cache descarta o item usado há mais tempo ao atingir o limite.
+    """
+    cache = CacheLRU(maximo=2)
+    cache.guardar("a", 1)
+    cache.guardar("b", 2)
+    cache.obter("a")
+    cache.guardar("c", 3)
+
+    assert cache.obter("b") is None
+    assert cache.obter("a") == 1
+    assert cache.obter("c") == 3
+
+def test_cache_obter_ou_calcular_e_invalidar():
+    """
+    Testa o cálculo sob demanda e a invalidação por condição sobre a chave.
+    """
+    cache = CacheLRU()
+    chamadas = []
+
+    def calcular():
+        chamadas.append(1)
+        return "valor"
+
+    assert cache.obter_ou_calcular(("trajetoria", 1), calcular) == "valor"
+    assert cache.obter_ou_calcular(("trajetoria", 1), calcular) == "valor"
+    assert len(chamadas) == 1
+
+    cache.invalidar(lambda chave: chave[1] == 1)
+    cache.obter_ou_calcular(("trajetoria", 1), calcular)
+    assert len(chamadas) == 2
+
+def test_execucao_unica_agrupa_requisicoes_simultaneas():
+    """
+    Testa se chamadas simultâneas com a mesma chave compartilham uma única
+    execução (inclusive a exceção), se chaves diferentes executam separadamente
+    e se nada fica guardado após o término.
+    """
+    async def cenario():
+        execucao = ExecucaoUnica()
+        chamadas = []
+        liberar = asyncio.Event()
+
+        async def calcular(valor):
+            chamadas.append(valor)
+            await liberar.wait()
+            if valor == "erro":
+                raise ValueError("falhou")
+            return valor
+
+        requisicoes = [asyncio.ensure_future(execucao.executar(("a",), lambda: calcular("a"))) for _ in range(5)]
+        requisicoes.append(asyncio.ensure_future(execucao.executar(("b",), lambda: calcular("b"))))
+        erros = [asyncio.ensure_future(execucao.executar(("erro",), lambda: calcular("erro"))) for _ in range(2)]
+        await asyncio.sleep(0)
+
+        # Cancelar uma requisição não cancela a execução compartilhada
+        requisicoes[0].cancel()
+        liberar.set()
+
+        resultados = await asyncio.gather(*requisicoes[1:])
+        excecoes = await asyncio.gather(*erros, return_exceptions=True)
+        depois = await execucao.executar(("a",), lambda: calcular("a"))
+
+        return chamadas, resultados, excecoes, depois, execucao.estatisticas()
+
+    chamadas, resultados, excecoes, depois, estatisticas = asyncio.run(cenario())
+
+    assert resultados == ["a", "a", "a", "a", "b"]
+    assert all(isinstance(excecao, ValueError) for excecao in excecoes)
+    assert depois == "a"
+    assert chamadas == ["a", "b", "erro", "a"]
+    assert estatisticas == {"em_andamento": 0, "execucoes": 4, "compartilhadas": 5}
@@ -0,0 +1,42 @@
+from datetime import date
+
+from api.utils import crud, comparacao
+from api.schemas import schemas
+
+
+def cria_experimento(db, atraso_ms):
+    """Voo sintético: 1 g na base, lançamento (3 g) após atraso_ms, subida de 1 m por amostra."""
+    experimento = schemas.ExperimentoCreate(
+        nomeExperimento="Voo", distanciaAlvo=100, dataExperimento="01/05/2025",
+        pressaoBar=3.0, volumeAgua=500, massaTotalFoguete=200
+    )
+    id_experimento = crud.create_experimento_db(db, experimento, date(2025, 5, 1))
+    base = atraso_ms // 100
+    crud.create_dados_experimento_lote_db(db, [
+        (100 * i, 0.0, 0.0, 29.4 if i == base else 9.8, 0.0, -47.0, -15.0, 1000.0 + max(i - base, 0), id_experimento)
+        for i in range(base + 11)
+    ])
+
+    return id_experimento
+
+def test_compara_experimentos_alinha_no_lancamento(db_sqlite):
+    """
+    Testa se experimentos com lançamentos em instantes diferentes ficam alinhados
+    na grade comum e se trechos sem dados viram None.
+    """
+    id_cedo = cria_experimento(db_sqlite, 0)
+    id_tarde = cria_experimento(db_sqlite, 500)
+
+    resultado = comparacao.compara_experimentos(db_sqlite, [id_cedo, id_tarde], passo_s=0.25, antes_s=0.5)
+
+    assert resultado["tempo_s"][:3] == [-0.5, -0.25, 0.0]
+    assert [exp["lancamento_detectado"] for exp in resultado["experimentos"]] == [True, True]
+    # Mesma altura relativa nos instantes após o lançamento
+    assert resultado["altura_m"][0][2:] == resultado["altura_m"][1][2:]
+    assert resultado["altura_m"][0][-1] == 10.0
+    # O primeiro experimento não tem amostras antes do lançamento
+    assert resultado["altura_m"][0][0] is None
+    assert resultado["altura_m"][1][0] == 0.0
+
+def test_compara_experimentos_inexistente(db_sqlite):
+    assert comparacao.compara_experimentos(db_sqlite, [cria_experimento(db_sqlite, 0), 999], passo_s=0.1) is None
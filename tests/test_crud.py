@@ -1,9 +1,12 @@
 import pytest
 from unittest.mock import MagicMock, ANY
 from datetime import date
+import multiprocessing
 import sqlite3
+import pandas as pd
 
 # Módulos da sua aplicação que serão testados
+from api.core import database
 from api.utils import crud
 from api.schemas import schemas
 
@@ -48,14 +51,15 @@ def test_create_experimento_db_sucesso(mock_db_connection, experimento_data):
     # Verifica se o cursor.execute foi chamado com o SQL e os parâmetros corretos
     mock_cursor.execute.assert_called_once_with(
         # A quebra de linha e espaços no SQL devem corresponder exatamente ao da função original
-        "\n        INSERT INTO EXPERIMENTO (nome, distancia_alvo, data, pressao_psi, volume_agua, massa_total_foguete)\n        VALUES (?, ?, ?, ?, ?, ?)\n    ",
+        "\n        INSERT INTO EXPERIMENTO (nome, distancia_alvo, data, pressao_psi, volume_agua, massa_total_foguete, hash_conteudo)\n        VALUES (?, ?, ?, ?, ?, ?, ?)\n    ",
         (
             experimento_data.nomeExperimento,
             experimento_data.distanciaAlvo,
             data_obj.isoformat(),
             experimento_data.pressaoBar,
             experimento_data.volumeAgua,
-            experimento_data.massaTotalFoguete
+            experimento_data.massaTotalFoguete,
+            None
         )
     )
 
@@ -112,7 +116,7 @@ def test_select_todos_experimentos(mock_db_connection):
     assert len(resultado["experimentos"]) == 2
     assert resultado["experimentos"][0]['nome'] == 'Experimento 1'
 
-def test_delete_experimento_sucesso(mock_db_connection):
+def test_delete_experimento_sucesso(mock_db_connection, mocker):
     """
     Testa a deleção de um experimento com sucesso.
     """
@@ -121,11 +125,15 @@ def test_delete_experimento_sucesso(mock_db_connection):
     mock_cursor.rowcount = 1
     id_experimento = 1
 
+    atualizar_observacao = mocker.patch.object(crud.modelo, "atualizar_observacao")
+
     # Chama a função
     resultado = crud.delete_experimento(mock_conn, id_experimento)
 
     # Verifica se o comando SQL foi chamado com o ID correto
     mock_cursor.execute.assert_called_once_with("DELETE FROM EXPERIMENTO WHERE id = ?", (id_experimento,))
+    # Verifica se a contribuição ao modelo de lançamento foi retirada
+    atualizar_observacao.assert_called_once_with(mock_cursor, id_experimento)
     # Verifica se o commit foi chamado
     mock_conn.commit.assert_called_once()
     # Verifica se o resultado é o esperado
@@ -146,7 +154,7 @@ def test_delete_experimento_nao_encontrado(mock_db_connection):
     # Verifica o resultado
     assert resultado is None
 
-def test_update_experimento_sucesso(mock_db_connection):
+def test_update_experimento_sucesso(mock_db_connection, mocker):
     """
     Testa a atualização de um experimento com sucesso.
     """
@@ -162,8 +170,121 @@ def test_update_experimento_sucesso(mock_db_connection):
         300.0
     ]
 
+    atualizar_observacao = mocker.patch.object(crud.modelo, "atualizar_observacao")
+
     resultado = crud.update_experimento(mock_conn, id_experimento, dados_para_atualizar)
 
     mock_cursor.execute.assert_called_once()
+    atualizar_observacao.assert_called_once_with(mock_cursor, id_experimento)
     mock_conn.commit.assert_called_once()
     assert resultado == 1
+
+def test_converte_timestamps_epoch_ms():
+    """
+    Testa a conversão vetorizada dos timestamps do CSV para epoch em milissegundos.
+    """
+    timestamps = pd.Series(["2025-05-01 12:00:00", "2025-05-01 12:00:00.250", "invalido", None])
+
+    resultado = crud.converte_timestamps_epoch_ms(timestamps)
+
+    assert resultado.tolist() == [1746100800000, 1746100800250, None, None]
+
+def test_processar_e_salvar_csv_timestamps_epoch_ms(mocker):
+    """
+    Testa se o CSV é salvo com timestamps em epoch ms e sem as linhas de timestamp inválido.
+    """
+    mock_lote = mocker.patch.object(crud, "create_dados_experimento_lote_db", return_value=1)
+    mocker.patch.object(crud, "atualizar_resumo_experimento")
+    mocker.patch.object(crud, "atualizar_sparkline_experimento")
+    csv_bytes = (
+        b"timestamp,latitude,longitude,altitude,speed_kmph\n"
+        b"2025-05-01 12:00:00.100,-15.0,-47.0,1000.0,0.0\n"
+        b"sem-data,-15.0,-47.0,1000.0,0.0\n"
+    )
+
+    crud.processar_e_salvar_csv(MagicMock(), csv_bytes, 7)
+
+    dados_lote = mock_lote.call_args[0][1]
+    assert len(dados_lote) == 1
+    assert dados_lote[0][0] == 1746100800100
+    assert dados_lote[0][-1] == 7
+
+CSV_CABECALHO = b"timestamp,latitude,longitude,altitude,speed_kmph\n"
+
+def test_adicionar_dados_csv_ignora_duplicados_e_atualiza_resumo(db_sqlite, experimento_data):
+    """
+    Testa se o acréscimo de dados ignora timestamps já gravados e mantém o resumo
+    incremental igual ao recalculado do zero.
+    """
+    experimento_id = crud.create_experimento_db(db_sqlite, experimento_data, date(2025, 12, 25))
+    crud.processar_e_salvar_csv(db_sqlite, CSV_CABECALHO + (
+        b"2025-05-01 12:00:00,-15.0000,-47.0000,1000.0,0.0\n"
+        b"2025-05-01 12:00:01,-15.0001,-47.0001,1020.0,30.0\n"
+    ), experimento_id)
+
+    resultado = crud.adicionar_dados_csv(db_sqlite, CSV_CABECALHO + (
+        b"2025-05-01 12:00:01,-15.0001,-47.0001,1020.0,30.0\n"
+        b"2025-05-01 12:00:02,-15.0002,-47.0002,1030.0,20.0\n"
+        b"2025-05-01 12:00:02,-15.0002,-47.0002,1030.0,20.0\n"
+    ), experimento_id)
+
+    assert resultado["registros_inseridos"] == 1
+    assert resultado["registros_duplicados"] == 2
+    assert resultado["resumo"]["total_amostras"] == 3
+    assert resultado["resumo"]["altura_maxima"] == 1030.0
+    assert resultado["resumo"]["velocidade_maxima"] == 30.0
+    assert resultado["resumo"] == crud.recalcular_resumo_experimento(db_sqlite, experimento_id)
+
+def _acrescenta_csv(caminho_db, barreira, experimento_id, conteudo_csv):
+    """Simula um worker acrescentando o CSV ao experimento ao mesmo tempo que os demais."""
+    database.DATABASE_URL = caminho_db
+    db = database.get_db_connection()
+    barreira.wait()
+    crud.adicionar_dados_csv(db, conteudo_csv, experimento_id)
+    db.close()
+
+def test_adicionar_dados_csv_simultaneos_nao_duplicam(db_sqlite, experimento_data):
+    """
+    Testa se acréscimos simultâneos (processos diferentes) do mesmo lote a um
+    experimento gravam cada timestamp uma única vez, com o resumo consistente.
+    """
+    experimento_id = crud.create_experimento_db(db_sqlite, experimento_data, date(2025, 12, 25))
+    conteudo_csv = CSV_CABECALHO + b"".join(
+        f"{1746100800000 + i * 100},-15.0,-47.0,{1000.0 + i},10.0\n".encode() for i in range(500)
+    )
+
+    contexto = multiprocessing.get_context("fork")
+    barreira = contexto.Barrier(4)
+    processos = [
+        contexto.Process(target=_acrescenta_csv, args=(database.DATABASE_URL, barreira, experimento_id, conteudo_csv))
+        for _ in range(4)
+    ]
+    for processo in processos:
+        processo.start()
+    for processo in processos:
+        processo.join(timeout=60)
+
+    assert [processo.exitcode for processo in processos] == [0] * 4
+    assert tuple(db_sqlite.execute(
+        "SELECT COUNT(*), COUNT(DISTINCT timestamp) FROM DADOS_EXPERIMENTO WHERE fk_exp = ?", (experimento_id,)
+    ).fetchone()) == (500, 500)
+    assert crud.select_resumo_experimento(db_sqlite, experimento_id) == crud.calcular_resumo_completo(db_sqlite, experimento_id)
+
+def test_adicionar_dados_csv_fora_de_ordem_recalcula_resumo(db_sqlite, experimento_data, mocker):
+    """
+    Testa se amostras anteriores ao fim do voo resumido forçam o recálculo completo.
+    """
+    experimento_id = crud.create_experimento_db(db_sqlite, experimento_data, date(2025, 12, 25))
+    crud.processar_e_salvar_csv(db_sqlite, CSV_CABECALHO + (
+        b"2025-05-01 12:00:00,-15.0000,-47.0000,1000.0,0.0\n"
+        b"2025-05-01 12:00:02,-15.0002,-47.0002,1030.0,20.0\n"
+    ), experimento_id)
+    recalcular = mocker.spy(crud, "calcular_resumo_completo")
+
+    resultado = crud.adicionar_dados_csv(db_sqlite, CSV_CABECALHO + (
+        b"2025-05-01 12:00:01,-15.0001,-47.0001,1020.0,30.0\n"
+    ), experimento_id)
+
+    recalcular.assert_called_once()
+    assert resultado["resumo"]["total_amostras"] == 3
+    assert resultado["resumo"]["timestamp_final"] == 1746100802000
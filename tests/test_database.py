@@ -0,0 +1,106 @@
+import multiprocessing
+import sqlite3
+
+from api.core import database
+
+
+def test_migracao_converte_timestamps_texto(mocker, tmp_path):
+    """
+    Testa se a migração converte timestamps em texto para epoch em milissegundos.
+    """
+    mocker.patch.object(database, "DATABASE_URL", str(tmp_path / "teste.db"))
+    database.create_tables()
+
+    conn = database.get_db_connection()
+    conn.execute("PRAGMA user_version = 0")
+    conn.executemany(
+        "INSERT INTO DADOS_EXPERIMENTO (timestamp, fk_exp) VALUES (?, 1)",
+        [("2025-05-01 12:00:00",), ("2025-05-01 12:00:00.250",), (1746100801000,)]
+    )
+    conn.commit()
+
+    database.aplicar_migracoes(conn)
+
+    timestamps = [row[0] for row in conn.execute("SELECT timestamp FROM DADOS_EXPERIMENTO ORDER BY id")]
+    assert timestamps == [1746100800000, 1746100800250, 1746100801000]
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == database.MIGRACOES[-1][0]
+
+    # O resumo é calculado para os experimentos existentes
+    resumo = conn.execute("SELECT total_amostras, timestamp_final FROM RESUMO_EXPERIMENTO WHERE fk_exp = 1").fetchone()
+    assert tuple(resumo) == (3, 1746100801000)
+
+def test_migracoes_nao_reaplicadas(mocker):
+    """
+    Testa se migrações já registradas em user_version não são executadas de novo.
+    """
+    conn = sqlite3.connect(":memory:")
+    conn.execute(f"PRAGMA user_version = {database.MIGRACOES[-1][0]}")
+    migracao = mocker.MagicMock(__name__="migracao_falsa")
+    mocker.patch.object(database, "MIGRACOES", [(1, migracao)])
+
+    database.aplicar_migracoes(conn)
+
+    migracao.assert_not_called()
+
+def test_wal_e_gatilhos_de_versao(db_sqlite):
+    """
+    Testa se o banco usa WAL e se editar ou remover um experimento incrementa a
+    versão dos dados (invalidando os caches de todos os processos).
+    """
+    assert db_sqlite.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+    db_sqlite.execute("""
+        INSERT INTO EXPERIMENTO (id, nome, distancia_alvo, data, pressao_psi, volume_agua, massa_total_foguete)
+        VALUES (1, 'Teste', 100, '2025-05-01', 3.0, 500, 200)
+    """)
+    db_sqlite.execute("INSERT INTO RESUMO_EXPERIMENTO (fk_exp, versao) VALUES (1, 5)")
+    db_sqlite.commit()
+
+    db_sqlite.execute("UPDATE EXPERIMENTO SET nome = 'Editado' WHERE id = 1")
+    db_sqlite.commit()
+    assert db_sqlite.execute("SELECT versao FROM RESUMO_EXPERIMENTO").fetchone()[0] == 6
+
+    db_sqlite.execute("DELETE FROM EXPERIMENTO WHERE id = 1")
+    db_sqlite.commit()
+    assert db_sqlite.execute("SELECT versao FROM RESUMO_EXPERIMENTO").fetchone()[0] == 7
+
+def _inicia_worker(caminho_db, barreira):
+    """Simula a inicialização de um worker: create_tables com uma migração que conta as execuções."""
+    def conta_execucoes(cursor):
+        cursor.execute("INSERT INTO EXECUCOES_MIGRACAO DEFAULT VALUES")
+
+    database.DATABASE_URL = caminho_db
+    database.MIGRACOES = database.MIGRACOES + [(database.MIGRACOES[-1][0] + 1, conta_execucoes)]
+    barreira.wait()
+    database.create_tables()
+
+def test_migracoes_com_workers_simultaneos(mocker, tmp_path):
+    """
+    Testa se, com vários workers iniciando ao mesmo tempo, cada migração pendente
+    é aplicada uma única vez (a inversão de latitude/longitude não é idempotente).
+    """
+    caminho_db = str(tmp_path / "teste.db")
+    mocker.patch.object(database, "DATABASE_URL", caminho_db)
+    database.create_tables()
+
+    conn = database.get_db_connection()
+    conn.execute("CREATE TABLE EXECUCOES_MIGRACAO (id INTEGER PRIMARY KEY)")
+    conn.execute("PRAGMA user_version = 1")
+    conn.execute("""
+        INSERT INTO DADOS_EXPERIMENTO (timestamp, latitude, longitude, fk_exp)
+        VALUES (1746100800000, -47.0, -15.0, 1)
+    """)
+    conn.commit()
+
+    contexto = multiprocessing.get_context("fork")
+    barreira = contexto.Barrier(4)
+    workers = [contexto.Process(target=_inicia_worker, args=(caminho_db, barreira)) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(timeout=60)
+
+    assert [worker.exitcode for worker in workers] == [0, 0, 0, 0]
+    assert tuple(conn.execute("SELECT latitude, longitude FROM DADOS_EXPERIMENTO").fetchone()) == (-15.0, -47.0)
+    assert conn.execute("SELECT COUNT(*) FROM EXECUCOES_MIGRACAO").fetchone()[0] == 1
+    conn.close()
@@ -0,0 +1,126 @@
+import asyncio
+import io
+import sqlite3
+from datetime import date
+
+import pytest
+from fastapi import HTTPException, UploadFile
+
+import api.schemas.schemas as schemas
+from api.core import database
+import api.utils.crud as crud
+import api.routers.experimentos as experimentos
+from api.utils.deduplicacao import HashCSV, hash_csv
+
+
+CSV = b"timestamp,altitude\n2025-05-01 12:00:00,1000\n2025-05-01 12:00:01,1010\n"
+
+def test_hash_csv_ignora_bom_e_quebras_de_linha():
+    """
+    Testa se o hash é o mesmo para o CSV com BOM, com quebras de linha do
+    Windows e sem a quebra de linha final, e diferente para outro conteúdo.
+    """
+    variantes = [
+        CSV,
+        b"\xef\xbb\xbf" + CSV,
+        CSV.replace(b"\n", b"\r\n"),
+        CSV.rstrip(b"\n") + b"\n\n\n",
+        CSV.rstrip(b"\n"),
+    ]
+
+    assert len({hash_csv(variante) for variante in variantes}) == 1
+    assert hash_csv(CSV.replace(b"1010", b"1011")) != hash_csv(CSV)
+    assert hash_csv(CSV.replace(b"\n", b"\n\n", 1)) != hash_csv(CSV)
+
+def test_hash_csv_independe_da_divisao_em_blocos():
+    """
+    Testa se o hash incremental não depende de onde os blocos são cortados,
+    inclusive no meio do BOM e entre o \\r e o \\n.
+    """
+    conteudo = b"\xef\xbb\xbf" + CSV.replace(b"\n", b"\r\n")
+    esperado = hash_csv(CSV)
+
+    for tamanho in (1, 2, 3, 7, 64):
+        hash_conteudo = HashCSV()
+        for inicio in range(0, len(conteudo), tamanho):
+            hash_conteudo.atualizar(conteudo[inicio:inicio + tamanho])
+        assert hash_conteudo.hexdigest() == esperado
+
+def test_select_experimento_por_hash(db_sqlite):
+    """
+    Testa se o experimento é encontrado pelo hash do CSV de origem e se, havendo
+    cópias forçadas, o primeiro é retornado.
+    """
+    experimento = schemas.ExperimentoCreate(
+        nomeExperimento="Hash", distanciaAlvo=100, dataExperimento="01/05/2025",
+        pressaoBar=3.0, volumeAgua=500.0, massaTotalFoguete=200.0
+    )
+    hash_conteudo = hash_csv(CSV)
+    primeiro = crud.create_experimento_db(db_sqlite, experimento, date(2025, 5, 1), hash_conteudo)
+    crud.create_experimento_db(db_sqlite, experimento, date(2025, 5, 1), hash_conteudo)
+    crud.create_experimento_db(db_sqlite, experimento, date(2025, 5, 1))
+
+    assert crud.select_experimento_por_hash(db_sqlite, hash_conteudo)["id"] == primeiro
+    assert crud.select_experimento_por_hash(db_sqlite, hash_csv(b"outro")) is None
+
+    plano = db_sqlite.execute(
+        "EXPLAIN QUERY PLAN SELECT * FROM EXPERIMENTO WHERE hash_conteudo = ?", (hash_conteudo,)
+    ).fetchall()
+    assert any("idx_experimento_hash_conteudo" in linha[-1] for linha in plano)
+
+def envia_csv(conteudo: bytes):
+    """Chama a rota de criação de experimento com o CSV informado (a rota usa a conexão em outras threads)."""
+    conexao = sqlite3.connect(database.DATABASE_URL, isolation_level="IMMEDIATE", check_same_thread=False)
+    conexao.row_factory = sqlite3.Row
+    try:
+        return asyncio.run(experimentos.criar_novo_experimento_rota(
+            db=conexao, nomeExperimento="Upload", distanciaAlvo=100, dataExperimento="01/05/2025",
+            pressaoBar=3.0, volumeAgua=500.0, massaTotalFoguete=200.0,
+            arquivoDados=UploadFile(io.BytesIO(conteudo), filename="dados.csv"), forcarNovo=False
+        ))
+    finally:
+        conexao.close()
+
+def test_upload_com_falha_nao_bloqueia_reenvio(db_sqlite, mocker):
+    """
+    Testa se um CSV cuja ingestão falhou pode ser reenviado (o hash só é gravado
+    depois da ingestão) e se o reenvio bem-sucedido passa a ser reconhecido.
+    """
+    # CSV malformado: o reenvio falha de novo em vez de apontar para o experimento vazio
+    malformado = b"timestamp,altitude\n1746100800000,1000\n1746100801000,1010,5,6\n"
+    for _ in range(2):
+        with pytest.raises(HTTPException) as erro:
+            envia_csv(malformado)
+        assert erro.value.status_code == 400
+    assert crud.select_experimento_por_hash(db_sqlite, hash_csv(malformado)) is None
+
+    # Falha transitória seguida de reenvio do mesmo arquivo
+    falha = mocker.patch.object(crud, "processar_e_salvar_csv", side_effect=ValueError("Erro ao processar o arquivo CSV"))
+    with pytest.raises(HTTPException):
+        envia_csv(CSV)
+    mocker.stop(falha)
+
+    reenvio = envia_csv(CSV)
+    assert reenvio["duplicado"] is False
+    assert reenvio["registros_csv_processados"] == 2
+
+    repetido = envia_csv(CSV)
+    assert repetido["duplicado"] is True
+    assert repetido["experimento_id"] == reenvio["experimento_id"]
+
+def test_registrar_hash_conteudo_simultaneo(db_sqlite):
+    """
+    Testa se, com dois uploads do mesmo CSV terminando juntos, só o primeiro
+    grava o hash e o segundo recebe o id do primeiro (a menos que seja forçado).
+    """
+    experimento = schemas.ExperimentoCreate(
+        nomeExperimento="Hash", distanciaAlvo=100, dataExperimento="01/05/2025",
+        pressaoBar=3.0, volumeAgua=500.0, massaTotalFoguete=200.0
+    )
+    hash_conteudo = hash_csv(CSV)
+    primeiro, segundo, forcado = (crud.create_experimento_db(db_sqlite, experimento, date(2025, 5, 1)) for _ in range(3))
+
+    assert crud.registrar_hash_conteudo(db_sqlite, primeiro, hash_conteudo) is None
+    assert crud.registrar_hash_conteudo(db_sqlite, segundo, hash_conteudo) == primeiro
+    assert crud.registrar_hash_conteudo(db_sqlite, forcado, hash_conteudo, forcar=True) is None
+    assert crud.select_experimento(db_sqlite, segundo) is not None
@@ -0,0 +1,78 @@
+from datetime import date
+
+from api.utils import crud, espacial
+from api.schemas import schemas
+
+
+def test_blocos_espaciais_agrupa_por_experimento(mocker):
+    """
+    Testa se as amostras são agrupadas em blocos consecutivos por experimento,
+    ignorando as que não têm posição.
+    """
+    mocker.patch.object(espacial, "ESPACIAL_BLOCO", 2)
+    amostras = [
+        (3000, -15.2, -47.2, 1),
+        (1000, -15.0, -47.0, 1),
+        (2000, -15.1, -47.1, 1),
+        (4000, None, None, 1),
+        (1000, -16.0, -48.0, 2),
+    ]
+
+    blocos = espacial.blocos_espaciais(amostras)
+
+    assert blocos == [
+        (-15.1, -15.0, -47.1, -47.0, 1, 1000, 2000, 2),
+        (-15.2, -15.2, -47.2, -47.2, 1, 3000, 3000, 1),
+        (-16.0, -16.0, -48.0, -48.0, 2, 1000, 1000, 1),
+    ]
+
+def test_busca_por_raio_usa_indice_espacial(db_sqlite):
+    """
+    Testa se a busca por raio retorna apenas os experimentos e intervalos próximos ao ponto.
+    """
+    experimento = schemas.ExperimentoCreate(
+        nomeExperimento="Perto", distanciaAlvo=100, dataExperimento="01/05/2025",
+        pressaoBar=3.0, volumeAgua=500, massaTotalFoguete=200
+    )
+    id_perto = crud.create_experimento_db(db_sqlite, experimento, date(2025, 5, 1))
+    id_longe = crud.create_experimento_db(db_sqlite, experimento, date(2025, 5, 1))
+
+    crud.create_dados_experimento_lote_db(db_sqlite, [
+        (1000 * i, None, None, None, None, -47.0 + i * 1e-4, -15.0, 1000.0, id_perto) for i in range(100)
+    ])
+    crud.create_dados_experimento_lote_db(db_sqlite, [
+        (1000, None, None, None, None, 10.0, 10.0, 1000.0, id_longe)
+    ])
+
+    # Raio de ~50 m em torno de -15.0, -47.0: amostras de 0 a 4 (passos de ~10,7 m)
+    resultado = espacial.busca_por_raio(db_sqlite, -15.0, -47.0, 50)
+
+    assert resultado["total_experimentos"] == 1
+    assert resultado["experimentos"][0]["experimento_id"] == id_perto
+    assert resultado["experimentos"][0]["intervalos"] == [{"inicio_ms": 0, "fim_ms": 4000, "amostras": 5}]
+
+def test_busca_sem_duplicar_blocos_sobrepostos(db_sqlite, mocker):
+    """
+    Testa se amostras acrescentadas fora de ordem (blocos com intervalos de tempo
+    sobrepostos) e sem timestamp são retornadas uma única vez.
+    """
+    mocker.patch.object(espacial, "ESPACIAL_BLOCO", 2)
+    experimento = schemas.ExperimentoCreate(
+        nomeExperimento="Fora de ordem", distanciaAlvo=100, dataExperimento="01/05/2025",
+        pressaoBar=3.0, volumeAgua=500, massaTotalFoguete=200
+    )
+    id_experimento = crud.create_experimento_db(db_sqlite, experimento, date(2025, 5, 1))
+
+    crud.create_dados_experimento_lote_db(db_sqlite, [
+        (1000, None, None, None, None, -47.0, -15.0, 1000.0, id_experimento),
+        (4000, None, None, None, None, -47.0, -15.0, 1000.0, id_experimento),
+    ])
+    crud.create_dados_experimento_lote_db(db_sqlite, [
+        (2000, None, None, None, None, -47.0, -15.0, 1000.0, id_experimento),
+        (None, None, None, None, None, -47.0, -15.0, 1000.0, id_experimento),
+    ])
+
+    resultado = espacial.busca_por_raio(db_sqlite, -15.0, -47.0, 10)
+
+    assert resultado["experimentos"][0]["amostras"] == 4
+    assert sum(intervalo["amostras"] for intervalo in resultado["experimentos"][0]["intervalos"]) == 4
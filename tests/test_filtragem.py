@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from api.utils import filtragem
+from api.utils.formatacao import formata_dados_experimento_especifico
+
+
+def voo_com_ruido():
+    """
+    100 amostras paradas na base (IMU em 1 g) seguidas de 100 amostras em
+    deslocamento para o norte (~2,2 m a cada 100 ms), com ruído no GPS.
+    """
+    gerador = np.random.default_rng(42)
+    registros = []
+    for i in range(200):
+        em_voo = i >= 100
+        latitude = -15.0 + (i - 100) * 2e-5 if em_voo else -15.0
+        registros.append({
+            'timestamp': 1000 + 100 * i, 'accel_x': 0.0, 'accel_y': 0.0,
+            'accel_z': 20.0 if 100 <= i < 103 else (1.0 if em_voo else 9.8), 'speed_kmph': 0.0,
+            'latitude': latitude + gerador.normal(0, 2e-5), 'longitude': -47.0 + gerador.normal(0, 2e-5),
+            'altura': 1000.0 + gerador.normal(0, 0.5),
+        })
+
+    return registros
+
+def test_rejeita_saltos_impossiveis():
+    """
+    Testa se um fix com velocidade implícita acima do limite é marcado como outlier.
+    """
+    tempo = np.array([0.0, 1.0, 2.0, 3.0])
+    x = np.array([0.0, 1.0, 5000.0, 3.0])
+    y = np.zeros(4)
+
+    assert filtragem.rejeita_saltos(tempo, x, y).tolist() == [False, False, True, False]
+
+def test_filtro_remove_jitter_na_base():
+    """
+    Testa se a série filtrada elimina a distância falsa acumulada pelo jitter do
+    GPS parado e mantém a distância real do deslocamento.
+    """
+    registros = voo_com_ruido()
+    registros[150]['latitude'] += 0.01  # Salto de ~1 km
+
+    brutos = formata_dados_experimento_especifico([dict(r) for r in registros])
+    filtrados = formata_dados_experimento_especifico(filtragem.filtra_dados_voo(registros))
+
+    assert brutos[99]['distancia'] > 100
+    assert filtrados[99]['distancia'] < 10
+    assert filtrados[-1]['distancia'] == pytest.approx(99 * 2e-5 * 111195, rel=0.1)
+    assert filtrados[150]['gps_rejeitado']
@@ -32,4 +32,25 @@ def test_gerar_csv_dados_com_dados():
     
     assert "id,nome" in csv_string
     assert "1,Teste 1" in csv_string
-    assert "2,Teste 2" in csv_string
\ No newline at end of file
+    assert "2,Teste 2" in csv_string
+
+def test_formata_dados_experimento_timestamps_epoch_ms():
+    """
+    Testa se os timestamps em epoch ms viram segundos desde o primeiro registro.
+    """
+    dados = [
+        {'timestamp': 1746100800000, 'latitude': -15.0, 'longitude': -47.0, 'altura': 1000.0},
+        {'timestamp': 1746100800500, 'latitude': -15.0, 'longitude': -47.0, 'altura': 1010.0},
+        {'timestamp': 1746100802000, 'latitude': -15.0, 'longitude': -47.0, 'altura': 1005.0},
+    ]
+
+    resultado = formatacao.formata_dados_experimento_especifico(dados)
+
+    assert [d['timestamp'] for d in resultado] == [0.0, 0.5, 2.0]
+    assert [d['altura_lancamento'] for d in resultado] == [0.0, 10.0, 5.0]
+
+def test_formata_dados_experimento_vazio():
+    """
+    Testa se um experimento sem dados retorna lista vazia.
+    """
+    assert formatacao.formata_dados_experimento_especifico([]) == []
@@ -0,0 +1,58 @@
+import asyncio
+import pytest
+from datetime import date
+
+from api.utils import crud, graficos
+from api.schemas import schemas
+
+
+def cria_experimento(db, nome):
+    experimento = schemas.ExperimentoCreate(
+        nomeExperimento=nome, distanciaAlvo=100, dataExperimento="01/05/2025",
+        pressaoBar=3.0, volumeAgua=500, massaTotalFoguete=200
+    )
+    id_experimento = crud.create_experimento_db(db, experimento, date(2025, 5, 1))
+    crud.create_dados_experimento_lote_db(db, [
+        (1000 + 100 * i, 0.0, 0.0, 9.8, 3.6 * i, -47.0, -15.0 + i * 1e-5, 1000.0 + i, id_experimento)
+        for i in range(20)
+    ])
+
+    return id_experimento
+
+def test_carregar_series_calcula_todas_as_colunas(db_sqlite):
+    """
+    Testa se as séries de vários experimentos são carregadas de uma vez, com
+    distância (km), velocidade e aceleração calculadas, ignorando IDs inexistentes.
+    """
+    id_a = cria_experimento(db_sqlite, "A")
+    id_b = cria_experimento(db_sqlite, "B")
+
+    series = graficos.carregar_series(db_sqlite, [id_a, id_b, 999])
+
+    assert list(series) == [id_a, id_b]
+    dados = series[id_a]["dados"]
+    assert dados.shape == (20, graficos.COLUNAS_SERIE)
+    assert dados[-1, 1] == pytest.approx(19 * 1e-5 * 111.195, rel=1e-3)
+    assert dados[1:, 3] == pytest.approx([10.0] * 19)
+
+def test_renderizar_graficos_em_processos(db_sqlite, mocker):
+    """
+    Testa a renderização paralela (memória compartilhada entre os processos) de
+    gráficos individuais e sobrepostos e o empacotamento em ZIP.
+    """
+    mocker.patch.object(graficos, "GRAFICOS_WORKERS", 2)
+    series = graficos.carregar_series(db_sqlite, [cria_experimento(db_sqlite, "A"), cria_experimento(db_sqlite, "B")])
+
+    matriz, tarefas = graficos.planejar_graficos(series, ["velocidade", "aceleracao"], sobrepor=False)
+    try:
+        arquivos = asyncio.run(graficos.renderizar_graficos(matriz, tarefas))
+    finally:
+        graficos.encerrar_executor()
+
+    assert len(arquivos) == 4
+    assert all(png.startswith(b"\x89PNG") for png in arquivos.values())
+
+    matriz, tarefas = graficos.planejar_graficos(series, ["distancia"], sobrepor=True)
+    assert [tarefa["arquivo"] for tarefa in tarefas] == ["distancia_vs_tempo.png"]
+    assert len(tarefas[0]["series"]) == 2
+    assert graficos.renderizar_grafico(matriz, tarefas[0]).startswith(b"\x89PNG")
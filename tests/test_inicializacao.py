@@ -0,0 +1,28 @@
+import subprocess
+import sys
+
+from api.core import preaquecimento
+
+
+def test_importar_api_nao_carrega_modulos_pesados():
+    """
+    Testa se importar a aplicação não carrega pandas nem matplotlib (são
+    importados sob demanda ou pelo pré-aquecimento após a inicialização).
+    """
+    codigo = "import sys, api.main; print(','.join(m for m in ('pandas', 'matplotlib') if m in sys.modules))"
+    processo = subprocess.run([sys.executable, "-c", codigo], capture_output=True, text=True, check=True)
+
+    assert processo.stdout.strip() == ""
+
+def test_preaquecimento_importa_modulos(mocker, caplog):
+    """
+    Testa se o pré-aquecimento roda em segundo plano e ignora módulos inexistentes.
+    """
+    mocker.patch.object(preaquecimento, "MODULOS_PESADOS", ("json", "modulo_inexistente"))
+    mocker.patch.object(preaquecimento, "PREAQUECER_MODULOS", True)
+
+    thread = preaquecimento.preaquecer_em_segundo_plano()
+    thread.join(timeout=5)
+
+    assert not thread.is_alive()
+    assert "modulo_inexistente" in caplog.text
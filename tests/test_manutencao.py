@@ -0,0 +1,76 @@
+import sqlite3
+from datetime import date
+
+from api.core import database
+from api.core.manutencao import ManutencaoArmazenamento
+from api.schemas import schemas
+from api.utils import crud
+
+
+def _cria_experimento_com_dados(db, amostras):
+    experimento = schemas.ExperimentoCreate(
+        nomeExperimento="Manutenção", distanciaAlvo=100, dataExperimento="01/05/2025",
+        pressaoBar=3.0, volumeAgua=500, massaTotalFoguete=200
+    )
+    id_experimento = crud.create_experimento_db(db, experimento, date(2025, 5, 1))
+    novas_amostras = [
+        {"timestamp": 1746100800000 + i * 250, "latitude": -15.0 + i * 1e-5, "longitude": -47.0, "altitude": 1000.0 + i}
+        for i in range(amostras)
+    ]
+    crud.create_dados_experimento_lote_db(db, [crud.amostra_para_tupla_db(amostra, id_experimento) for amostra in novas_amostras])
+    crud.atualizar_resumo_experimento(db, id_experimento, novas_amostras)
+
+    return id_experimento
+
+def test_coleta_orfaos_em_lotes(db_sqlite):
+    """
+    Testa se a manutenção remove, em lotes, as amostras, os blocos espaciais e o
+    resumo dos experimentos removidos, sem tocar nos demais.
+    """
+    id_removido = _cria_experimento_com_dados(db_sqlite, 100)
+    id_mantido = _cria_experimento_com_dados(db_sqlite, 10)
+    crud.delete_experimento(db_sqlite, id_removido)
+
+    manutencao = ManutencaoArmazenamento(lote=7, paginas_vacuum=1000)
+    resultado = manutencao.executar(db_sqlite)
+
+    assert resultado["removidas"]["DADOS_EXPERIMENTO"] == 100
+    assert resultado["removidas"]["DADOS_EXPERIMENTO_RTREE"] > 0
+    assert resultado["removidas"]["RESUMO_EXPERIMENTO"] == 1
+    for tabela in ("DADOS_EXPERIMENTO", "DADOS_EXPERIMENTO_RTREE", "RESUMO_EXPERIMENTO"):
+        restantes = db_sqlite.execute(f"SELECT DISTINCT fk_exp FROM {tabela}").fetchall()
+        assert [linha[0] for linha in restantes] == [id_mantido]
+
+    # As páginas liberadas voltam ao sistema de arquivos
+    assert db_sqlite.execute("PRAGMA freelist_count").fetchone()[0] == 0
+
+    # Segunda rodada: nada a remover; as métricas acumulam
+    assert not any(manutencao.executar(db_sqlite)["removidas"].values())
+    assert manutencao.metricas()["execucoes"] == 2
+    assert manutencao.metricas()["removidas"]["DADOS_EXPERIMENTO"] == 100
+
+    estatisticas = manutencao.estatisticas(db_sqlite)
+    assert estatisticas["auto_vacuum"] == "incremental"
+    assert estatisticas["paginas"] > 0 and "DADOS_EXPERIMENTO" in estatisticas["tabelas_mb"]
+
+def test_migracao_ativa_auto_vacuum_incremental(mocker, tmp_path):
+    """
+    Testa se um banco existente, criado sem auto_vacuum, é convertido para o modo
+    incremental pelas migrações.
+    """
+    caminho = str(tmp_path / "antigo.db")
+    conn = sqlite3.connect(caminho)
+    conn.execute("CREATE TABLE EXPERIMENTO (id INTEGER PRIMARY KEY AUTOINCREMENT, nome VARCHAR(80) NOT NULL, "
+                 "distancia_alvo INT NOT NULL, data DATE NOT NULL, pressao_psi FLOAT NOT NULL, "
+                 "volume_agua FLOAT NOT NULL, massa_total_foguete FLOAT NOT NULL)")
+    conn.commit()
+    assert conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 0
+    conn.close()
+
+    mocker.patch.object(database, "DATABASE_URL", caminho)
+    database.create_tables()
+
+    conn = database.get_db_connection()
+    assert conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == database.MIGRACOES[-1][0]
+    conn.close()
@@ -0,0 +1,79 @@
+from datetime import date
+
+import numpy as np
+
+from api.schemas import schemas
+from api.utils import crud, modelo
+
+
+def test_ajustar_recupera_coeficientes():
+    """
+    Testa se o ajuste pelas estatísticas suficientes recupera os coeficientes de
+    uma relação linear exata, e se somar parcelas equivale a ajustar tudo junto.
+    """
+    rng = np.random.default_rng(0)
+    variaveis = rng.uniform([2, 300, 150], [6, 1000, 300], size=(20, 3))
+    alcance = 10 + variaveis @ np.array([15.0, 0.05, -0.2])
+    observacoes = np.column_stack([variaveis, alcance, np.full(20, np.nan)])
+
+    matriz = modelo.estatisticas_suficientes(observacoes[:12], 0) + modelo.estatisticas_suficientes(observacoes[12:], 0)
+    ajuste = modelo.ajustar(matriz)
+
+    assert ajuste["observacoes"] == 20
+    assert np.isclose(ajuste["intercepto"], 10)
+    assert np.allclose(list(ajuste["coeficientes"].values()), [15.0, 0.05, -0.2])
+    assert np.isclose(ajuste["r2"], 1.0)
+    assert modelo.ajustar(modelo.estatisticas_suficientes(observacoes, 1)) is None
+    # Menos observações que coeficientes: ajuste indeterminado
+    assert modelo.ajustar(modelo.estatisticas_suficientes(observacoes[:modelo.MINIMO_OBSERVACOES - 1], 0)) is None
+
+def test_ajustar_variavel_constante():
+    """
+    Testa se o ajuste é recusado quando X'X é singular: volume e massa iguais em
+    todos os experimentos, ou um parâmetro proporcional a outro.
+    """
+    pressao = np.array([2.0, 3.0, 4.0, 5.0, 6.0, 4.5])
+    alcance = 10 + 15 * pressao
+    constantes = np.column_stack([pressao, np.full(6, 500.0), np.full(6, 200.0), alcance, np.full(6, np.nan)])
+    proporcionais = np.column_stack([pressao, 100 * pressao, [200, 180, 250, 210, 190, 220], alcance, np.full(6, np.nan)])
+
+    assert modelo.ajustar(modelo.estatisticas_suficientes(constantes, 0)) is None
+    assert modelo.ajustar(modelo.estatisticas_suficientes(proporcionais, 0)) is None
+
+def test_modelo_atualizado_incrementalmente(db_sqlite):
+    """
+    Testa se as estatísticas acompanham a criação, a edição e a remoção de
+    experimentos, igualando o ajuste feito sobre os dados finais.
+    """
+    parametros = [(2.0, 500, 200), (3.0, 800, 180), (4.0, 600, 250), (5.0, 900, 210), (6.0, 700, 190), (4.5, 400, 220)]
+    ids = []
+    for pressao, volume, massa in parametros:
+        experimento = schemas.ExperimentoCreate(
+            nomeExperimento=f"Pressão {pressao}", distanciaAlvo=100, dataExperimento="01/05/2025",
+            pressaoBar=pressao, volumeAgua=volume, massaTotalFoguete=massa
+        )
+        id_experimento = crud.create_experimento_db(db_sqlite, experimento, date(2025, 5, 1))
+        crud.salvar_resumo_experimento(db_sqlite, id_experimento, {
+            "total_amostras": 2, "timestamp_inicial": 0, "timestamp_final": 1000, "altura_inicial": 1000.0,
+            "altura_maxima": 1000.0 + 5 * pressao, "velocidade_maxima": 10.0,
+            "distancia_total": 10 + 15 * pressao + 0.05 * volume - 0.2 * massa,
+            "ultima_latitude": -15.0, "ultima_longitude": -47.0,
+        })
+        ids.append(id_experimento)
+
+    crud.update_experimento(db_sqlite, ids[0], ["Editado", 100, date(2025, 5, 1), 2.5, 550, 205])
+    crud.delete_experimento(db_sqlite, ids[-1])
+
+    ajuste = modelo.busca_modelo(db_sqlite)["alcance"]
+    assert ajuste["observacoes"] == 5
+
+    # Mesmo ajuste de mínimos quadrados feito direto sobre os dados finais
+    x = np.column_stack([np.ones(5), [(2.5, 550, 205), *parametros[1:5]]])
+    y = [10 + 15 * p + 0.05 * v - 0.2 * m for p, v, m in parametros[:5]]
+    esperado = np.linalg.lstsq(x, y, rcond=None)[0]
+    assert np.isclose(ajuste["intercepto"], esperado[0])
+    assert np.allclose(list(ajuste["coeficientes"].values()), esperado[1:])
+
+    previsao = modelo.prever(db_sqlite, [{"pressao_psi": 3.5, "volume_agua": 650, "massa_total_foguete": 200}])
+    assert np.isclose(previsao["alcance"][0], esperado @ [1, 3.5, 650, 200])
+    assert previsao["apogeu"][0] is not None
@@ -0,0 +1,106 @@
+import asyncio
+import marshal
+import pytest
+
+from api.core import profiling, seguranca
+
+
+async def app_teste(scope, receive, send):
+    """Aplicação ASGI mínima que roda uma função síncrona no threadpool."""
+    await profiling.run_in_threadpool(sum, range(1000))
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+def executa(middleware, headers=None, query_string=b""):
+    """Executa uma requisição GET no middleware e devolve os headers da resposta."""
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/experimentos",
+        "headers": headers or [],
+        "query_string": query_string,
+    }
+    mensagens = []
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(mensagem):
+        mensagens.append(mensagem)
+
+    asyncio.run(middleware(scope, receive, send))
+
+    return dict(mensagens[0]["headers"])
+
+@pytest.fixture
+def armazem(mocker):
+    mocker.patch.object(seguranca, "ADMIN_TOKEN", "segredo")
+    return profiling.ArmazemPerfis(maximo=2)
+
+def test_perfil_explicito_com_token(armazem):
+    """
+    Testa se o header X-Profile com o token de administrador gera um perfil.
+    """
+    middleware = profiling.PerfilamentoMiddleware(app_teste, amostragem=0, armazem=armazem)
+
+    headers = executa(middleware, headers=[(b"x-profile", b"segredo")])
+
+    id_perfil = headers[b"x-profile-id"].decode()
+    sessao = armazem.obter(id_perfil)
+    assert sessao.modo == "explicito"
+    assert sessao.status == 200
+    # cProfile apenas na chamada do threadpool; o event loop fica com o amostrador
+    assert len(sessao.perfis) == 1
+    assert any("sum" in func[2] for func in marshal.loads(sessao.pstats_bytes))
+
+def test_perfil_sem_cprofile_disponivel(armazem, mocker):
+    """
+    Testa se uma requisição perfilada no threadpool responde normalmente quando
+    outro perfilador já está ativo (ValueError do cProfile no Python 3.12+).
+    """
+    class PerfilOcupado(profiling.cProfile.Profile):
+        def enable(self, *args, **kwargs):
+            raise ValueError("Another profiling tool is already active")
+
+    mocker.patch.object(profiling.cProfile, "Profile", PerfilOcupado)
+    middleware = profiling.PerfilamentoMiddleware(app_teste, amostragem=0, armazem=armazem)
+
+    headers = executa(middleware, headers=[(b"x-profile", b"segredo")])
+
+    sessao = armazem.obter(headers[b"x-profile-id"].decode())
+    assert sessao.status == 200
+    assert sessao.perfis == []
+    assert sessao.pstats_bytes == b""
+
+def test_perfil_ignorado_com_token_invalido(armazem):
+    """
+    Testa se um token inválido não ativa o perfilamento.
+    """
+    middleware = profiling.PerfilamentoMiddleware(app_teste, amostragem=0, armazem=armazem)
+
+    headers = executa(middleware, query_string=b"profile=errado")
+
+    assert b"x-profile-id" not in headers
+    assert armazem.listar() == []
+
+def test_perfil_por_amostragem(armazem):
+    """
+    Testa se 1 a cada N requisições é perfilada e se o armazém respeita o limite.
+    """
+    middleware = profiling.PerfilamentoMiddleware(app_teste, amostragem=2, armazem=armazem)
+
+    perfilados = [b"x-profile-id" in executa(middleware) for _ in range(6)]
+
+    assert perfilados == [False, True, False, True, False, True]
+    assert len(armazem.listar()) == 2
+    assert all(perfil["modo"] == "amostragem" for perfil in armazem.listar())
+
+def test_collapsed_formato():
+    """
+    Testa o formato "pilha contagem" das pilhas amostradas.
+    """
+    sessao = profiling.SessaoPerfil("GET", "/", "explicito")
+    sessao.pilhas["a.py:main:1;b.py:f:10"] += 3
+    sessao.pilhas["a.py:main:1"] += 1
+
+    assert sessao.collapsed() == "a.py:main:1;b.py:f:10 3\na.py:main:1 1\n"
@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+from datetime import date
+
+from api.core import repositorio
+from api.utils import crud
+from api.schemas import schemas
+
+
+@pytest.fixture
+def experimentos(db_sqlite):
+    experimento = schemas.ExperimentoCreate(
+        nomeExperimento="Voo", distanciaAlvo=100, dataExperimento="01/05/2025",
+        pressaoBar=3.0, volumeAgua=500, massaTotalFoguete=200
+    )
+    ids = [crud.create_experimento_db(db_sqlite, experimento, date(2025, 5, 1)) for _ in range(3)]
+    crud.create_dados_experimento_lote_db(db_sqlite, [
+        (2000, 0.0, 0.0, 9.8, 10.0, -47.0, -15.0, 1010.0, ids[0]),
+        (1000, 0.0, 3.0, 4.0, None, -47.0, -15.0, 1000.0, ids[0]),
+        (1000, None, None, None, 5.0, -48.0, -16.0, 900.0, ids[1]),
+    ])
+
+    return ids
+
+def test_colunas_experimentos_sqlite(db_sqlite, experimentos):
+    """
+    Testa se as colunas são separadas por experimento, ordenadas por timestamp,
+    com NaN nos valores ausentes e sem experimentos vazios.
+    """
+    colunas = repositorio.RepositorioSQLite(db_sqlite).colunas_experimentos(experimentos, ("timestamp", "speed_kmph"))
+
+    assert list(colunas) == experimentos[:2]
+    assert colunas[experimentos[0]]["timestamp"].tolist() == [1000.0, 2000.0]
+    assert np.isnan(colunas[experimentos[0]]["speed_kmph"][0])
+    assert colunas[experimentos[1]]["speed_kmph"].tolist() == [5.0]
+
+def test_estatisticas_experimentos_sqlite(db_sqlite, experimentos):
+    estatisticas = repositorio.RepositorioSQLite(db_sqlite).estatisticas_experimentos(experimentos[:1])
+
+    assert estatisticas == [{
+        "fk_exp": experimentos[0], "amostras": 2, "timestamp_inicial": 1000, "timestamp_final": 2000,
+        "altura_minima": 1000.0, "altura_maxima": 1010.0, "velocidade_maxima": 10.0,
+        "aceleracao_maxima_imu": pytest.approx(9.8),
+    }]
+
+def test_obter_repositorio_configuracao_invalida(db_sqlite, mocker):
+    mocker.patch.object(repositorio, "ARMAZENAMENTO_ANALITICO", "oracle")
+
+    with pytest.raises(ValueError):
+        repositorio.obter_repositorio(db_sqlite)
+
+def test_duckdb_equivale_ao_sqlite(db_sqlite, experimentos, tmp_path):
+    """
+    Testa se o motor DuckDB/Parquet retorna as mesmas colunas e agregados que o SQLite.
+    """
+    pytest.importorskip("duckdb")
+    sqlite = repositorio.RepositorioSQLite(db_sqlite)
+    duckdb = repositorio.RepositorioDuckDB(db_sqlite, str(tmp_path))
+
+    esperado = sqlite.colunas_experimentos(experimentos)
+    obtido = duckdb.colunas_experimentos(experimentos)
+    assert list(obtido) == list(esperado)
+    for id_experimento in esperado:
+        for nome in repositorio.COLUNAS_AMOSTRA:
+            np.testing.assert_array_equal(obtido[id_experimento][nome], esperado[id_experimento][nome])
+
+    assert duckdb.estatisticas_experimentos() == sqlite.estatisticas_experimentos()
+
+def test_duckdb_com_timestamps_nulos(db_sqlite, experimentos, tmp_path):
+    """
+    Testa se amostras sem timestamp são exportadas para Parquet e lidas pelo
+    DuckDB na mesma ordem e com os mesmos agregados que no SQLite.
+    """
+    pytest.importorskip("duckdb")
+    crud.create_dados_experimento_lote_db(db_sqlite, [
+        (None, 1.0, 1.0, 1.0, 7.0, -47.0, -15.0, 1005.0, experimentos[0]),
+        (None, None, None, None, None, None, None, 950.0, experimentos[2]),
+    ])
+    sqlite = repositorio.RepositorioSQLite(db_sqlite)
+    duckdb = repositorio.RepositorioDuckDB(db_sqlite, str(tmp_path))
+
+    esperado = sqlite.colunas_experimentos(experimentos)
+    obtido = duckdb.colunas_experimentos(experimentos)
+    assert list(obtido) == list(esperado) == experimentos
+    assert np.isnan(obtido[experimentos[2]]["timestamp"]).all()
+    for id_experimento in esperado:
+        for nome in repositorio.COLUNAS_AMOSTRA:
+            np.testing.assert_array_equal(obtido[id_experimento][nome], esperado[id_experimento][nome])
+
+    assert duckdb.estatisticas_experimentos() == sqlite.estatisticas_experimentos()
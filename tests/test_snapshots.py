@@ -0,0 +1,58 @@
+import io
+import json
+import zipfile
+from datetime import date
+
+import pytest
+
+from api.schemas import schemas
+from api.utils import crud, snapshots
+
+
+def _cria_experimento(db, hash_conteudo):
+    experimento = schemas.ExperimentoCreate(
+        nomeExperimento="Snapshot", distanciaAlvo=120, dataExperimento="01/05/2025",
+        pressaoBar=3.5, volumeAgua=600, massaTotalFoguete=210
+    )
+    id_experimento = crud.create_experimento_db(db, experimento, date(2025, 5, 1), hash_conteudo)
+    crud.create_dados_experimento_lote_db(db, [
+        (1746100800000 + i * 250, 0.1, None, 9.8, i * 1.5, -47.0 + i * 1e-5, -15.0 + i * 1e-5, 1000.0 + i, id_experimento)
+        for i in range(30)
+    ])
+    crud.recalcular_resumo_experimento(db, id_experimento)
+
+    return id_experimento
+
+def test_snapshot_exporta_e_importa(db_sqlite):
+    """
+    Testa se o snapshot preserva metadados, amostras (inclusive valores ausentes)
+    e resumo, e se a importação ignora os experimentos já presentes, salvo se forçada.
+    """
+    id_original = _cria_experimento(db_sqlite, "a" * 64)
+
+    conteudo = snapshots.exportar_snapshot(db_sqlite, [id_original])
+    with zipfile.ZipFile(io.BytesIO(conteudo)) as arquivo_zip:
+        manifesto = json.loads(arquivo_zip.read("manifesto.json"))
+    assert manifesto["experimentos"][0]["amostras"] == 30
+
+    ignorados = snapshots.importar_snapshot(db_sqlite, conteudo)
+    assert ignorados == [{"id_origem": id_original, "experimento_id": id_original, "duplicado": True}]
+
+    [importado] = snapshots.importar_snapshot(db_sqlite, conteudo, forcar=True)
+    id_copia = importado["experimento_id"]
+    assert id_copia != id_original and not importado["duplicado"]
+
+    original = crud.select_experimento_completo(db_sqlite, id_original)
+    copia = crud.select_experimento_completo(db_sqlite, id_copia)
+    assert copia["dados_associados"].para_json() == original["dados_associados"].para_json()
+    assert {**copia["experimento"], "id": id_original} == original["experimento"]
+    assert crud.select_resumo_experimento(db_sqlite, id_copia) == crud.select_resumo_experimento(db_sqlite, id_original)
+
+def test_snapshot_invalido(db_sqlite):
+    """
+    Testa se arquivos que não são snapshots e experimentos inexistentes são recusados.
+    """
+    with pytest.raises(ValueError):
+        snapshots.importar_snapshot(db_sqlite, b"nao e zip")
+
+    assert snapshots.exportar_snapshot(db_sqlite, [999]) is None
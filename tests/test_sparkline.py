@@ -0,0 +1,52 @@
+from datetime import date
+
+import numpy as np
+
+from api.schemas import schemas
+from api.utils import crud
+from api.utils.sparkline import reduzir_min_max
+
+
+def test_reduzir_min_max_preserva_picos():
+    """
+    Testa se a redução por mínimo/máximo devolve o número fixo de pontos, em
+    ordem, preservando o pico e ignorando valores ausentes.
+    """
+    valores = np.sin(np.linspace(0, np.pi, 1001)) * 100
+    valores[500] = 250.0 # Pico isolado
+    valores[10] = np.nan
+
+    reduzida = reduzir_min_max(valores, pontos=16)
+
+    assert len(reduzida) == 16
+    assert max(reduzida) == 250.0
+    assert reduzida[0] == 0.0 and reduzida[-1] == 0.0
+    assert reduzir_min_max(np.array([1.0, np.nan, 3.456]), pontos=16) == [1.0, 3.46]
+
+def test_listagem_com_sparkline(db_sqlite):
+    """
+    Testa se a miniatura é gravada na ingestão do CSV e devolvida pela listagem
+    (None para experimentos sem dados).
+    """
+    experimento = schemas.ExperimentoCreate(
+        nomeExperimento="Miniatura", distanciaAlvo=100, dataExperimento="01/05/2025",
+        pressaoBar=3.0, volumeAgua=500, massaTotalFoguete=200
+    )
+    id_com_dados = crud.create_experimento_db(db_sqlite, experimento, date(2025, 5, 1))
+    id_sem_dados = crud.create_experimento_db(db_sqlite, experimento, date(2025, 5, 1))
+
+    linhas = ["timestamp,accel_x,accel_y,accel_z,speed_kmph,latitude,longitude,altitude"]
+    for i in range(200):
+        linhas.append(f"{1746100800000 + i * 100},0,0,9.8,1.0,{-15.0 + i * 1e-5},-47.0,{1000 + min(i, 200 - i)}")
+    crud.processar_e_salvar_csv(db_sqlite, "\n".join(linhas).encode(), id_com_dados)
+
+    experimentos = {
+        exp["id"]: exp for exp in crud.select_todos_experimentos(db_sqlite, incluir_sparkline=True)["experimentos"]
+    }
+
+    miniatura = experimentos[id_com_dados]["sparkline"]
+    assert len(miniatura["altura_lancamento"]) == len(miniatura["distancia"]) == 64
+    assert max(miniatura["altura_lancamento"]) == 100.0
+    assert miniatura["distancia"] == sorted(miniatura["distancia"])
+    assert experimentos[id_sem_dados]["sparkline"] is None
+    assert experimentos[id_sem_dados]["nomeExperimento"] == "Miniatura"
@@ -0,0 +1,74 @@
+import io
+import json
+import sqlite3
+
+import numpy as np
+
+from api.utils import formatacao
+from api.utils.telemetria import COLUNAS_AMOSTRA, Telemetria
+
+
+def _banco_com_amostras():
+    """Amostras com valores ausentes, inclusive timestamps nulos no início."""
+    rng = np.random.default_rng(7)
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    conn.execute(f"CREATE TABLE dados ({', '.join(COLUNAS_AMOSTRA)})")
+
+    linhas = []
+    for i in range(300):
+        linha = [
+            None if i < 2 else 1746100800000 + i * 250,
+            *rng.normal(0, 3, 3).tolist(),
+            float(rng.uniform(0, 80)),
+            -47.0 + i * 1e-5 + rng.normal(0, 1e-6),
+            -15.0 + i * 1e-5 + rng.normal(0, 1e-6),
+            1000.0 + rng.uniform(0, 50),
+        ]
+        if i % 17 == 5:
+            linha[5] = linha[6] = None
+        if i % 23 == 7:
+            linha[7] = None
+        if i % 11 == 3:
+            linha[1] = None
+        linhas.append(linha)
+    conn.executemany(f"INSERT INTO dados VALUES ({', '.join('?' for _ in COLUNAS_AMOSTRA)})", linhas)
+
+    return conn
+
+def _consulta(conn):
+    return conn.execute(f"SELECT {', '.join(COLUNAS_AMOSTRA)} FROM dados ORDER BY timestamp")
+
+def test_telemetria_equivale_aos_dicionarios():
+    """
+    Testa se as colunas enriquecidas serializam para o mesmo JSON e CSV que a
+    lista de dicionários de formata_dados_experimento_especifico.
+    """
+    conn = _banco_com_amostras()
+    esperado = formatacao.formata_dados_experimento_especifico(_consulta(conn).fetchall())
+    telemetria = Telemetria.de_cursor(_consulta(conn), bloco=64).enriquecida()
+
+    assert len(telemetria) == len(esperado)
+    assert telemetria.para_json() == json.dumps(esperado, ensure_ascii=False, allow_nan=False, separators=(",", ":"))
+    assert telemetria.para_csv() == formatacao.gerar_csv_dados(esperado)
+    assert telemetria[10] == esperado[10]
+    assert list(telemetria)[-1] == esperado[-1]
+
+def test_telemetria_vazia_e_binaria():
+    """
+    Testa a telemetria sem amostras e o array estruturado .npy.
+    """
+    conn = _banco_com_amostras()
+    vazia = Telemetria.de_cursor(conn.execute(f"SELECT {', '.join(COLUNAS_AMOSTRA)} FROM dados WHERE 0")).enriquecida()
+    assert len(vazia) == 0 and vazia.para_json() == "[]" and vazia.para_csv() == ""
+
+    telemetria = Telemetria.de_registros([
+        {"timestamp": 1000, "latitude": -15.0, "longitude": -47.0, "altura": None, "gps_rejeitado": False},
+        {"timestamp": 1500, "latitude": -15.0, "longitude": -47.0, "altura": 2.0, "gps_rejeitado": True},
+    ])
+    estruturado = np.load(io.BytesIO(telemetria.para_npy()))
+
+    assert estruturado.dtype.names == ("timestamp", "latitude", "longitude", "altura", "gps_rejeitado")
+    assert estruturado["gps_rejeitado"].tolist() == [False, True]
+    assert np.isnan(estruturado["altura"][0]) and estruturado["timestamp"][1] == 1500
+    assert telemetria.memoria_bytes() == 2 * (4 * 8 + 1)
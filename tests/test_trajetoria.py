@@ -0,0 +1,65 @@
+import numpy as np
+
+from api.utils import trajetoria
+
+
+def linha(timestamp, latitude, longitude, altura, speed_kmph=0.0):
+    return {'timestamp': timestamp, 'latitude': latitude, 'longitude': longitude,
+            'altura': altura, 'speed_kmph': speed_kmph}
+
+def test_douglas_peucker_remove_pontos_colineares():
+    """
+    Testa se pontos sobre uma reta são descartados e as extremidades mantidas.
+    """
+    pontos = np.column_stack((np.arange(10, dtype=float), np.zeros(10)))
+
+    manter = trajetoria.douglas_peucker(pontos, tolerancia=0.1)
+
+    assert manter.tolist() == [True] + [False] * 8 + [True]
+
+def test_douglas_peucker_mantem_desvio_acima_da_tolerancia():
+    """
+    Testa se um desvio maior que a tolerância é preservado.
+    """
+    pontos = np.array([[0.0, 0.0], [1.0, 0.05], [2.0, 5.0], [3.0, 0.0], [4.0, 0.0]])
+
+    manter = trajetoria.douglas_peucker(pontos, tolerancia=1.0)
+
+    assert manter.tolist() == [True, False, True, False, True]
+
+def test_gerar_geojson_mantem_apogeu():
+    """
+    Testa se a trajetória GeoJSON preserva o apogeu de um voo quase vertical.
+    """
+    dados = [
+        linha(1000, -15.0, -47.0, 1000.0),
+        linha(2000, -15.0, -47.0, 1050.0, 80.0),
+        linha(3000, -15.0, -47.0, 1100.0, 40.0),
+        linha(4000, -15.0, -47.0, 1050.0, 40.0),
+        linha(5000, -15.0, -47.0, 1000.0, 80.0),
+    ]
+
+    geojson = trajetoria.gerar_geojson_trajetoria(dados, 1, tolerancia=5.0)
+
+    assert geojson["geometry"]["type"] == "LineString"
+    assert geojson["geometry"]["coordinates"] == [[-47.0, -15.0, 1000.0], [-47.0, -15.0, 1100.0], [-47.0, -15.0, 1000.0]]
+    assert geojson["properties"]["tempo_s"] == [0.0, 2.0, 4.0]
+    assert geojson["properties"]["pontos_originais"] == 5
+    assert geojson["properties"]["pontos_simplificados"] == 3
+
+def test_busca_trajetoria_usa_cache_por_versao(mocker):
+    """
+    Testa se a trajetória é recalculada apenas quando a versão dos dados muda.
+    """
+    mocker.patch.object(trajetoria, "cache_resultados", trajetoria.cache_resultados.__class__())
+    versao = mocker.patch.object(trajetoria.crud, "select_versao_dados", return_value=1)
+    dados = mocker.patch.object(trajetoria.crud, "select_dados_brutos_experimento",
+                                return_value=[linha(1000, -15.0, -47.0, 1000.0), linha(2000, -15.001, -47.0, 1000.0)])
+
+    trajetoria.busca_trajetoria_geojson(None, 1, 1.0)
+    trajetoria.busca_trajetoria_geojson(None, 1, 1.0)
+    assert dados.call_count == 1
+
+    versao.return_value = 2
+    trajetoria.busca_trajetoria_geojson(None, 1, 1.0)
+    assert dados.call_count == 2